@@ -7,6 +7,7 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 
 from config import Config
 from extensions import db, login_manager
+from utils import metrics, slow_queries, holiday_calendar
 from models import Doctor
 from settings_defaults import init_default_settings
 from blueprints.patient import patient_bp
@@ -18,6 +19,9 @@ from blueprints.patient import patient_bp
 from apscheduler.schedulers.background import BackgroundScheduler
 from jobs.send_reminders import run as send_reminders_run
 from jobs.expire_unpaid_appointments import run as cancel_unpaid_run   # ← NOWY
+from jobs.archive_availability import run as archive_availability_run
+from jobs.compact_message_logs import run as compact_messages_run
+from jobs.google_sync_retry import run as google_sync_retry_run
 
 
 
@@ -73,6 +77,12 @@ def create_app():
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
 
+    # =============================
+    # METRYKI (SQL / DOSTAWCY ZEWNĘTRZNI)
+    # =============================
+    metrics.init_app(app)
+    slow_queries.init_app(app)
+
     # =============================
     # LOGIN MANAGER
     # =============================
@@ -135,6 +145,7 @@ def create_app():
     from blueprints.doctor_visit_types import bp as doctor_visit_types_bp
     from blueprints.site_api import site_api_bp
     from blueprints.payments import payments_bp
+    from blueprints.webhooks import webhooks_bp
 
 
     app.register_blueprint(patient_bp, url_prefix="/rejestracja")
@@ -149,6 +160,7 @@ def create_app():
     )
     app.register_blueprint(doctor_templates_bp)
     app.register_blueprint(site_api_bp)
+    app.register_blueprint(webhooks_bp)
 
     # =============================
     # DB INIT + DEFAULT SETTINGS
@@ -156,6 +168,9 @@ def create_app():
     with app.app_context():
         init_default_settings()
 
+    # święta PL dla okna lat – liczone raz na proces
+    holiday_calendar.warm()
+
     # =============================
     # BACKGROUND SCHEDULER (SMS)
     # =============================
@@ -171,6 +186,18 @@ def create_app():
             with app.app_context():
                 cancel_unpaid_run()
 
+        def archive_availability_wrapper():
+            with app.app_context():
+                archive_availability_run()
+
+        def compact_messages_wrapper():
+            with app.app_context():
+                compact_messages_run()
+
+        def google_sync_retry_wrapper():
+            with app.app_context():
+                google_sync_retry_run()
+
         scheduler.add_job(
             reminder_job_wrapper,
             trigger="interval",
@@ -187,6 +214,31 @@ def create_app():
             replace_existing=True
         )
 
+        scheduler.add_job(
+            archive_availability_wrapper,
+            trigger="cron",
+            hour=3,
+            id="archive_availability",
+            replace_existing=True
+        )
+
+        scheduler.add_job(
+            compact_messages_wrapper,
+            trigger="cron",
+            hour=3,
+            minute=30,
+            id="compact_message_logs",
+            replace_existing=True
+        )
+
+        scheduler.add_job(
+            google_sync_retry_wrapper,
+            trigger="interval",
+            minutes=5,
+            id="google_sync_retry",
+            replace_existing=True
+        )
+
         scheduler.start()
     print("✅ Background schedulers started")
 
@@ -0,0 +1,290 @@
+"""
+Wolne terminy: dawne pętle po obiektach ORM (api_days / api_hours)
+vs bitmapy utils/availability_engine.
+
+Dla każdego miesiąca grafiku i każdego typu wizyty benchmark liczy:
+    - dni z wolnym terminem (api_days),
+    - godziny startu w każdym dniu miesiąca (api_hours),
+sprawdza zgodność wyników i wypisuje czasy oraz liczbę zapytań SQL.
+
+    python -m benchmarks.availability_engine
+    python -m benchmarks.availability_engine --months 6 --occupancy 0.5
+"""
+import argparse
+import os
+import sys
+import time as _time
+from datetime import datetime, timedelta, date, time
+
+from benchmarks.harness import bootstrap, seed, SQLCounter, VISIT_TYPES
+
+
+DEFAULT_DB = "sqlite:///" + os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "instance", "bench.db")
+)
+
+
+# ───────────────────────────────────────
+# DAWNA IMPLEMENTACJA (kopia z blueprints/patient.py)
+# ───────────────────────────────────────
+
+def _legacy_window_is_free_and_continuous(slots):
+    from models import Appointment
+    from utils.slot_holds import has_active_hold
+
+    for i in range(1, len(slots)):
+        if slots[i].start != slots[i - 1].end:
+            return False
+
+    start = slots[0].start
+    end = slots[-1].end
+
+    conflict = (
+        Appointment.query
+        .filter(
+            Appointment.doctor_id == 1,
+            Appointment.status.in_(["scheduled", "completed"]),
+            Appointment.start < end,
+            Appointment.end > start
+        )
+        .first()
+    )
+
+    if conflict is not None:
+        return False
+
+    return not has_active_hold(start, end)
+
+
+def legacy_days(month_start, month_end, visit_minutes):
+    from models import Availability, Appointment, Vacation
+    from utils.slot_holds import active_holds
+
+    required_slots = visit_minutes // 15
+
+    slots = (
+        Availability.query
+        .filter(
+            Availability.doctor_id == 1,
+            Availability.start >= month_start,
+            Availability.start < month_end,
+            Availability.active.is_(True)
+        )
+        .order_by(Availability.start)
+        .all()
+    )
+
+    appointments = (
+        Appointment.query
+        .filter(
+            Appointment.doctor_id == 1,
+            Appointment.status.in_(["scheduled", "completed"]),
+            Appointment.start < month_end,
+            Appointment.end > month_start
+        )
+        .all()
+    )
+    appointments += active_holds(month_start, month_end)
+
+    vacations = (
+        Vacation.query
+        .filter(
+            Vacation.doctor_id == 1,
+            Vacation.active == 1,
+            Vacation.date_from < month_end,
+            Vacation.date_to >= month_start
+        )
+        .all()
+    )
+
+    def has_conflict_local(start, end):
+        return any(a.start < end and a.end > start for a in appointments)
+
+    def is_vacation_local(day):
+        return any(v.date_from <= day <= v.date_to for v in vacations)
+
+    days = set()
+
+    for i in range(len(slots)):
+        window = slots[i:i + required_slots]
+        if len(window) < required_slots:
+            continue
+
+        for j in range(1, len(window)):
+            if window[j].start != window[j - 1].end:
+                break
+        else:
+            start = window[0].start
+            end = start + timedelta(minutes=visit_minutes)
+
+            if not is_vacation_local(start.date()) and not has_conflict_local(start, end):
+                days.add(start.date())
+
+    return days
+
+
+def legacy_hours(day, visit_minutes):
+    from models import Availability, Vacation
+
+    vacation = Vacation.query.filter(
+        Vacation.doctor_id == 1,
+        Vacation.active == 1,
+        Vacation.date_from <= day,
+        Vacation.date_to >= day
+    ).first()
+
+    if vacation is not None:
+        return []
+
+    required_slots = visit_minutes // 15
+
+    slots = (
+        Availability.query
+        .filter(
+            Availability.doctor_id == 1,
+            Availability.start >= datetime.combine(day, time.min),
+            Availability.start < datetime.combine(day + timedelta(days=1), time.min),
+            Availability.active.is_(True)
+        )
+        .order_by(Availability.start)
+        .all()
+    )
+
+    starts = []
+
+    for i in range(len(slots)):
+        window = slots[i:i + required_slots]
+        if len(window) < required_slots:
+            continue
+
+        if _legacy_window_is_free_and_continuous(window):
+            starts.append(window[0].start)
+
+    return starts
+
+
+# ───────────────────────────────────────
+# POMIAR
+# ───────────────────────────────────────
+
+def _months(first_day, count):
+    year, month = first_day.year, first_day.month
+    for _ in range(count):
+        start = date(year, month, 1)
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+        yield start, date(year, month, 1)
+
+
+def _timed(counter, fn):
+    counter.reset()
+    started = _time.perf_counter()
+    result = fn()
+    return result, (_time.perf_counter() - started) * 1000, counter.count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--database-url", default=DEFAULT_DB)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--occupancy", type=float, default=0.35)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.database_url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(args.database_url[len("sqlite:///"):]), exist_ok=True)
+
+    from extensions import db
+    from utils import availability_engine, holiday_calendar
+
+    app = bootstrap(args.database_url)
+    seeded = seed(
+        app,
+        days_ahead=args.months * 31,
+        occupancy=args.occupancy,
+        random_seed=args.seed
+    )
+    print(f"seeded: {seeded['slots']} slots, {seeded['appointments']} appointments")
+
+    months = list(_months(date.today(), args.months))
+    rows = []
+
+    with app.app_context():
+        counter = SQLCounter(db.engine)
+        holiday_calendar.warm()
+
+        for _, _, visit_minutes, _ in VISIT_TYPES:
+            totals = {"legacy_days": [0, 0], "engine_days": [0, 0],
+                      "legacy_hours": [0, 0], "engine_hours": [0, 0]}
+
+            for first, end in months:
+                month_start = datetime.combine(first, time.min)
+                month_end = datetime.combine(end, time.min)
+                month_days = [first + timedelta(days=i) for i in range((end - first).days)]
+
+                legacy, ms, queries = _timed(
+                    counter, lambda: legacy_days(month_start, month_end, visit_minutes)
+                )
+                totals["legacy_days"][0] += ms
+                totals["legacy_days"][1] += queries
+
+                # dawny kod nie stosował reguły minut startu – porównanie bez niej
+                engine, ms, queries = _timed(
+                    counter,
+                    lambda: set(
+                        availability_engine.load(1, first, end)
+                        .days_with_start(visit_minutes, nice=False)
+                    )
+                )
+                totals["engine_days"][0] += ms
+                totals["engine_days"][1] += queries
+
+                # święta są w bitmapie dniami zamkniętymi, dawny kod ich nie znał
+                legacy = {d for d in legacy if not holiday_calendar.is_holiday(d)}
+                assert legacy == engine, (visit_minutes, first, legacy ^ engine)
+
+                db.session.expire_all()
+
+                legacy, ms, queries = _timed(
+                    counter, lambda: {d: legacy_hours(d, visit_minutes) for d in month_days}
+                )
+                totals["legacy_hours"][0] += ms
+                totals["legacy_hours"][1] += queries
+
+                def engine_hours():
+                    availability = availability_engine.load(1, first, end)
+                    return {d: availability.starts_on(d, visit_minutes, nice=False) for d in month_days}
+
+                engine, ms, queries = _timed(counter, engine_hours)
+                totals["engine_hours"][0] += ms
+                totals["engine_hours"][1] += queries
+
+                for d in month_days:
+                    if not holiday_calendar.is_holiday(d):
+                        assert legacy[d] == engine[d], (visit_minutes, d)
+
+                db.session.rollback()
+
+            rows.append((visit_minutes, totals))
+
+    print(f"months: {args.months}, results identical ✅")
+    print()
+    print(f"{'visit':<8}{'path':<14}{'legacy ms':>12}{'engine ms':>12}{'speedup':>10}{'SQL':>14}")
+    print("-" * 70)
+
+    for visit_minutes, totals in rows:
+        for path in ("days", "hours"):
+            legacy_ms, legacy_q = totals[f"legacy_{path}"]
+            engine_ms, engine_q = totals[f"engine_{path}"]
+            speedup = f"{legacy_ms / engine_ms:.1f}x" if engine_ms else "-"
+            print(
+                f"{visit_minutes:<8}{'api_' + path:<14}{legacy_ms:>12.1f}{engine_ms:>12.1f}"
+                f"{speedup:>10}{f'{legacy_q} → {engine_q}':>14}"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
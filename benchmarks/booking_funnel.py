@@ -0,0 +1,347 @@
+"""
+Test obciążeniowy ścieżki rezerwacji pacjenta:
+
+    /rejestracja/api/visit-types → /api/days → /api/hours
+    → /rejestracja/reserve → /payments/init → /payments/register
+
+Każdy wirtualny pacjent przechodzi całą ścieżkę (płatność P24).
+Dostawcy zewnętrzni są podmienieni na lokalne atrapy (benchmarks.harness).
+
+Przykłady:
+    python -m benchmarks.booking_funnel
+    python -m benchmarks.booking_funnel --patients 200 --concurrency 16
+    python -m benchmarks.booking_funnel --database-url mysql+pymysql://u:p@localhost/bench
+    python -m benchmarks.booking_funnel --output bench/HEAD.json --baseline bench/main.json
+
+Z --baseline skrypt kończy się kodem 1, jeśli p95 lub liczba zapytań SQL
+którejś końcówki pogorszyła się ponad --tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import bootstrap, seed, SQLCounter
+
+
+DEFAULT_DB = "sqlite:///" + os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "instance", "bench.db")
+)
+
+ENDPOINTS = [
+    "visit-types",
+    "days",
+    "hours",
+    "reserve",
+    "payments/init",
+    "payments/register",
+]
+
+
+# ───────────────────────────────────────
+# POMIARY
+# ───────────────────────────────────────
+
+class Recorder:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)   # endpoint → [(ms, sql, status)]
+
+    def add(self, endpoint, ms, sql, status):
+        with self._lock:
+            self.samples[endpoint].append((ms, sql, status))
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(recorder, wall_seconds):
+    report = {}
+
+    for endpoint in ENDPOINTS:
+        samples = recorder.samples.get(endpoint, [])
+        if not samples:
+            continue
+
+        ms = [s[0] for s in samples]
+        sql = [s[1] for s in samples]
+
+        report[endpoint] = {
+            "requests": len(samples),
+            "errors": sum(1 for s in samples if s[2] >= 500),
+            "rejected": sum(1 for s in samples if 400 <= s[2] < 500),
+            "throughput_rps": round(len(samples) / wall_seconds, 2),
+            "p50_ms": round(_percentile(ms, 50), 2),
+            "p95_ms": round(_percentile(ms, 95), 2),
+            "p99_ms": round(_percentile(ms, 99), 2),
+            "sql_avg": round(sum(sql) / len(sql), 2),
+            "sql_max": max(sql),
+        }
+
+    return report
+
+
+# ───────────────────────────────────────
+# WIRTUALNY PACJENT
+# ───────────────────────────────────────
+
+def _call(client, counter, recorder, endpoint, method, url, **kwargs):
+    counter.reset()
+    started = time.perf_counter()
+
+    response = getattr(client, method)(url, **kwargs)
+
+    elapsed = (time.perf_counter() - started) * 1000
+    recorder.add(endpoint, elapsed, counter.count, response.status_code)
+
+    return response
+
+
+def virtual_patient(app, counter, recorder, patient_no, months, rnd_seed):
+    rnd = random.Random(rnd_seed + patient_no)
+    client = app.test_client()
+    ajax = {"X-Requested-With": "XMLHttpRequest"}
+
+    r = _call(client, counter, recorder, "visit-types", "get",
+              "/rejestracja/api/visit-types")
+    visit_types = r.get_json() or []
+    if not visit_types:
+        return "no-visit-types"
+
+    code = rnd.choice(visit_types)["code"]
+
+    days = []
+    for year, month in months:
+        r = _call(client, counter, recorder, "days", "get",
+                  "/rejestracja/api/days",
+                  query_string={"visit_type": code, "year": year, "month": month})
+        days = r.get_json() or []
+        if days:
+            break
+
+    if not days:
+        return "no-days"
+
+    day = rnd.choice(days)
+
+    r = _call(client, counter, recorder, "hours", "get",
+              "/rejestracja/api/hours",
+              query_string={"visit_type": code, "day": day})
+    hours = r.get_json() or []
+    if not hours:
+        return "no-hours"
+
+    r = _call(client, counter, recorder, "reserve", "post",
+              "/rejestracja/reserve?ajax=1",
+              headers=ajax,
+              data={
+                  "visit_type": code,
+                  "day": day,
+                  "hour": rnd.choice(hours),
+                  "first_name": "Anna",
+                  "last_name": f"Bench{patient_no}",
+                  "phone": f"+48600{patient_no:06d}",
+                  "email": f"bench{patient_no}@example.com",
+                  "payment_flow": "online",
+                  "payment_method": "p24",
+              })
+    body = r.get_json(silent=True) or {}
+    if not body.get("success"):
+        return "slot-taken"
+
+    payload = (
+        {"hold_token": body["hold_token"]}
+        if body.get("hold_token")
+        else {"appointment_id": body.get("appointment_id")}
+    )
+
+    r = _call(client, counter, recorder, "payments/init", "post",
+              "/payments/init", json=payload)
+    payment_id = (r.get_json(silent=True) or {}).get("payment_id")
+    if not payment_id:
+        return "init-failed"
+
+    r = _call(client, counter, recorder, "payments/register", "post",
+              "/payments/register", json={"payment_id": payment_id})
+    if r.status_code != 200:
+        return "register-failed"
+
+    return "ok"
+
+
+# ───────────────────────────────────────
+# RAPORT
+# ───────────────────────────────────────
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def print_report(result):
+    print()
+    print(f"commit={result['commit']} patients={result['patients']} "
+          f"concurrency={result['concurrency']} wall={result['wall_seconds']}s")
+    print(f"outcomes: {result['outcomes']}")
+    print()
+
+    header = (
+        f"{'endpoint':<20}{'req':>6}{'err':>5}{'rej':>5}{'rps':>9}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}{'sql':>7}{'sqlmax':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for endpoint, row in result["endpoints"].items():
+        print(
+            f"{endpoint:<20}{row['requests']:>6}{row['errors']:>5}"
+            f"{row['rejected']:>5}{row['throughput_rps']:>9}"
+            f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+            f"{row['sql_avg']:>7}{row['sql_max']:>8}"
+        )
+
+
+def compare(result, baseline, tolerance):
+    """
+    Zwraca listę regresji względem poprzedniego wyniku.
+    """
+    regressions = []
+
+    for endpoint, row in result["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(endpoint)
+        if not old:
+            continue
+
+        if old["p95_ms"] and row["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{endpoint}: p95 {old['p95_ms']}ms → {row['p95_ms']}ms"
+            )
+
+        if row["sql_avg"] > old["sql_avg"] + 0.5:
+            regressions.append(
+                f"{endpoint}: SQL/req {old['sql_avg']} → {row['sql_avg']}"
+            )
+
+    return regressions
+
+
+# ───────────────────────────────────────
+# ENTRYPOINT
+# ───────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--database-url", default=DEFAULT_DB)
+    parser.add_argument("--patients", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--days-ahead", type=int, default=90)
+    parser.add_argument("--occupancy", type=float, default=0.35)
+    parser.add_argument("--provider-latency-ms", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="zapis wyniku (JSON)")
+    parser.add_argument("--baseline", help="poprzedni wynik (JSON) do porównania")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    if args.database_url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(args.database_url[len("sqlite:///"):]), exist_ok=True)
+
+    app = bootstrap(
+        args.database_url,
+        provider_latency_ms=args.provider_latency_ms
+    )
+    seeded = seed(
+        app,
+        days_ahead=args.days_ahead,
+        occupancy=args.occupancy,
+        random_seed=args.seed
+    )
+    print(f"seeded: {seeded['slots']} slots, {seeded['appointments']} appointments")
+
+    from extensions import db
+
+    with app.app_context():
+        counter = SQLCounter(db.engine)
+
+    # miesiące od jutra do końca grafiku
+    months = []
+    d = seeded["first_day"]
+    while d <= seeded["last_day"]:
+        if (d.year, d.month) not in months:
+            months.append((d.year, d.month))
+        d = d.replace(day=1)
+        d = d.replace(year=d.year + 1, month=1) if d.month == 12 else d.replace(month=d.month + 1)
+
+    recorder = Recorder()
+    outcomes = defaultdict(int)
+
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(virtual_patient, app, counter, recorder, n, months, args.seed)
+            for n in range(args.patients)
+        ]
+        for f in futures:
+            try:
+                outcomes[f.result()] += 1
+            except Exception as e:
+                outcomes[f"exception:{type(e).__name__}"] += 1
+
+    wall = time.perf_counter() - started
+
+    result = {
+        "commit": _git_commit(),
+        "database": args.database_url.split("://")[0],
+        "patients": args.patients,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 3),
+        "outcomes": dict(outcomes),
+        "endpoints": summarize(recorder, wall),
+    }
+
+    print_report(result)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+
+        regressions = compare(result, baseline, args.tolerance)
+
+        if regressions:
+            print("\nREGRESJE:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+
+        print("\nBrak regresji względem", args.baseline)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Mikrobenchmark renderowania treści e-mail (templates/email/).
+
+    python -m benchmarks.email_render
+    python -m benchmarks.email_render --messages 20000 --template email.confirmation.v1
+
+Mierzy:
+  - start środowiska Jinja bez bytecode cache i z ciepłym cache,
+  - render pojedynczy (render() per wiadomość) vs hurtowy (render_many),
+  - render z params_json (jak przy podglądzie / retry z logu).
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+
+
+def _params(n):
+    return [
+        {
+            "first_name": f"Pacjent{i}",
+            "date": f"{1 + i % 28:02d}.03.2026",
+            "time": f"{8 + i % 10:02d}:{(i % 4) * 15:02d}",
+            "cancel_url": f"https://example.com/c/token{i}",
+        }
+        for i in range(n)
+    ]
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--template", default="email.reminder.v1")
+    args = parser.parse_args(argv)
+
+    from utils import email_templates
+    from utils.message_templates import render, render_many
+
+    # ───── start środowiska
+    cache_dir = tempfile.mkdtemp(prefix="bench-jinja-")
+    try:
+        cold, _ = _timed(lambda: email_templates.build_environment(cache_dir=None))
+        email_templates.build_environment(cache_dir=cache_dir)     # zapis bytecode
+        warm, _ = _timed(lambda: email_templates.build_environment(cache_dir=cache_dir))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"environment: no cache {cold * 1000:.1f} ms, warm bytecode cache {warm * 1000:.1f} ms")
+
+    params = _params(args.messages)
+    params_json = [json.dumps(p, separators=(",", ":")) for p in params]
+
+    render(args.template, params[0])   # rozgrzanie singletonu
+
+    single, _ = _timed(lambda: [render(args.template, p) for p in params])
+    batch, bodies = _timed(lambda: render_many(args.template, params))
+    from_log, _ = _timed(lambda: render_many(args.template, params_json))
+
+    n = args.messages
+    print(f"template: {args.template}, messages: {n}, body ≈ {len(bodies[0])} chars")
+    print(f"{'mode':<22}{'total ms':>10}{'renders/s':>12}")
+    for label, seconds in (
+        ("render() per message", single),
+        ("render_many()", batch),
+        ("render_many(json)", from_log),
+    ):
+        print(f"{label:<22}{seconds * 1000:>10.1f}{n / seconds:>12.0f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
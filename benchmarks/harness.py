@@ -0,0 +1,385 @@
+"""
+Wspólne środowisko dla benchmarków: baza z danymi, atrapy dostawców
+(SMSAPI, Resend, Google, P24) i licznik zapytań SQL.
+
+Użycie:
+    from benchmarks.harness import bootstrap
+    app = bootstrap("sqlite:///instance/bench.db")
+"""
+import os
+import random
+import threading
+import time as _time
+from datetime import datetime, timedelta, date, time
+from decimal import Decimal
+
+
+# ───────────────────────────────────────
+# ŚRODOWISKO (PRZED IMPORTEM config.py)
+# ───────────────────────────────────────
+
+BENCH_ENV = {
+    "SECRET_KEY": "bench",
+    "P24_MERCHANT_ID": "100000",
+    "P24_POS_ID": "100000",
+    "P24_CRC": "bench-crc",
+    "P24_API_KEY": "bench-key",
+    "SMSAPI_TOKEN": "bench-token",
+    "SMSAPI_SENDER": "BENCH",
+    "RESEND_API_KEY": "re_bench",
+    "MAIL_FROM": "bench@example.com",
+    "GOOGLE_SERVICE_ACCOUNT_JSON": "{}",
+}
+
+
+def _prepare_env(database_url):
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+
+    os.environ["DATABASE_URL"] = database_url
+    # scheduler startuje tylko na produkcji – na wszelki wypadek
+    os.environ.pop("RAILWAY_ENVIRONMENT_NAME", None)
+
+
+def _create_schema(database_url):
+    """
+    Schemat od zera przez migracje – benchmark mierzy ten sam
+    zestaw indeksów co produkcja.
+    """
+    import sqlalchemy as sa
+    from extensions import db
+    import models  # noqa: F401 – rejestracja tabel
+    from migrations import upgrade, schema_migrations
+
+    engine = sa.create_engine(database_url)
+
+    db.metadata.drop_all(engine)
+    schema_migrations.drop(engine, checkfirst=True)
+    upgrade(engine)
+
+    engine.dispose()
+
+
+# ───────────────────────────────────────
+# ATRAPY DOSTAWCÓW
+# ───────────────────────────────────────
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self._data = data
+        self.status_code = status_code
+        self.content = b"{}"
+        self.text = str(data)
+
+    def json(self):
+        return self._data
+
+
+class _FakeExecutable:
+    def __init__(self, result, latency):
+        self._result = result
+        self._latency = latency
+
+    def execute(self, *args, **kwargs):
+        _sleep(self._latency)
+        return self._result
+
+
+class FakeGoogleEvents:
+    def __init__(self, latency):
+        self._latency = latency
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def insert(self, calendarId=None, body=None):
+        with self._lock:
+            self._counter += 1
+            event_id = f"bench-event-{self._counter}"
+        return _FakeExecutable({"id": event_id}, self._latency)
+
+    def update(self, calendarId=None, eventId=None, body=None):
+        return _FakeExecutable({"id": eventId}, self._latency)
+
+    def delete(self, calendarId=None, eventId=None):
+        return _FakeExecutable({}, self._latency)
+
+
+class FakeGoogleService:
+    def __init__(self, latency):
+        self._events = FakeGoogleEvents(latency)
+        self._latency = latency
+
+    def events(self):
+        return self._events
+
+
+class FakeSMSAPIClient:
+    provider = "smsapi"
+
+    def __init__(self, latency):
+        self._latency = latency
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def send(self, *, token, sender, to, message, **params):
+        _sleep(self._latency)
+
+        numbers = str(to).split(",")
+
+        with self._lock:
+            first = self._counter + 1
+            self._counter += len(numbers)
+
+        items = [
+            {"id": f"bench-sms-{first + i}", "number": number, "status": "QUEUE"}
+            for i, number in enumerate(numbers)
+        ]
+
+        return FakeResponse({"count": len(items), "list": items})
+
+
+class FakeResendClient:
+    provider = "resend"
+    batch_size = 100
+
+    def __init__(self, latency):
+        self._latency = latency
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def configure(self, api_key):
+        pass
+
+    def _ids(self, n):
+        with self._lock:
+            first = self._counter + 1
+            self._counter += n
+        return [f"bench-email-{first + i}" for i in range(n)]
+
+    def send(self, params):
+        _sleep(self._latency)
+        return {"id": self._ids(1)[0]}
+
+    def send_batch(self, params_list):
+        _sleep(self._latency)
+        return {"data": [{"id": i} for i in self._ids(len(params_list))]}
+
+
+class FakeP24Client:
+    provider = "p24"
+
+    def __init__(self, latency):
+        self._latency = latency
+
+    def register(self, url, payload, *, pos_id, api_key):
+        _sleep(self._latency)
+        return FakeResponse({"data": {"token": "BENCHTOKEN"}})
+
+    def verify(self, url, payload, *, pos_id, api_key):
+        _sleep(self._latency)
+        return FakeResponse({"data": {"status": "success"}})
+
+
+def _sleep(latency):
+    if latency:
+        _time.sleep(latency)
+
+
+def install_provider_stubs(latency_ms=0):
+    """
+    Podmienia wywołania sieciowe na lokalne atrapy.
+    latency_ms – sztuczne opóźnienie odpowiedzi dostawcy.
+    """
+    from utils.google_calendar import GoogleCalendarService
+    from utils.http_clients import override_client
+
+    latency = latency_ms / 1000.0
+
+    override_client("smsapi", FakeSMSAPIClient(latency))
+    override_client("p24", FakeP24Client(latency))
+    override_client("resend", FakeResendClient(latency))
+
+    service = FakeGoogleService(latency)
+    GoogleCalendarService.get_service = staticmethod(lambda: service)
+
+
+# ───────────────────────────────────────
+# LICZNIK SQL
+# ───────────────────────────────────────
+
+class SQLCounter:
+    """
+    Liczy zapytania SQL wykonane w bieżącym wątku.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self._local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, "count", 0)
+
+
+# ───────────────────────────────────────
+# DANE
+# ───────────────────────────────────────
+
+VISIT_TYPES = [
+    # code, name, minuty, cena
+    ("konsultacja", "Konsultacja", 30, Decimal("150.00")),
+    ("kontrola", "Wizyta kontrolna", 45, Decimal("200.00")),
+    ("pierwsza", "Pierwsza wizyta", 60, Decimal("250.00")),
+]
+
+# typowy grafik: godziny przyjęć per dzień tygodnia
+WEEK_HOURS = {
+    0: range(9, 17),
+    1: range(12, 19),
+    2: range(9, 17),
+    3: range(12, 19),
+    4: range(8, 14),
+}
+
+
+def seed(app, *, days_ahead=90, days_back=0, occupancy=0.35,
+         vacation_days=5, random_seed=1):
+    """
+    Grafik na days_ahead dni (sloty 08:00–19:00 co 15 min),
+    wizyty zajmujące ~occupancy aktywnych slotów oraz jeden urlop.
+    """
+    from extensions import db
+    from models import (
+        Doctor, VisitType, Availability, Appointment, Vacation, Setting
+    )
+
+    rnd = random.Random(random_seed)
+
+    with app.app_context():
+        doctor = Doctor(username="doctor")
+        doctor.set_password("doctorpass")
+        db.session.add(doctor)
+        db.session.flush()
+
+        for order, (code, name, minutes, price) in enumerate(VISIT_TYPES):
+            db.session.add(VisitType(
+                name=name,
+                code=code,
+                duration_minutes=minutes,
+                price=price,
+                display_order=order,
+                display_order_doctor=order,
+            ))
+
+        for key in ("sms_enabled", "email_enabled"):
+            db.session.add(Setting(key=key, value="1", description="bench"))
+
+        first_day = date.today() - timedelta(days=days_back)
+        last_day = date.today() + timedelta(days=days_ahead)
+
+        vacation_start = date.today() + timedelta(days=min(20, days_ahead // 2))
+        if vacation_days:
+            db.session.add(Vacation(
+                doctor_id=doctor.id,
+                date_from=vacation_start,
+                date_to=vacation_start + timedelta(days=vacation_days - 1),
+                description="bench",
+                active=True,
+            ))
+
+        slots = []
+        appointments = []
+
+        d = first_day
+        while d <= last_day:
+            hours = WEEK_HOURS.get(d.weekday())
+            on_vacation = (
+                vacation_days
+                and vacation_start <= d < vacation_start + timedelta(days=vacation_days)
+            )
+
+            if hours is not None:
+                current = datetime.combine(d, time(8, 0))
+                end_time = datetime.combine(d, time(19, 0))
+
+                while current < end_time:
+                    slots.append({
+                        "doctor_id": doctor.id,
+                        "start": current,
+                        "end": current + timedelta(minutes=15),
+                        "active": current.hour in hours and not on_vacation,
+                    })
+                    current += timedelta(minutes=15)
+
+                if not on_vacation:
+                    current = datetime.combine(d, time(hours.start, 0))
+                    day_end = datetime.combine(d, time(hours.stop, 0))
+
+                    while current < day_end:
+                        code, _, minutes, _ = rnd.choice(VISIT_TYPES)
+                        end = current + timedelta(minutes=minutes)
+
+                        if end <= day_end and rnd.random() < occupancy:
+                            appointments.append({
+                                "doctor_id": doctor.id,
+                                "start": current,
+                                "end": end,
+                                "duration": minutes,
+                                "visit_type": code,
+                                "patient_first_name": "Jan",
+                                "patient_last_name": f"Seed{len(appointments)}",
+                                "patient_phone": f"+48500{len(appointments):06d}",
+                                "status": "scheduled" if d >= date.today() else "completed",
+                                "created_by": "patient",
+                                "cancel_token": f"seed{len(appointments)}",
+                            })
+                            current = end
+                        else:
+                            current += timedelta(minutes=15)
+
+            d += timedelta(days=1)
+
+        db.session.execute(db.insert(Availability), slots)
+        if appointments:
+            db.session.execute(db.insert(Appointment), appointments)
+
+        db.session.commit()
+
+        return {
+            "slots": len(slots),
+            "appointments": len(appointments),
+            "first_day": first_day,
+            "last_day": last_day,
+        }
+
+
+# ───────────────────────────────────────
+# BOOTSTRAP
+# ───────────────────────────────────────
+
+def bootstrap(database_url, *, provider_latency_ms=0, reset=True):
+    """
+    Przygotowuje środowisko i zwraca aplikację Flask.
+    reset=True – usuwa i tworzy tabele od nowa.
+    """
+    _prepare_env(database_url)
+
+    if reset:
+        _create_schema(database_url)
+
+    from app import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+
+    install_provider_stubs(provider_latency_ms)
+
+    return app
@@ -0,0 +1,74 @@
+"""
+Mikrobenchmark kalendarza świąt: holidays.PL(years=…) przy każdym
+wywołaniu (dawny is_polish_holiday) vs utils/holiday_calendar.
+
+    python -m benchmarks.holidays
+    python -m benchmarks.holidays --months 24
+"""
+import argparse
+import sys
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+
+import holidays
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def _legacy_is_holiday(d):
+    return d in holidays.PL(years={d.year})
+
+
+def _months(count, today):
+    year, month = today.year, today.month
+    for _ in range(count):
+        first = date(year, month, 1)
+        yield first, date(year, month, monthrange(year, month)[1])
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--months", type=int, default=12)
+    args = parser.parse_args(argv)
+
+    from utils import holiday_calendar
+
+    today = date.today()
+    months = list(_months(args.months, today))
+    days = [
+        first + timedelta(days=i)
+        for first, last in months
+        for i in range((last - first).days + 1)
+    ]
+
+    warm = _timed(holiday_calendar.warm)
+
+    legacy = _timed(lambda: [_legacy_is_holiday(d) for d in days])
+    memo = _timed(lambda: [holiday_calendar.is_holiday(d) for d in days])
+    mask = _timed(lambda: [holiday_calendar.open_days_mask(first, last) for first, last in months])
+
+    assert [_legacy_is_holiday(d) for d in days[:62]] == [holiday_calendar.is_holiday(d) for d in days[:62]]
+
+    n = len(days)
+    print(f"warm(): {warm * 1000:.1f} ms, days: {n} ({args.months} months)")
+    print(f"{'mode':<32}{'total ms':>10}{'µs/day':>10}")
+    for label, seconds in (
+        ("holidays.PL per call", legacy),
+        ("holiday_calendar.is_holiday", memo),
+        ("open_days_mask per month", mask),
+    ):
+        print(f"{label:<32}{seconds * 1000:>10.2f}{seconds * 1e6 / n:>10.2f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""
+Plany zapytań i czasy gorących ścieżek przed i po indeksach z migracji v0003.
+
+Na dużym zbiorze (domyślnie 3 lata wstecz + rok grafiku, płatności
+i historia SMS/e-mail) benchmark:
+    1. cofa schemat do v0002 (bez indeksów złożonych),
+    2. wykonuje EXPLAIN i mierzy zapytania,
+    3. stosuje v0003 i powtarza pomiar.
+
+Przykłady:
+    python -m benchmarks.index_plans
+    python -m benchmarks.index_plans --database-url mysql+pymysql://u:p@localhost/bench
+    python -m benchmarks.index_plans --output bench/index_plans.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time as _time
+from datetime import datetime, timedelta, date, time
+
+from sqlalchemy import event
+
+from benchmarks.harness import bootstrap, seed
+
+
+DEFAULT_DB = "sqlite:///" + os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "instance", "bench.db")
+)
+
+INDEX_MIGRATION = 3
+
+
+# ───────────────────────────────────────
+# DODATKOWE DANE (PŁATNOŚCI, WIADOMOŚCI)
+# ───────────────────────────────────────
+
+def seed_history(app, *, payment_ratio=0.4, random_seed=1):
+    from extensions import db
+    from models import Appointment, Payment, SMSMessage, EmailMessage
+
+    rnd = random.Random(random_seed)
+
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(Appointment.id, Appointment.start, Appointment.patient_phone)
+        ).all()
+
+        payments, sms, emails = [], [], []
+
+        for appointment_id, start, phone in rows:
+            created = start - timedelta(days=rnd.randint(1, 30))
+
+            if rnd.random() < payment_ratio:
+                payments.append({
+                    "appointment_id": appointment_id,
+                    "provider": rnd.choice(["przelewy24", "traditional"]),
+                    "provider_session_id": f"bench-{appointment_id}",
+                    "amount": 15000,
+                    "status": rnd.choice(["paid", "paid", "paid", "pending", "failed"]),
+                    "created_at": created,
+                    "updated_at": created,
+                })
+
+            sms.append({
+                "appointment_id": appointment_id,
+                "phone": phone,
+                "type": "confirmation",
+                "status": "sent",
+                "content": "Potwierdzenie wizyty",
+                "created_at": created,
+                "updated_at": created,
+            })
+
+            emails.append({
+                "appointment_id": appointment_id,
+                "email": "bench@example.com",
+                "type": "confirmation",
+                "status": "sent",
+                "subject": "Potwierdzenie wizyty",
+                "content": "<p>Potwierdzenie wizyty</p>",
+                "created_at": created,
+                "updated_at": created,
+            })
+
+        for model, data in ((Payment, payments), (SMSMessage, sms), (EmailMessage, emails)):
+            if data:
+                db.session.execute(db.insert(model), data)
+
+        db.session.commit()
+
+        return {"payments": len(payments), "sms": len(sms), "emails": len(emails)}
+
+
+# ───────────────────────────────────────
+# ZAPYTANIA (JAK W BLUEPRINTACH / JOBACH)
+# ───────────────────────────────────────
+
+def hot_queries(day):
+    """
+    name → funkcja wykonująca zapytanie w bieżącej sesji.
+    """
+    from extensions import db
+    from models import Appointment, Availability, Payment, SMSMessage, EmailMessage
+
+    day_start = datetime.combine(day, time.min)
+    day_end = day_start + timedelta(days=1)
+    month_start = datetime.combine(day.replace(day=1), time.min)
+    month_end = month_start + timedelta(days=32)
+    month_end = month_end.replace(day=1)
+    visit_start = datetime.combine(day, time(10, 0))
+    visit_end = visit_start + timedelta(minutes=30)
+
+    def api_days_slots():
+        return (
+            Availability.query
+            .filter(
+                Availability.doctor_id == 1,
+                Availability.start >= month_start,
+                Availability.start < month_end,
+                Availability.active.is_(True)
+            )
+            .order_by(Availability.start)
+            .all()
+        )
+
+    def api_days_appointments():
+        return (
+            Appointment.query
+            .filter(
+                Appointment.doctor_id == 1,
+                Appointment.status.in_(["scheduled", "completed"]),
+                Appointment.start < month_end,
+                Appointment.end > month_start
+            )
+            .all()
+        )
+
+    def api_hours_appointments():
+        return (
+            Appointment.query
+            .filter(
+                Appointment.doctor_id == 1,
+                Appointment.status.in_(["scheduled", "completed"]),
+                Appointment.start >= day_start,
+                Appointment.start < day_end
+            )
+            .all()
+        )
+
+    def reserve_conflict():
+        return (
+            Appointment.query
+            .filter(
+                Appointment.doctor_id == 1,
+                Appointment.status.in_(["scheduled", "completed"]),
+                Appointment.start < visit_end,
+                Appointment.end > visit_start
+            )
+            .first()
+        )
+
+    def expire_unpaid():
+        return (
+            Payment.query
+            .filter(
+                Payment.provider == "przelewy24",
+                Payment.status.in_(["init", "pending"]),
+                Payment.appointment_id.isnot(None),
+                Payment.created_at < datetime.utcnow() - timedelta(minutes=30)
+            )
+            .all()
+        )
+
+    def pending_payments():
+        payment_exists = (
+            db.session.query(Payment.id)
+            .filter(Payment.appointment_id == Appointment.id)
+            .exists()
+        )
+        paid_exists = (
+            db.session.query(Payment.id)
+            .filter(
+                Payment.appointment_id == Appointment.id,
+                Payment.status == "paid"
+            )
+            .exists()
+        )
+        return (
+            Appointment.query
+            .filter(
+                Appointment.doctor_id == 1,
+                Appointment.status == "scheduled",
+                payment_exists,
+                ~paid_exists
+            )
+            .order_by(Appointment.start.asc())
+            .all()
+        )
+
+    def sms_history():
+        return SMSMessage.query.order_by(SMSMessage.created_at.desc()).limit(50).all()
+
+    def email_history():
+        return EmailMessage.query.order_by(EmailMessage.created_at.desc()).limit(50).all()
+
+    return {
+        "api_days.slots": api_days_slots,
+        "api_days.appointments": api_days_appointments,
+        "api_hours.appointments": api_hours_appointments,
+        "reserve.conflict": reserve_conflict,
+        "expire_unpaid.payments": expire_unpaid,
+        "pending_payments": pending_payments,
+        "sms_list": sms_history,
+        "email_list": email_history,
+    }
+
+
+# ───────────────────────────────────────
+# POMIAR
+# ───────────────────────────────────────
+
+def _analyze(engine):
+    # świeże statystyki dla plannera po zmianie indeksów
+    from extensions import db
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+        elif conn.dialect.name in ("mysql", "mariadb"):
+            conn.exec_driver_sql(
+                "ANALYZE TABLE " + ", ".join(db.metadata.tables)
+            )
+
+
+def _plan_lines(plan):
+    lines = []
+
+    for step in plan or []:
+        if "detail" in step:                          # SQLite
+            lines.append(step["detail"])
+        elif "error" in step:
+            lines.append(f"error: {step['error']}")
+        else:                                         # MySQL
+            lines.append(
+                f"{step.get('table')} type={step.get('type')} "
+                f"key={step.get('key')} rows={step.get('rows')} "
+                f"{step.get('Extra') or ''}".strip()
+            )
+
+    return lines
+
+
+def measure(app, queries, repeat):
+    from extensions import db
+    from utils.slow_queries import explain_statement
+
+    results = {}
+
+    with app.app_context():
+        engine = db.engine
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        for name, run in queries.items():
+            captured.clear()
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                run()
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+
+            statement, parameters = captured[0]
+            plan = explain_statement(db.session.connection(), statement, parameters)
+
+            timings = []
+            for _ in range(repeat):
+                db.session.expire_all()
+                started = _time.perf_counter()
+                run()
+                timings.append((_time.perf_counter() - started) * 1000)
+
+            db.session.rollback()
+
+            results[name] = {
+                "median_ms": round(statistics.median(timings), 3),
+                "plan": _plan_lines(plan),
+            }
+
+    return results
+
+
+def print_report(before, after):
+    print()
+    print(f"{'query':<26}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    print("-" * 60)
+
+    for name in before:
+        b = before[name]["median_ms"]
+        a = after[name]["median_ms"]
+        speedup = f"{b / a:.1f}x" if a else "-"
+        print(f"{name:<26}{b:>12}{a:>12}{speedup:>10}")
+
+    print()
+
+    for name in before:
+        print(f"■ {name}")
+        for line in before[name]["plan"]:
+            print(f"    before: {line}")
+        for line in after[name]["plan"]:
+            print(f"    after:  {line}")
+
+
+# ───────────────────────────────────────
+# ENTRYPOINT
+# ───────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--database-url", default=DEFAULT_DB)
+    parser.add_argument("--days-back", type=int, default=3 * 365)
+    parser.add_argument("--days-ahead", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="zapis wyniku (JSON)")
+    args = parser.parse_args(argv)
+
+    if args.database_url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(args.database_url[len("sqlite:///"):]), exist_ok=True)
+
+    from extensions import db
+    from migrations import upgrade, downgrade
+
+    app = bootstrap(args.database_url)
+
+    seeded = seed(
+        app,
+        days_ahead=args.days_ahead,
+        days_back=args.days_back,
+        random_seed=args.seed
+    )
+    history = seed_history(app, random_seed=args.seed)
+    print(
+        f"seeded: {seeded['slots']} slots, {seeded['appointments']} appointments, "
+        f"{history['payments']} payments, {history['sms']} sms, {history['emails']} emails"
+    )
+
+    queries = hot_queries(date.today() + timedelta(days=14))
+
+    with app.app_context():
+        engine = db.engine
+
+    downgrade(engine, INDEX_MIGRATION - 1)
+    _analyze(engine)
+    before = measure(app, queries, args.repeat)
+
+    upgrade(engine)
+    _analyze(engine)
+    after = measure(app, queries, args.repeat)
+
+    print_report(before, after)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fh:
+            json.dump({"before": before, "after": after}, fh, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
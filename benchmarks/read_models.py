@@ -0,0 +1,235 @@
+"""
+Odczyt wierszy: encje ORM vs kolumny przez select() (utils/read_models).
+
+Dla slotów (Availability) i wizyt (Appointment) benchmark mierzy
+czas pobrania + zbudowania wyniku oraz pamięć zajmowaną przez wynik
+(tracemalloc), w przeliczeniu na 10 tys. wierszy:
+    orm     – Model.query…all() (wizyty z joinedload płatności, jak dawny kalendarz),
+    rows    – select(kolumny) → Row SQLAlchemy,
+    tuples  – utils/read_models (NamedTuple),
+    arrays  – kolumny numpy (datetime64 / bool), jak utils/availability_engine.
+
+    python -m benchmarks.read_models
+    python -m benchmarks.read_models --rows 50000 --repeat 7
+"""
+import argparse
+import gc
+import math
+import os
+import statistics
+import sys
+import time as _time
+import tracemalloc
+from datetime import datetime, timedelta, date, time
+
+from benchmarks.harness import bootstrap, seed
+
+
+DEFAULT_DB = "sqlite:///" + os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "instance", "bench.db")
+)
+
+# sloty dnia roboczego w seed() (08:00–19:00 co 15 min)
+SLOTS_PER_WEEKDAY = 44
+
+
+# ───────────────────────────────────────
+# WARIANTY ODCZYTU
+# ───────────────────────────────────────
+
+def _variants(start, end):
+    import numpy as np
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+
+    from extensions import db
+    from models import Availability, Appointment
+    from utils import read_models
+
+    def slot_arrays():
+        rows = db.session.execute(
+            select(Availability.id, Availability.start, Availability.end, Availability.active)
+            .where(Availability.doctor_id == 1, Availability.start < end, Availability.end > start)
+            .order_by(Availability.start)
+        ).all()
+        ids, starts, ends, active = zip(*rows) if rows else ((), (), (), ())
+        return {
+            "id": np.array(ids, dtype=np.int64),
+            "start": np.array(starts, dtype="datetime64[m]"),
+            "end": np.array(ends, dtype="datetime64[m]"),
+            "active": np.array(active, dtype=bool),
+        }
+
+    def appointment_arrays():
+        rows = db.session.execute(
+            select(Appointment.id, Appointment.start, Appointment.end)
+            .where(
+                Appointment.doctor_id == 1,
+                Appointment.status.in_(read_models.BUSY_STATUSES),
+                Appointment.start < end,
+                Appointment.end > start
+            )
+            .order_by(Appointment.start)
+        ).all()
+        ids, starts, ends = zip(*rows) if rows else ((), (), ())
+        return {
+            "id": np.array(ids, dtype=np.int64),
+            "start": np.array(starts, dtype="datetime64[m]"),
+            "end": np.array(ends, dtype="datetime64[m]"),
+        }
+
+    slots = {
+        "orm": lambda: (
+            Availability.query
+            .filter(Availability.doctor_id == 1, Availability.start < end, Availability.end > start)
+            .order_by(Availability.start)
+            .all()
+        ),
+        "rows": lambda: db.session.execute(
+            select(Availability.id, Availability.start, Availability.end, Availability.active)
+            .where(Availability.doctor_id == 1, Availability.start < end, Availability.end > start)
+            .order_by(Availability.start)
+        ).all(),
+        "tuples": lambda: read_models.slots(1, start, end),
+        "arrays": slot_arrays,
+    }
+
+    appointments = {
+        "orm": lambda: (
+            db.session.query(Appointment)
+            .options(joinedload(Appointment.payments))
+            .filter(
+                Appointment.doctor_id == 1,
+                Appointment.status.in_(read_models.BUSY_STATUSES),
+                Appointment.start < end,
+                Appointment.end > start
+            )
+            .order_by(Appointment.start)
+            .all()
+        ),
+        # bez płatności – sam koszt Row wobec NamedTuple
+        "rows": lambda: db.session.execute(
+            select(*[getattr(Appointment, f) for f in read_models.AppointmentRow._fields[:-2]])
+            .where(
+                Appointment.doctor_id == 1,
+                Appointment.status.in_(read_models.BUSY_STATUSES),
+                Appointment.start < end,
+                Appointment.end > start
+            )
+            .order_by(Appointment.start)
+        ).all(),
+        "tuples": lambda: read_models.appointments(1, start, end, with_payment=True),
+        "arrays": appointment_arrays,
+    }
+
+    return {"slots": slots, "appointments": appointments}
+
+
+# ───────────────────────────────────────
+# POMIAR
+# ───────────────────────────────────────
+
+def _size(result):
+    return len(result["id"]) if isinstance(result, dict) else len(result)
+
+
+def _timed(fn, repeat):
+    from extensions import db
+
+    times = []
+    for _ in range(repeat):
+        # pusta mapa tożsamości – ORM nie korzysta z poprzedniego przebiegu
+        db.session.expunge_all()
+        gc.collect()
+
+        started = _time.perf_counter()
+        result = fn()
+        times.append((_time.perf_counter() - started) * 1000)
+
+        del result
+
+    return statistics.median(times)
+
+
+def _memory(fn):
+    """
+    (zajęte przez wynik, szczyt w trakcie) w bajtach.
+    """
+    from extensions import db
+
+    db.session.expunge_all()
+    gc.collect()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    result = fn()
+    gc.collect()
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return _size(result), current - before, peak - before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--database-url", default=DEFAULT_DB)
+    parser.add_argument("--rows", type=int, default=10000, help="przybliżona liczba slotów")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.database_url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(args.database_url[len("sqlite:///"):]), exist_ok=True)
+
+    from extensions import db
+
+    # seed() daje 44 sloty na dzień roboczy
+    days_ahead = math.ceil(args.rows / SLOTS_PER_WEEKDAY * 7 / 5) + 7
+
+    app = bootstrap(args.database_url)
+    seeded = seed(app, days_ahead=days_ahead)
+    print(f"seeded: {seeded['slots']} slots, {seeded['appointments']} appointments")
+
+    start = datetime.combine(date.today(), time.min)
+    end = datetime.combine(seeded["last_day"] + timedelta(days=1), time.min)
+
+    rows = []
+
+    with app.app_context():
+        for model, variants in _variants(start, end).items():
+            baseline = None
+
+            for name, fn in variants.items():
+                count, retained, peak = _memory(fn)
+                ms = _timed(fn, args.repeat)
+
+                per_10k = 10000 / count if count else 0
+                if baseline is None:
+                    baseline = ms * per_10k
+
+                rows.append((
+                    model, name, count,
+                    ms * per_10k,
+                    retained * per_10k / 1024,
+                    peak * per_10k / 1024,
+                    baseline / (ms * per_10k) if ms else 0,
+                ))
+
+        db.session.rollback()
+
+    print()
+    print(f"{'model':<14}{'variant':<9}{'rows':>8}{'ms/10k':>10}{'KB/10k':>10}{'peak KB':>10}{'vs orm':>9}")
+    print("-" * 70)
+
+    for model, name, count, ms, retained, peak, speedup in rows:
+        print(
+            f"{model:<14}{name:<9}{count:>8}{ms:>10.1f}{retained:>10.0f}"
+            f"{peak:>10.0f}{speedup:>8.1f}x"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,7 @@ import secrets
 from calendar import monthrange
 from datetime import datetime, timedelta, date, time
 
-import holidays
+from utils import availability_engine, availability_events, holiday_calendar, read_models, visit_types
 
 from flask import (
     Blueprint,
@@ -16,6 +16,8 @@ from flask import (
     flash,
     session,
     current_app,
+    abort,
+    Response,
 )
 
 from flask_login import login_required, current_user
@@ -28,7 +30,6 @@ from extensions import db
 from models import (
     Appointment,
     Availability,
-    VisitType,
     Vacation,
     BlacklistPatient,
     Setting,
@@ -40,6 +41,8 @@ from models import (
 from utils.settings import get_setting, set_setting
 from utils.google_calendar import GoogleCalendarService
 from utils.sms_service import SMSService
+from utils.slot_holds import has_active_hold
+from utils.availability_archive import archived_slots, archived_counts, is_archived_day
 from models import EmailMessage
 
 
@@ -59,11 +62,9 @@ GOOGLE_COLORS = {
 
 
 
-#pl_holidays = holidays.country_holidays("PL")
-
 def is_polish_holiday(d: date) -> bool:
-    pl_holidays = holidays.PL(years={d.year})
-    return d in pl_holidays
+    # zbiór dat liczony raz na proces (utils/holiday_calendar.py)
+    return holiday_calendar.is_holiday(d)
 
 
 doctor_bp = Blueprint("doctor", __name__, url_prefix="/doctor")
@@ -248,13 +249,7 @@ def appointments():
         show_past=show_past,
         sort=sort,
         dir=dir_,
-        visit_types=VisitType.query
-            .filter_by(active=True)
-            .order_by(
-                VisitType.display_order.asc(),
-                VisitType.id.asc()
-            )
-            .all(),
+        visit_types=visit_types.listing(),
         active_page="appointments"
     )
 
@@ -296,6 +291,10 @@ def cancel_appointment(appointment_id):
     appt.cancelled_by = "doctor"
     appt.cancelled_at = datetime.utcnow()
 
+    availability_events.record_change(
+        appt.doctor_id, appt.start,
+        kind="appointment.cancelled", ref_id=appt.id
+    )
     db.session.commit()
 
     flash("✔ Wizyta anulowana", "doctor-success")
@@ -341,6 +340,10 @@ def complete_appointment(appointment_id):
 
     # ✅ Zmiana statusu
     appt.status = "completed"
+    availability_events.record_change(
+        appt.doctor_id, appt.start,
+        kind="appointment.completed", ref_id=appt.id
+    )
     db.session.commit()
 
     # 🔄 Aktualizacja Google (opcjonalnie — jeśli chcesz zmienić tytuł)
@@ -388,47 +391,42 @@ def api_availability_calendar():
         start = today - timedelta(days=today.weekday())
         end = start + timedelta(days=7)
 
+    return jsonify(_calendar_events(current_user.id, start, end))
+
+
+def _calendar_events(doctor_id, start, end):
+    """
+    Zdarzenia FullCalendar lekarza w zakresie [start, end) – pełny
+    widok (api_availability_calendar) i delty SSE (…/stream).
+    """
+    # tylko odczyt – wiersze z utils/read_models zamiast encji ORM
+
     # ==========================================================
-    # WIZYTY
+    # WIZYTY (+ ostatnia płatność)
     # ==========================================================
-    appointments = (
-        db.session.query(Appointment)
-        .options(joinedload(Appointment.payments))
-        .filter(
-            Appointment.doctor_id == current_user.id,
-            Appointment.status.in_(["scheduled", "completed"]),
-            Appointment.start < end,
-            Appointment.end > start
-        )
-        .all()
+    appointments = read_models.appointments(
+        doctor_id, start, end, with_payment=True
     )
 
     # ==========================================================
     # URLOPY
     # ==========================================================
-    vacations = (
-        Vacation.query
-        .filter(
-            Vacation.doctor_id == current_user.id,
-            Vacation.active.is_(True),
-            Vacation.date_from <= end.date(),
-            Vacation.date_to >= start.date()
-        )
-        .all()
+    vacations = read_models.vacations(
+        doctor_id, start.date(), end.date(), active_only=True
     )
 
     # ==========================================================
     # SLOTY
     # ==========================================================
-    slots = (
-        Availability.query
-        .filter(
-            Availability.doctor_id == current_user.id,
-            Availability.start < end,
-            Availability.end > start
-        )
-        .all()
-    )
+    slots = read_models.slots(doctor_id, start, end)
+
+    # przeszłe dni przeniesione do availability_archive (tylko podgląd)
+    archived = archived_slots(doctor_id, start, end)
+
+    # ==========================================================
+    # BLOKADY NA CZAS PŁATNOŚCI ONLINE
+    # ==========================================================
+    holds = read_models.holds(doctor_id, start, end)
 
     events = []
 
@@ -437,7 +435,7 @@ def api_availability_calendar():
     # ==========================================================
     occupied_slots = set()
 
-    for a in appointments:
+    for a in list(appointments) + holds:
 
         current = a.start
 
@@ -479,16 +477,41 @@ def api_availability_calendar():
             }
         })
 
+    for s in archived:
+
+        if s.start in occupied_slots:
+            continue
+
+        vacation_flag = is_vacation_day(s.start.date())
+
+        if vacation_flag:
+            bg = "#e2e3e5"
+        else:
+            bg = "#d4edda" if s.active else "#f8d7da"
+
+        events.append({
+            "id": f"arch-{s.start:%Y%m%d%H%M}",
+            "start": s.start.isoformat(),
+            "end": s.end.isoformat(),
+            "display": "block",
+            "backgroundColor": bg,
+            "borderColor": bg,
+            "editable": False,
+            "extendedProps": {
+                "archived": True,
+                "active": s.active,
+                "is_vacation": vacation_flag
+            }
+        })
+
     # ==========================================================
     # WIZYTY
     # ==========================================================
     visit_type_codes = {a.visit_type for a in appointments}
 
     visit_types_map = {
-        vt.code: vt
-        for vt in VisitType.query.filter(
-            VisitType.code.in_(visit_type_codes)
-        ).all()
+        code: visit_types.get(code)
+        for code in visit_type_codes
     }
 
     for a in appointments:
@@ -498,17 +521,6 @@ def api_availability_calendar():
         color_id = vt.color if vt and vt.color else "1"
         color_hex = GOOGLE_COLORS.get(color_id, "#3788d8")
 
-        latest_payment = None
-
-        if a.payments:
-            latest_payment = max(
-                a.payments,
-                key=lambda p: p.created_at
-            )
-
-        payment_status = latest_payment.status if latest_payment else None
-        payment_provider = latest_payment.provider if latest_payment else None
-
         events.append({
             "id": f"appt-{a.id}",
             "title": f"{a.patient_first_name} {a.patient_last_name}",
@@ -525,8 +537,28 @@ def api_availability_calendar():
                 "duration": a.duration,
                 "created_by": a.created_by,
                 "status": a.status,
-                "payment_status": payment_status,
-                "payment_provider": payment_provider
+                "payment_status": a.payment_status,
+                "payment_provider": a.payment_provider
+            }
+        })
+
+    # ==========================================================
+    # BLOKADY (PŁATNOŚĆ W TOKU)
+    # ==========================================================
+    for h in holds:
+        events.append({
+            "id": f"hold-{h.id}",
+            "title": f"⏳ {h.patient_first_name} {h.patient_last_name}",
+            "start": h.start.isoformat(),
+            "end": h.end.isoformat(),
+            "display": "block",
+            "backgroundColor": "#adb5bd",
+            "borderColor": "#adb5bd",
+            "editable": False,
+            "extendedProps": {
+                "hold_id": h.id,
+                "visit_type": h.visit_type,
+                "status": "hold"
             }
         })
 
@@ -551,12 +583,7 @@ def api_availability_calendar():
     # ==========================================================
     # ŚWIĘTA
     # ==========================================================
-    years = set(range(start.year, end.year + 1))
-
-    for d, name in holidays.PL(years=years).items():
-
-        if not (start.date() <= d < end.date()):
-            continue
+    for d, name in holiday_calendar.holidays_between(start.date(), end.date()):
 
         events.append({
             "id": f"holiday-{d}",
@@ -572,61 +599,123 @@ def api_availability_calendar():
             }
         })
 
-    current_app.logger.warning(
+    current_app.logger.debug(
         f"Calendar range: {start.date()} -> {end.date()} | "
         f"Appointments={len(appointments)} "
         f"Slots={len(slots)} "
+        f"Archived={len(archived)} "
         f"Vacations={len(vacations)} "
         f"Events={len(events)}"
     )
 
-    return jsonify(events)
+    return events
 
 
+# =================================================
+# API – GRAFIK NA ŻYWO (SSE)
+# =================================================
+@doctor_bp.route(
+    "/api/availability-calendar/stream",
+    endpoint="api_availability_calendar_stream"
+)
+@login_required
+def api_availability_calendar_stream():
+    """
+    Strumień SSE dla widoku kalendarza: zdarzenie "delta" z typami zmian
+    (wizyta utworzona / przeniesiona / anulowana / opłacona, slot
+    przełączony …) i aktualnymi zdarzeniami FullCalendar dni, których
+    dotyczą – bez przeładowania całego widoku.
+    """
+    if not availability_events.enabled():
+        return jsonify({"error": "Zmiany na żywo wyłączone"}), 404
 
-def _window_is_free_and_continuous(
-    doctor_id,
-    start,
-    end,
-    exclude_appointment_id=None
-):
-    # 1️⃣ SLOTY
-    required_slots = int((end - start).total_seconds() // 900)
+    try:
+        first_day = date.fromisoformat(request.args["start"][:10])
+        end_day = date.fromisoformat(request.args["end"][:10])
+    except (KeyError, ValueError):
+        return jsonify({"error": "Nieprawidłowy zakres"}), 400
 
-    slots = (
-        Availability.query
-        .filter(
-            Availability.doctor_id == doctor_id,
-            Availability.start >= start,
-            Availability.start < end,
-            Availability.active.is_(True)
-        )
-        .order_by(Availability.start)
-        .all()
+    if end_day <= first_day:
+        return jsonify({"error": "Nieprawidłowy zakres"}), 400
+
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        last_event_id = None
+
+    doctor_id = current_user.id
+
+    # nowy zakres w tej samej karcie zastępuje poprzedni strumień
+    tab = (request.args.get("tab") or "")[:40] or None
+
+    sub = availability_events.subscribe_calendar(
+        doctor_id, first_day, end_day, last_event_id, tab=tab
     )
 
-    if len(slots) != required_slots:
-        return False
+    # limit strumieni – kalendarz działa dalej na ręcznym odświeżaniu
+    if sub is None:
+        return jsonify({"error": "Zbyt wiele połączeń"}), 503
 
-    for i in range(1, len(slots)):
-        if slots[i].start != slots[i - 1].end:
-            return False
+    db.session.remove()
+    app = current_app._get_current_object()
 
-    # 2️⃣ KONFLIKT WIZYT – TYLKO scheduled
-    q = Appointment.query.filter(
-        Appointment.doctor_id == doctor_id,
-        Appointment.status == "scheduled",
-        Appointment.start < end,
-        Appointment.end > start
+    def stream():
+        try:
+            yield f"retry: 5000\nid: {sub.last_id}\nevent: ready\ndata: {{}}\n\n"
+
+            for event_id, days, changes in sub.events():
+                if event_id is None:
+                    yield ": ping\n\n"
+                    continue
+
+                start = datetime.combine(min(days), time.min)
+                end = datetime.combine(max(days) + timedelta(days=1), time.min)
+
+                with app.app_context():
+                    events = _calendar_events(doctor_id, start, end)
+                    db.session.remove()
+
+                payload = {
+                    "changes": [
+                        {"type": kind or "availability", "id": ref_id}
+                        for kind, ref_id in dict.fromkeys(changes)
+                    ],
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "events": events,
+                }
+
+                yield f"id: {event_id}\nevent: delta\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            availability_events.unsubscribe(sub)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
     )
 
-    if exclude_appointment_id:
-        q = q.filter(Appointment.id != exclude_appointment_id)
 
-    if q.first():
-        return False
+def _window_is_free_and_continuous(
+    doctor_id,
+    start,
+    end,
+    exclude_appointment_id=None
+):
+    # sloty (ciągłość + aktywność), wizyty – TYLKO scheduled – i blokady
+    # płatności online jako bitmapa dnia
+    availability = availability_engine.load_day(
+        doctor_id,
+        start.date(),
+        statuses=("scheduled",),
+        exclude_appointment_id=exclude_appointment_id
+    )
 
-    return True
+    minutes = int((end - start).total_seconds() // 60)
+    return availability.check(start, minutes) is None
 
 #------------------------------------------------------------------------------
 # Funkcja do potwierdzania płatności
@@ -667,6 +756,10 @@ def mark_paid(appointment_id):
     payment.status = "paid"
     payment.paid_at = datetime.utcnow()
 
+    availability_events.record_change(
+        appt.doctor_id, appt.start,
+        kind="appointment.paid", ref_id=appt.id
+    )
     db.session.commit()
 
     # 🔄 GOOGLE
@@ -676,7 +769,7 @@ def mark_paid(appointment_id):
         current_app.logger.warning(f"[GOOGLE AFTER PAY] {e}")
 
     # 📩 SMS
-    vt = VisitType.query.filter_by(code=appt.visit_type).first()
+    vt = visit_types.get(appt.visit_type)
     try:
         SMSService().send_confirmation(appt)
         if vt and vt.type == "meet":
@@ -777,14 +870,18 @@ def generate_schedule():
         active=True
     ).all()
 
-    def is_vacation_day(d):
-        return any(v.date_from <= d <= v.date_to for v in vacations)
+    # dni bez urlopu i święta – jedna maska na cały miesiąc
+    open_mask = holiday_calendar.open_days_mask(
+        start_date,
+        last,
+        closed_ranges=[(v.date_from, v.date_to) for v in vacations]
+    )
 
     d = start_date
     while d <= last:
 
         # ❌ urlop LUB święto państwowe - > brak slotow
-        if is_vacation_day(d) or is_polish_holiday(d):
+        if not open_mask[(d - start_date).days]:
             d += timedelta(days=1)
             continue
 
@@ -822,6 +919,9 @@ def generate_schedule():
 
         d += timedelta(days=1)
 
+    availability_events.record_change(
+        current_user.id, start_date, last, kind="slots.generated"
+    )
     db.session.commit()
     return jsonify({"status": "ok"})
 
@@ -863,6 +963,10 @@ def generate_day():
     if vacation:
         return jsonify({"error": "Ten dzień przypada na urlop"}), 400
 
+    # grafik dnia jest już w archiwum
+    if is_archived_day(current_user.id, day):
+        return jsonify({"error": "Grafik tego dnia jest zarchiwizowany"}), 400
+
     start = datetime.combine(day, start_time)
     end = datetime.combine(day, end_time)
 
@@ -881,6 +985,7 @@ def generate_day():
 
         current += timedelta(minutes=15)
 
+    availability_events.record_change(current_user.id, day, kind="slots.generated")
     db.session.commit()
 
     return jsonify({"status": "ok"})
@@ -904,6 +1009,9 @@ def toggle_availability():
     else:
         slot.active = not slot.active
 
+    availability_events.record_change(
+        current_user.id, slot.start, kind="slot.toggled", ref_id=slot.id
+    )
     db.session.commit()
     return jsonify({"status": "ok", "active": slot.active})
 
@@ -941,10 +1049,9 @@ def appointment_api(appointment_id):
         if not data.get(field):
             return jsonify({"error": f"Brak pola: {field}"}), 400
 
-    visit_type = VisitType.query.filter_by(
-        code=data["visit_type"],
-        active=True
-    ).first_or_404()
+    visit_type = visit_types.get(data["visit_type"], active=True)
+    if visit_type is None:
+        abort(404)
 
     appt.patient_first_name = data["first_name"].strip()
     appt.patient_last_name = data["last_name"].strip()
@@ -955,6 +1062,10 @@ def appointment_api(appointment_id):
     appt.end = appt.start + timedelta(minutes=visit_type.duration_minutes)
 
     #appt.google_sync_status = "pending"
+    availability_events.record_change(
+        appt.doctor_id, appt.start,
+        kind="appointment.updated", ref_id=appt.id
+    )
     db.session.commit()
 
     # 🔗 UPDATE GOOGLE CALENDAR
@@ -1037,6 +1148,11 @@ def move_appointment():
         return jsonify({"error": "Termin zajęty"}), 400
 
     # 1️⃣ ZAPIS LOKALNY
+    for day in (appt.start, new_start):
+        availability_events.record_change(
+            current_user.id, day, kind="appointment.moved", ref_id=appt.id
+        )
+
     appt.start = new_start
     appt.end = new_end
     db.session.commit()
@@ -1076,10 +1192,7 @@ def create_appointment_doctor():
     data = request.get_json() or {}
 
     # 1️⃣ typ wizyty
-    visit_type = VisitType.query.filter_by(
-        code=data.get("visit_type"),
-        active=True
-    ).first()
+    visit_type = visit_types.get(data.get("visit_type"), active=True)
 
     if not visit_type:
         return jsonify({"error": "Nieprawidłowy typ wizyty"}), 400
@@ -1138,7 +1251,7 @@ def create_appointment_doctor():
     ).first()
 
 
-    if conflict:
+    if conflict or has_active_hold(start, end, doctor_id=current_user.id):
         return jsonify({"error": "Termin zajęty"}), 400
 
     # 6️⃣ ZAPIS
@@ -1160,6 +1273,11 @@ def create_appointment_doctor():
 
 
     db.session.add(appt)
+    db.session.flush()
+
+    availability_events.record_change(
+        current_user.id, start, kind="appointment.created", ref_id=appt.id
+    )
     db.session.commit()
 
     # 🔗 AUTO-SYNC DO GOOGLE
@@ -1178,15 +1296,7 @@ def create_appointment_doctor():
 @doctor_bp.route("/visit-types/api")
 @login_required
 def visit_types_api():
-    types = (
-        VisitType.query
-        .filter_by(active=True)
-        .order_by(
-            VisitType.display_order_doctor.asc(),
-            VisitType.id.asc()
-        )
-        .all()
-    )
+    types = visit_types.listing(doctor_order=True)
 
     return jsonify([
         {
@@ -1207,12 +1317,7 @@ def visit_types_api():
 @doctor_bp.route("/visit-types/table-api")
 @login_required
 def visit_types_table_api():
-    types = (
-        VisitType.query
-        .filter_by(active=True)
-        .order_by(VisitType.display_order.asc(), VisitType.id.asc())
-        .all()
-    )
+    types = visit_types.listing()
 
     return jsonify([
         {
@@ -1247,12 +1352,7 @@ def vacations_view():
 @doctor_bp.route("/vacations/api", methods=["GET"])
 @login_required
 def list_vacations():
-    vacations = (
-        Vacation.query
-        .filter_by(doctor_id=current_user.id)
-        .order_by(Vacation.date_from.desc())
-        .all()
-    )
+    vacations = read_models.vacations(current_user.id, newest_first=True)
 
     return jsonify([
         {
@@ -1297,6 +1397,10 @@ def create_vacation():
         synchronize_session=False
     )
 
+    availability_events.record_change(
+        current_user.id, v.date_from, v.date_to,
+        kind="vacation.changed", ref_id=v.id
+    )
     db.session.commit()
 
     return jsonify({"status": "ok", "id": v.id})
@@ -1311,6 +1415,12 @@ def update_vacation(vacation_id):
 
     data = request.get_json()
 
+    # poprzedni zakres też się zmienia (skrócony / przesunięty urlop)
+    availability_events.record_change(
+        current_user.id, v.date_from, v.date_to,
+        kind="vacation.changed", ref_id=v.id
+    )
+
     v.date_from = datetime.strptime(data["date_from"], "%Y-%m-%d").date()
     v.date_to = datetime.strptime(data["date_to"], "%Y-%m-%d").date()
     v.description = data.get("description")
@@ -1326,6 +1436,10 @@ def update_vacation(vacation_id):
         synchronize_session=False
     )
 
+    availability_events.record_change(
+        current_user.id, v.date_from, v.date_to,
+        kind="vacation.changed", ref_id=v.id
+    )
     db.session.commit()
 
     return jsonify({"status": "ok"})
@@ -1339,6 +1453,10 @@ def toggle_vacation(vacation_id):
     ).first_or_404()
 
     v.active = not v.active
+    availability_events.record_change(
+        current_user.id, v.date_from, v.date_to,
+        kind="vacation.changed", ref_id=v.id
+    )
     db.session.commit()
     return jsonify({"status": "ok", "active": v.active})
 
@@ -1350,6 +1468,10 @@ def delete_vacation(vacation_id):
         doctor_id=current_user.id
     ).first_or_404()
 
+    availability_events.record_change(
+        current_user.id, v.date_from, v.date_to,
+        kind="vacation.changed", ref_id=v.id
+    )
     db.session.delete(v)
     db.session.commit()
     return jsonify({"status": "ok"})
@@ -1529,6 +1651,10 @@ def blacklist_from_appointment_ajax(appointment_id):
         appt.status = "cancelled"
         appt.cancelled_by = "doctor"
         appt.cancelled_at = datetime.utcnow()
+        availability_events.record_change(
+            appt.doctor_id, appt.start,
+            kind="appointment.cancelled", ref_id=appt.id
+        )
 
     db.session.commit()
     try:
@@ -1596,12 +1722,7 @@ def statistics():
     # ==========================================================
     stats = {m: {} for m in range(1, 13)}
 
-    visit_types = (
-        VisitType.query
-        .filter_by(active=True)
-        .order_by(VisitType.display_order.asc(), VisitType.id.asc())
-        .all()
-    )
+    active_types = visit_types.listing()
 
     visit_rows = (
         db.session.query(
@@ -1692,6 +1813,11 @@ def statistics():
             .scalar() or 0
         )
 
+        # przeszłe dni w availability_archive
+        availabilities_archived, _ = archived_counts(doctor_id)
+        availabilities_total += availabilities_archived
+        availabilities_past += availabilities_archived
+
         # ===== APPOINTMENTS =====
         appointments_total = (
             db.session.query(func.count(Appointment.id))
@@ -1738,16 +1864,7 @@ def statistics():
         )
 
         # ===== LISTA S❗ =====
-        overdue_appointments = (
-            Appointment.query
-            .filter(
-                Appointment.doctor_id == doctor_id,
-                Appointment.status == "scheduled",
-                Appointment.end < now
-            )
-            .order_by(Appointment.start.desc())
-            .all()
-        )
+        overdue_appointments = read_models.overdue_appointments(doctor_id, now)
 
         # ===== SMS TOTAL =====
         sms_messages_total = (
@@ -1788,6 +1905,7 @@ def statistics():
         jarek_stats = {
             "availabilities_total": availabilities_total,
             "availabilities_past": availabilities_past,
+            "availabilities_archived": availabilities_archived,
 
             "appointments_total": appointments_total,
             "appointments_completed": appointments_completed,
@@ -1813,7 +1931,7 @@ def statistics():
         year=year,
         current_year=current_year,
         tab=tab,
-        visit_types=visit_types,
+        visit_types=active_types,
         stats=stats,
         sms_stats=sms_stats,
         email_stats=email_stats,
@@ -1925,7 +2043,8 @@ def calendar():
     return render_template(
         "doctor/availability_calendar.html",
         active_page="calendar",
-        hidden_days=hidden_days
+        hidden_days=hidden_days,
+        live_updates=availability_events.enabled()
     )
 
 # ───────────────────────────────────────
@@ -1993,12 +2112,8 @@ def sms_retry(sms_id):
     sms = SMSMessage.query.get_or_404(sms_id)
     appointment = Appointment.query.get_or_404(sms.appointment_id)
 
-    service = SMSService()
-
-    if sms.type == "confirmation":
-        service.send_confirmation(appointment)
-    elif sms.type == "reminder":
-        service.send_reminder(appointment)
+    # ponowna wysyłka tej samej wiadomości (szablon + parametry z logu)
+    SMSService().retry(sms)
 
     flash("Ponowiono wysyłkę SMS", "success")
     return redirect(url_for("doctor.sms_list"))
@@ -2018,9 +2133,7 @@ def appointment_details(appointment_id):
         .first_or_404()
     )
 
-    visit_type = VisitType.query.filter_by(
-        code=appt.visit_type
-    ).first()
+    visit_type = visit_types.get(appt.visit_type)
 
     sms_messages = (
         SMSMessage.query
@@ -2283,17 +2396,39 @@ def email_retry(email_id):
     )
 
     from utils.email_service import EmailService
-    service = EmailService()
 
-    if email.type == "confirmation":
-        service.send_confirmation(appointment)
-
-    elif email.type == "reminder":
-        service.send_reminder(appointment)
-
-    elif email.type == "payment_retry":
-        service.send_payment_retry(appointment)
+    # ponowna wysyłka tej samej wiadomości (szablon + parametry z logu)
+    EmailService().retry(email)
 
     flash("Ponowiono wysyłkę email", "doctor-success")
 
     return redirect(url_for("doctor.email_list"))
+
+
+# ───────────────────────────────────────
+# DOSTAWCY ZEWNĘTRZNI – CIRCUIT BREAKER
+# ───────────────────────────────────────
+
+@doctor_bp.route("/providers")
+@login_required
+def providers_status():
+    from utils import circuit_breaker
+
+    # stan per proces (worker, który obsłużył request)
+    return jsonify({
+        "pid": os.getpid(),
+        "providers": circuit_breaker.snapshot()
+    })
+
+
+@doctor_bp.route("/providers/<provider>/reset", methods=["POST"])
+@login_required
+def providers_reset(provider):
+    from utils import circuit_breaker
+
+    if provider not in circuit_breaker.PROVIDERS:
+        abort(404)
+
+    circuit_breaker.reset(provider)
+
+    return jsonify({"status": "ok", "provider": provider})
@@ -1,15 +1,19 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app
-from datetime import datetime, timedelta, time
+from flask import Blueprint, Response, render_template, request, jsonify, redirect, url_for, flash, current_app
+from datetime import datetime, date, timedelta, time
+import json
 import uuid
 
 from extensions import db
-from models import Availability, Appointment, VisitType, Vacation, Payment, GoogleCalendarError
+from models import Appointment, Vacation, Payment, GoogleCalendarError
 from utils.cancel_policy import can_cancel_appointment
 from utils.sms_service import SMSService
 from utils.blacklist import is_phone_blacklisted
 from utils.google_calendar import GoogleCalendarService
 from utils.email_service import EmailService
 from utils.ip import get_client_ip
+from utils.slot_holds import create_hold
+from utils import availability_engine, availability_events, visit_types
+from utils.http_cache import versioned_json, availability_version
 from flask import make_response
 
 
@@ -20,13 +24,6 @@ patient_bp = Blueprint(
 )
 
 
-# ───────────────────────────────────────
-# KONFIGURACJA
-# ───────────────────────────────────────
-
-SLOT_MINUTES = 15
-
-
 # ───────────────────────────────────────
 # STRONA GŁÓWNA PACJENTA
 # ───────────────────────────────────────
@@ -34,7 +31,10 @@ SLOT_MINUTES = 15
 @patient_bp.route("/")
 def index():
     response = make_response(
-        render_template("patient/index.html")
+        render_template(
+            "patient/index.html",
+            live_updates=availability_events.enabled()
+        )
     )
 
     response.headers["Cache-Control"] = "no-store"
@@ -51,45 +51,28 @@ def index():
 
 @patient_bp.route("/api/visit-types")
 def api_visit_types():
-    visit_types = (
-        VisitType.query
-        .filter_by(active=True)
-        .order_by(VisitType.display_order.asc(), VisitType.id.asc())
-        .all()
-    )
-
-    return jsonify([
-        {
-            "name": vt.name,
-            "code": vt.code,
-            "duration_minutes": vt.duration_minutes,
-            "price": float(vt.price) if vt.price is not None else None,
-            "color": vt.color,
-            "only_online_payment": bool(vt.only_online_payment)
-        }
-        for vt in visit_types
-    ])
-
-
 
-# ───────────────────────────────────────
-# HELPER: AKTYWNY URLOP
-# ───────────────────────────────────────
+    def build():
+        return [
+            {
+                "name": vt.name,
+                "code": vt.code,
+                "duration_minutes": vt.duration_minutes,
+                "price": float(vt.price) if vt.price is not None else None,
+                "color": vt.color,
+                "only_online_payment": bool(vt.only_online_payment)
+            }
+            for vt in visit_types.listing()
+        ]
 
-def is_active_vacation_day(day):
-    return (
-        Vacation.query
-        .filter(
-            Vacation.doctor_id == 1,
-            Vacation.active == 1,
-            Vacation.date_from <= day,
-            Vacation.date_to >= day
-        )
-        .first()
-        is not None
+    # typy wizyt zmieniają się rzadko – dłuższy cache
+    return versioned_json(
+        visit_types.version(), build,
+        max_age=60, stale_while_revalidate=600
     )
 
 
+
 # ───────────────────────────────────────
 # API: DOSTĘPNE DNI (POPRAWIONE)
 # ───────────────────────────────────────
@@ -103,12 +86,11 @@ def api_days():
     if not visit_code or not year or not month:
         return jsonify([])
 
-    vt = VisitType.query.filter_by(code=visit_code, active=True).first()
+    vt = visit_types.get(visit_code, active=True)
     if not vt:
         return jsonify([])
 
     visit_minutes = vt.duration_minutes
-    required_slots = visit_minutes // SLOT_MINUTES
 
     # ⛔ BLOKADA: tylko od jutra
     today = datetime.now().date()
@@ -122,87 +104,229 @@ def api_days():
         month_end = datetime(year, month + 1, 1)
 
     # ───────────────────────────────────
-    # ⬇️ WSZYSTKIE ZAPYTANIA SQL TYLKO TUTAJ
+    # ⬇️ CAŁY MIESIĄC JAKO BITMAPY (4 zapytania)
     # ───────────────────────────────────
 
-    slots = (
-        Availability.query
-        .filter(
-            Availability.start >= month_start,
-            Availability.start < month_end,
-            Availability.active.is_(True)
-        )
-        .order_by(Availability.start)
-        .all()
-    )
+    def build():
+        availability = availability_engine.load(1, month_start.date(), month_end.date())
 
-    appointments = (
-        Appointment.query
-        .filter(
-            Appointment.status.in_(["scheduled", "completed"]),
-            Appointment.start < month_end,
-            Appointment.end > month_start
-        )
-        .all()
+        days = {
+            d.isoformat()
+            for d in availability.days_with_start(visit_minutes, min_day=min_day)
+        }
+
+        return sorted(days)
+
+    # rezerwacja i tak sprawdza termin – chwilowo nieaktualny dzień jest bezpieczny
+    return versioned_json(
+        (vt.updated_at, availability_version()), build,
+        stale_while_revalidate=30
     )
 
-    vacations = (
-        Vacation.query
-        .filter(
-            Vacation.doctor_id == 1,
-            Vacation.active == 1,
-            Vacation.date_from < month_end,
-            Vacation.date_to >= month_start
-        )
-        .all()
+
+# ───────────────────────────────────────
+# API: MIESIĄC W JEDNEJ ODPOWIEDZI (DNI + GODZINY)
+# ───────────────────────────────────────
+
+@patient_bp.route("/api/month")
+def api_month():
+    """
+    Dni z wolnym terminem i proponowane godziny każdego z nich
+    z jednej mapy dostępności – klikanie po dniach bez kolejnych żądań.
+    """
+    visit_code = request.args.get("visit_type")
+    year = request.args.get("year", type=int)
+    month = request.args.get("month", type=int)
+
+    if not visit_code or not year or not month or not 1 <= month <= 12:
+        return jsonify({"days": [], "hours": {}})
+
+    vt = visit_types.get(visit_code, active=True)
+    if not vt:
+        return jsonify({"days": [], "hours": {}})
+
+    # ⛔ BLOKADA: tylko od jutra
+    min_day = datetime.now().date() + timedelta(days=1)
+
+    month_start = date(year, month, 1)
+    month_end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+    def build():
+        availability = availability_engine.load(1, month_start, month_end)
+
+        hours = {
+            d.isoformat(): _pick_hours(availability, d, vt.duration_minutes)
+            for d in availability.days_with_start(vt.duration_minutes, min_day=min_day)
+        }
+
+        return {"days": sorted(hours), "hours": hours}
+
+    return versioned_json(
+        (vt.updated_at, availability_version()), build,
+        stale_while_revalidate=30
     )
 
-    # ───────────────────────────────────
-    # ⬇️ LOKALNE HELPERY (BEZ SQL)
-    # ───────────────────────────────────
 
-    def has_conflict_local(start, end):
-        for appt in appointments:
-            if appt.start < end and appt.end > start:
-                return True
-        return False
+# ───────────────────────────────────────
+# API: ZMIANY MIESIĄCA NA ŻYWO (SSE)
+# ───────────────────────────────────────
 
-    def is_vacation_local(day):
-        for v in vacations:
-            if v.date_from <= day <= v.date_to:
-                return True
-        return False
+def _changed_days(visit_minutes, days):
+    """
+    Zmienione dni: "hours" – proponowane godziny (jak /api/month),
+    "starts" – wszystkie wolne początki (czy wybrana godzina jest nadal
+    wolna); [] = dzień już niedostępny.
+    """
+    min_day = datetime.now().date() + timedelta(days=1)
+    first, last = min(days), max(days)
 
-    # ───────────────────────────────────
-    # ⬇️ GŁÓWNA LOGIKA
-    # ───────────────────────────────────
+    availability = availability_engine.load(1, first, last + timedelta(days=1))
+    open_days = set(availability.days_with_start(visit_minutes, min_day=min_day))
 
-    days = set()
+    hours, starts = {}, {}
 
-    for i in range(len(slots)):
-        window = slots[i:i + required_slots]
-        if len(window) < required_slots:
+    for d in sorted(days):
+        key = d.isoformat()
+
+        if d not in open_days:
+            hours[key] = starts[key] = []
             continue
 
-        # ciągłość slotów
-        for j in range(1, len(window)):
-            if window[j].start != window[j - 1].end:
-                break
-        else:
-            start = window[0].start
-            end = start + timedelta(minutes=visit_minutes)
-            day_date = start.date()
+        hours[key] = _pick_hours(availability, d, visit_minutes)
+        starts[key] = [
+            s.strftime("%H:%M")
+            for s in availability.starts_on(d, visit_minutes)
+        ]
+
+    return {"hours": hours, "starts": starts}
+
+
+def _changed_days_json(app, visit_minutes, days):
+    with app.app_context():
+        try:
+            return json.dumps(_changed_days(visit_minutes, days))
+        finally:
+            db.session.remove()
+
 
-            # ⛔ BLOKADA: dziś niedostępne
-            if day_date < min_day:
-                continue
+@patient_bp.route("/api/month/stream")
+def api_month_stream():
+    """
+    Strumień SSE dla miesiąca i typu wizyty: zdarzenie "days" z nowymi
+    godzinami dni, w których ktoś zarezerwował / zwolnił termin albo
+    lekarz zmienił grafik.
+    """
+    if not availability_events.enabled():
+        return jsonify({"error": "Zmiany na żywo wyłączone"}), 404
 
-            if not is_vacation_local(day_date) and not has_conflict_local(start, end):
-                days.add(day_date.isoformat())
+    visit_code = request.args.get("visit_type")
+    year = request.args.get("year", type=int)
+    month = request.args.get("month", type=int)
+
+    if not visit_code or not year or not month or not 1 <= month <= 12:
+        return jsonify({"error": "Brak danych"}), 400
+
+    vt = visit_types.get(visit_code, active=True)
+    if not vt:
+        return jsonify({"error": "Nieprawidłowy typ wizyty"}), 400
 
-    return jsonify(sorted(days))
+    visit_minutes = vt.duration_minutes
+
+    month_start = date(year, month, 1)
+    month_end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        last_event_id = None
 
+    sub = availability_events.subscribe(1, month_start, month_end, last_event_id)
 
+    # limit strumieni – strona działa dalej na /api/month
+    if sub is None:
+        return jsonify({"error": "Zbyt wiele połączeń"}), 503
+
+    db.session.remove()
+    app = current_app._get_current_object()
+
+    def stream():
+        try:
+            # id od razu – po zerwaniu połączenia Last-Event-ID odtworzy zaległe zmiany
+            yield f"retry: 5000\nid: {sub.last_id}\nevent: ready\ndata: {{}}\n\n"
+
+            for event_id, days, _ in sub.events():
+                if event_id is None:
+                    yield ": ping\n\n"
+                    continue
+
+                # strumienie z tą samą zmianą i długością wizyty – jedno zapytanie
+                data = availability_events.shared_payload(
+                    ("days", event_id, visit_minutes, frozenset(days)),
+                    lambda: _changed_days_json(app, visit_minutes, days)
+                )
+
+                yield f"id: {event_id}\nevent: days\ndata: {data}\n\n"
+        finally:
+            availability_events.unsubscribe(sub)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+# ───────────────────────────────────────
+# API: NAJBLIŻSZY WOLNY TERMIN
+# ───────────────────────────────────────
+
+@patient_bp.route("/api/first-available")
+def api_first_available():
+    visit_code = request.args.get("visit_type")
+    after_raw = request.args.get("after")
+    limit = request.args.get("limit", default=1, type=int)
+
+    if not visit_code:
+        return jsonify({"terms": []})
+
+    vt = visit_types.get(visit_code, active=True)
+    if not vt:
+        return jsonify({"terms": []})
+
+    # ⛔ BLOKADA: tylko od jutra (jak api_days)
+    today = datetime.now().date()
+    after = datetime.combine(today + timedelta(days=1), time.min)
+
+    if after_raw:
+        try:
+            after = max(after, datetime.fromisoformat(after_raw).replace(tzinfo=None))
+        except ValueError:
+            return jsonify({"error": "Nieprawidłowa data"}), 400
+
+    # dalej niż horyzont wyszukiwania od dziś – nie szukamy
+    # (i nie liczymy dat poza zakresem datetime, np. 9999-12-31)
+    after = min(
+        after,
+        datetime.combine(today + timedelta(days=availability_engine.SEARCH_HORIZON_DAYS), time.min)
+    )
+
+    starts, searched_until = availability_engine.first_available(
+        1,
+        vt.duration_minutes,
+        after,
+        limit
+    )
+
+    return jsonify({
+        "terms": [
+            {"day": s.strftime("%Y-%m-%d"), "hour": s.strftime("%H:%M")}
+            for s in starts
+        ],
+        "searched_until": searched_until.isoformat()
+    })
 
 
 @patient_bp.route("/api/hours")
@@ -215,77 +339,48 @@ def api_hours():
 
     day = datetime.strptime(day_str, "%Y-%m-%d").date()
 
-    if is_active_vacation_day(day):
-        return jsonify([])
-
-    visit_type = VisitType.query.filter_by(code=visit_code, active=True).first()
+    visit_type = visit_types.get(visit_code, active=True)
     if not visit_type:
         return jsonify([])
 
-    visit_minutes = visit_type.duration_minutes
-    required_slots = visit_minutes // SLOT_MINUTES
+    def build():
+        # ───── sloty, wizyty i blokady dnia jako bitmapa
+        availability = availability_engine.load_day(1, day)
 
-    # ───── dostępne sloty dnia
-    slots = (
-        Availability.query
-        .filter(
-            Availability.doctor_id == 1,
-            Availability.start >= datetime.combine(day, time.min),
-            Availability.start < datetime.combine(day + timedelta(days=1), time.min),
-            Availability.active.is_(True)
-        )
-        .order_by(Availability.start)
-        .all()
-    )
+        return _pick_hours(availability, day, visit_type.duration_minutes)
 
-    # ───── istniejące wizyty
-    appointments = (
-        Appointment.query
-        .filter(
-            Appointment.status.in_(["scheduled", "completed"]),
-            Appointment.start >= datetime.combine(day, time.min),
-            Appointment.start < datetime.combine(day + timedelta(days=1), time.min)
-        )
-        .all()
+    return versioned_json(
+        (visit_type.updated_at, availability_version()), build,
+        stale_while_revalidate=30
     )
 
-    is_empty_day = len(appointments) == 0
 
-    # ✅ JEDYNE ŹRÓDŁO PRAWDY – dozwolone minuty startu
-    def is_nice_start(start):
-        if visit_minutes == 60:
-            return start.minute == 0
-        if visit_minutes == 30:
-            return start.minute in (0, 30)
-        if visit_minutes == 45:
-            return start.minute in (0, 15)
-        return True
+def _pick_hours(availability, day, visit_minutes):
+    """
+    Do 5 proponowanych godzin startu ("HH:MM") dnia z mapy dostępności.
+    """
+    if availability.is_closed(day):
+        return []
 
-    candidates = []
-    all_starts = []
+    # ───── istniejące wizyty (do doklejania nowych)
+    appointments = availability.busy_on(day)
 
-    for i in range(len(slots)):
-        window = slots[i:i + required_slots]
-        if len(window) < required_slots:
-            continue
+    is_empty_day = len(appointments) == 0
 
-        if not _window_is_free_and_continuous(window):
-            continue
+    candidates = []
+    all_starts = []
 
-        start = window[0].start
+    # ✅ wolne okna + dozwolone minuty startu (NICE_START_MINUTES)
+    for start in availability.starts_on(day, visit_minutes):
         end = start + timedelta(minutes=visit_minutes)
 
-        # ⛔ twarda blokada złych minut (ZAWSZE)
-        if not is_nice_start(start):
-            continue
-
         score = 0
 
         if not is_empty_day:
-            for appt in appointments:
-                if appt.end == start:
+            for appt_start, appt_end in appointments:
+                if appt_end == start:
                     score += 50   # doklejenie po
-                if appt.start == end:
+                if appt_start == end:
                     score += 40   # doklejenie przed
 
         if start.hour <= 12:
@@ -315,7 +410,7 @@ def api_hours():
         picked = [all_starts[i] for i in idx if 0 <= i < len(all_starts)]
         picked = sorted(set(picked))
 
-        return jsonify([dt.strftime("%H:%M") for dt in picked[:5]])
+        return [dt.strftime("%H:%M") for dt in picked[:5]]
 
     # ───── NORMALNY TRYB (SCORING)
     candidates.sort(key=lambda x: (-x["score"], x["start"]))
@@ -325,7 +420,7 @@ def api_hours():
     # ✅ KOŃCOWE SORTOWANIE PREZENTACYJNE
     chosen.sort()
 
-    return jsonify([dt.strftime("%H:%M") for dt in chosen])
+    return [dt.strftime("%H:%M") for dt in chosen]
 
 # ───────────────────────────────────────
 # REZERWACJA WIZYTY
@@ -345,10 +440,7 @@ def reserve():
     payment_flow = request.form.get("payment_flow", "reserve")
     payment_method = request.form.get("payment_method")
 
-    visit_type = VisitType.query.filter_by(
-        code=visit_code,
-        active=True
-    ).first()
+    visit_type = visit_types.get(visit_code, active=True)
 
     # ─────────────────────────
     # WALIDACJE
@@ -373,7 +465,6 @@ def reserve():
         return redirect(url_for("patient.index"))
 
     visit_minutes = visit_type.duration_minutes
-    required_slots = visit_minutes // SLOT_MINUTES
 
     try:
         start = datetime.strptime(
@@ -386,41 +477,27 @@ def reserve():
         flash("Nieprawidłowa data", "patient-danger")
         return redirect(url_for("patient.index"))
 
-    if is_active_vacation_day(start.date()):
-        if is_ajax:
-            return jsonify({"error": "Termin niedostępny"}), 400
-        flash("Termin niedostępny", "patient-danger")
-        return redirect(url_for("patient_.index"))
-
     # ─────────────────────────
     # SPRAWDZENIE SLOTÓW (bez locka)
+    # urlop, aktywne sloty, wizyty i blokady – bitmapa dnia
     # ─────────────────────────
 
-    slots = (
-        Availability.query
-        .filter(
-            Availability.start >= start,
-            Availability.start < start + timedelta(minutes=visit_minutes),
-            Availability.active.is_(True)
-        )
-        .order_by(Availability.start)
-        .all()
-    )
+    doctor_id = 1
 
-    if len(slots) != required_slots:
+    problem = availability_engine.load_day(doctor_id, start.date()).check(start, visit_minutes)
+
+    if problem == availability_engine.UNAVAILABLE:
         if is_ajax:
             return jsonify({"error": "Termin niedostępny"}), 400
         flash("Termin niedostępny", "patient-danger")
         return redirect(url_for("patient.index"))
 
-    if not _window_is_free_and_continuous(slots):
+    if problem == availability_engine.OCCUPIED:
         if is_ajax:
             return jsonify({"error": "Termin zajęty"}), 400
         flash("Termin zajęty", "patient-danger")
         return redirect(url_for("patient.index"))
 
-    doctor_id = slots[0].doctor_id
-
     if is_phone_blacklisted(doctor_id, phone):
         msg = (
             "Rezerwacja wizyty przez stronę jest niedostępna. "
@@ -431,6 +508,34 @@ def reserve():
         flash(msg, "patient-danger")
         return redirect(url_for("patient.index"))
 
+    # ─────────────────────────
+    # P24 → TYLKO BLOKADA TERMINU
+    # wizyta powstaje dopiero po opłaceniu (payments.payment_status),
+    # porzucona płatność po prostu wygasa – bez anulowania i bez Google
+    # ─────────────────────────
+
+    if payment_flow == "online" and payment_method == "p24":
+        hold = create_hold(
+            doctor_id=doctor_id,
+            start=start,
+            visit_type=visit_type,
+            first_name=request.form.get("first_name"),
+            last_name=request.form.get("last_name"),
+            phone=phone,
+            email=email,
+            client_ip=get_client_ip()
+        )
+
+        availability_events.record_change(
+            doctor_id, start, kind="hold.created", ref_id=hold.id
+        )
+        db.session.commit()
+
+        return jsonify({
+            "success": True,
+            "hold_token": hold.token
+        })
+
     # ─────────────────────────
     # TWORZENIE WIZYTY
     # ─────────────────────────
@@ -476,6 +581,9 @@ def reserve():
 
         db.session.add(payment)
 
+    availability_events.record_change(
+        doctor_id, start, kind="appointment.created", ref_id=appointment.id
+    )
     db.session.commit()
 
     # ─────────────────────────
@@ -549,12 +657,6 @@ def reserve():
         )
         return redirect(url_for("patient.index"))
 
-    if payment_flow == "online" and payment_method == "p24":
-        return jsonify({
-            "success": True,
-            "appointment_id": appointment.id
-        })
-
     # PŁATNOŚĆ W GABINECIE
     try:
         SMSService().send_confirmation(appointment)
@@ -569,31 +671,6 @@ def reserve():
     flash("Wizyta została zarezerwowana", "patient-success")
     return redirect(url_for("patient.index"))
 
-# ───────────────────────────────────────
-# FUNKCJE POMOCNICZE
-# ───────────────────────────────────────
-
-def _window_is_free_and_continuous(slots):
-    for i in range(1, len(slots)):
-        if slots[i].start != slots[i - 1].end:
-            return False
-
-    start = slots[0].start
-    end = slots[-1].end
-
-    conflict = (
-        Appointment.query
-        .filter(
-            Appointment.status.in_(["scheduled", "completed"]),
-            Appointment.start < end,
-            Appointment.end > start
-        )
-        .first()
-    )
-
-    return conflict is None
-
-
 # ───────────────────────────────────────
 # ANULOWANIE WIZYTY – LINK Z TOKENEM
 # ───────────────────────────────────────
@@ -640,6 +717,10 @@ def cancel_by_token(token):
     appointment.cancelled_by = "patient"
     appointment.cancelled_at = db.func.now()
 
+    availability_events.record_change(
+        appointment.doctor_id, appointment.start,
+        kind="appointment.cancelled", ref_id=appointment.id
+    )
     db.session.commit()
 
     try:
@@ -693,6 +774,14 @@ def vacation_status():
     except ValueError:
         return jsonify({"is_vacation": False})
 
+    # baner na stronie głównej – urlopy zmieniają się rzadko
+    return versioned_json(
+        availability_version(), lambda: _vacation_status(today),
+        max_age=60, stale_while_revalidate=300
+    )
+
+
+def _vacation_status(today):
     vacation = (
         Vacation.query
         .filter(
@@ -705,7 +794,7 @@ def vacation_status():
     )
 
     if not vacation:
-        return jsonify({"is_vacation": False})
+        return {"is_vacation": False}
 
     # 🔴 TYLKO JEDEN DZIEŃ = DZIŚ
     if vacation.date_from == today and vacation.date_to == today:
@@ -731,10 +820,10 @@ def vacation_status():
             "Please contact us via the contact form in the Contact section."
         )
 
-    return jsonify({
+    return {
         "is_vacation": True,
         "message_pl": message_pl,
         "message_en": message_en
-    })
+    }
 
 
@@ -1,8 +1,6 @@
 import uuid
 import json
 import hashlib
-import requests
-import base64
 
 PL_MAP = str.maketrans({
     "ą": "a", "ć": "c", "ę": "e", "ł": "l",
@@ -22,8 +20,13 @@ from utils.sms_service import SMSService
 from utils.email_service import EmailService
 from flask import Blueprint, request, jsonify, current_app, render_template
 from extensions import db
-from models import Appointment, Payment, VisitType
+from models import Appointment, Payment
 from utils.google_calendar import GoogleCalendarService
+from utils.slot_holds import get_hold, convert_hold
+from utils import availability_events, visit_types
+from utils.http_clients import get_client
+from utils.circuit_breaker import ProviderUnavailable
+from requests import RequestException
 
 
 payments_bp = Blueprint(
@@ -39,27 +42,42 @@ payments_bp = Blueprint(
 def init_payment():
 
     data = request.get_json() or {}
+    hold_token = data.get("hold_token")
     appointment_id = data.get("appointment_id")
 
-    if not appointment_id:
-        return jsonify({"error": "appointment_id required"}), 400
+    # ⏳ NOWY FLOW: płatność za blokadę terminu (SlotHold)
+    if hold_token:
+        hold = get_hold(hold_token)
 
-    appointment = Appointment.query.get_or_404(appointment_id)
+        if not hold:
+            return jsonify({"error": "Hold not found"}), 404
 
-    if appointment.status != "scheduled":
-        return jsonify({"error": "Invalid appointment status"}), 400
+        if not hold.is_active():
+            return jsonify({"error": "Hold expired"}), 400
 
-    visit_type = VisitType.query.filter_by(
-        code=appointment.visit_type,
-        active=True
-    ).first()
+        visit_code = hold.visit_type
+        owner = {"hold_id": hold.id}
+
+    else:
+        if not appointment_id:
+            return jsonify({"error": "appointment_id required"}), 400
+
+        appointment = Appointment.query.get_or_404(appointment_id)
+
+        if appointment.status != "scheduled":
+            return jsonify({"error": "Invalid appointment status"}), 400
+
+        visit_code = appointment.visit_type
+        owner = {"appointment_id": appointment.id}
+
+    visit_type = visit_types.get(visit_code, active=True)
 
     if not visit_type or not visit_type.price or visit_type.price <= 0:
         return jsonify({"error": "Visit type not payable"}), 400
     
     existing = Payment.query.filter_by(
-        appointment_id=appointment.id,
-        provider="przelewy24"
+        provider="przelewy24",
+        **owner
     ).filter(
         Payment.status.in_(["init", "pending"])
     ).first()
@@ -75,12 +93,12 @@ def init_payment():
     session_id = uuid.uuid4().hex
 
     payment = Payment(
-        appointment_id=appointment.id,
         provider="przelewy24",
         provider_session_id=session_id,
         amount=amount_int,
         currency="PLN",
-        status="init"
+        status="init",
+        **owner
     )
 
     db.session.add(payment)
@@ -108,21 +126,24 @@ def register_payment():
     if payment.status != "init":
         return jsonify({"error": "Invalid payment status"}), 400
 
+    if payment.appointment is None and (
+        payment.hold is None or not payment.hold.is_active()
+    ):
+        return jsonify({"error": "Hold expired"}), 400
+
     cfg = current_app.config
     payload = _build_p24_payload(payment)
 
-    auth_raw = f"{cfg['P24_POS_ID']}:{cfg['P24_API_KEY']}"
-    auth_b64 = base64.b64encode(auth_raw.encode()).decode()
-
-    r = requests.post(
-        cfg["P24_REGISTER_URL"],
-        json=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {auth_b64}",
-        },
-        timeout=15
-    )
+    try:
+        r = get_client("p24").register(
+            cfg["P24_REGISTER_URL"],
+            payload,
+            pos_id=cfg["P24_POS_ID"],
+            api_key=cfg["P24_API_KEY"]
+        )
+    except (ProviderUnavailable, RequestException) as e:
+        current_app.logger.error(f"[P24] register unavailable: {e}")
+        return jsonify({"error": "Payment provider unavailable"}), 503
 
     if r.status_code != 200:
         current_app.logger.error(f"[P24] register HTTP {r.status_code} {r.text}")
@@ -252,7 +273,14 @@ def payment_status():
     # ==================================================
     # VERIFY CALL
     # ==================================================
-    if not _p24_verify_transaction(payment):
+    try:
+        verified = _p24_verify_transaction(payment)
+    except (ProviderUnavailable, RequestException) as e:
+        # bez zmiany statusu – P24 ponowi powiadomienie
+        current_app.logger.error(f"[P24 VERIFY] unavailable: {e}")
+        return "ERROR", 503
+
+    if not verified:
         payment.status = "failed"
         db.session.commit()
 
@@ -272,10 +300,21 @@ def payment_status():
 
     appointment = payment.appointment
 
+    # ⏳ blokada terminu → dopiero teraz powstaje wizyta
+    if appointment is None and payment.hold is not None:
+        appointment = convert_hold(payment.hold)
+
     # 🔒 jeśli ktoś anulował wizytę w międzyczasie – nie przywracamy jej
-    if appointment and appointment.status != "cancelled":
+    elif appointment and appointment.status != "cancelled":
         appointment.status = "scheduled"
 
+    # 📡 kalendarz lekarza (blokada → opłacona wizyta)
+    if appointment:
+        availability_events.record_change(
+            appointment.doctor_id, appointment.start,
+            kind="appointment.paid", ref_id=appointment.id
+        )
+
     db.session.commit()
 
     current_app.logger.warning(f"[P24 STATUS] Payment {payment.id} marked as PAID")
@@ -287,6 +326,14 @@ def payment_status():
         )
         return "OK", 200
 
+    # 🔒 termin zajęty po wygaśnięciu blokady → wizyta anulowana, do zwrotu
+    if payment.hold is not None and appointment.status == "cancelled":
+        current_app.logger.warning(
+            f"[P24 STATUS] Hold {payment.hold.id} expired and slot taken – "
+            f"appointment {appointment.id} cancelled, payment to refund"
+        )
+        return "OK", 200
+
     # ==================================================
     # 🔄 GOOGLE UPDATE (PENDING → CONFIRMED)
     # ==================================================
@@ -300,7 +347,7 @@ def payment_status():
     # ==================================================
     # 📩 WYŚLIJ POTWIERDZENIE (TYLKO PO PŁATNOŚCI ONLINE)
     # ==================================================
-    vt = VisitType.query.filter_by(code=appointment.visit_type).first()
+    vt = visit_types.get(appointment.visit_type)
     try:
         SMSService().send_confirmation(appointment)
         SMSService().send_payment_notification(appointment)
@@ -396,20 +443,30 @@ def _build_p24_payload(payment: Payment):
 
     appointment = payment.appointment
 
+    # dane pacjenta: z wizyty albo z blokady terminu
+    patient = appointment or payment.hold
+
     email = (
-        appointment.patient_email
-        if appointment and appointment.patient_email
+        patient.patient_email
+        if patient and patient.patient_email
         else "kontakt@kingabobinska.pl"
     )
 
     client_name = ""
     phone = ""
 
-    if appointment:
-        raw_name = f"{appointment.patient_first_name} {appointment.patient_last_name}"
+    if patient:
+        raw_name = f"{patient.patient_first_name} {patient.patient_last_name}"
         client_name = normalize_pl(raw_name)
 
-        phone = appointment.patient_phone or ""
+        phone = patient.patient_phone or ""
+
+    if appointment:
+        description = f"Rezerwacja wizyty #{appointment.id}"
+    elif payment.hold:
+        description = f"Rezerwacja wizyty {payment.hold.start.strftime('%d.%m.%Y %H:%M')}"
+    else:
+        description = "Rezerwacja wizyty"
 
     payload = {
         "merchantId": int(cfg["P24_MERCHANT_ID"]),
@@ -417,7 +474,7 @@ def _build_p24_payload(payment: Payment):
         "sessionId": payment.provider_session_id,
         "amount": int(payment.amount),
         "currency": "PLN",
-        "description": f"Rezerwacja wizyty #{appointment.id}" if appointment else "Rezerwacja wizyty",
+        "description": description,
         "email": email,
         "client": client_name,        # 👈 imię i nazwisko w panelu P24
         "phone": phone,               # 👈 opcjonalnie telefon
@@ -465,17 +522,11 @@ def _p24_verify_transaction(payment: Payment):
     }
 
 
-    auth_raw = f"{cfg['P24_POS_ID']}:{cfg['P24_API_KEY']}"
-    auth_b64 = base64.b64encode(auth_raw.encode()).decode()
-
-    r = requests.put(
+    r = get_client("p24").verify(
         cfg["P24_VERIFY_URL"],
-        json=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {auth_b64}",
-        },
-        timeout=15
+        payload,
+        pos_id=cfg["P24_POS_ID"],
+        api_key=cfg["P24_API_KEY"]
     )
 
     if r.status_code != 200:
@@ -0,0 +1,69 @@
+import json
+
+from flask import Blueprint, request, jsonify, current_app
+
+from models import SMSMessage, EmailMessage
+from utils.delivery_reports import (
+    apply_reports,
+    parse_resend,
+    parse_smsapi,
+    verify_resend_signature,
+    verify_smsapi_token,
+)
+
+
+webhooks_bp = Blueprint(
+    "webhooks",
+    __name__,
+    url_prefix="/webhooks"
+)
+
+
+# ==================================================
+# SMSAPI – RAPORTY DORĘCZENIA
+# ==================================================
+@webhooks_bp.route("/smsapi", methods=["GET", "POST"])
+def smsapi_report():
+
+    if not verify_smsapi_token(
+        current_app.config.get("SMSAPI_WEBHOOK_TOKEN"),
+        request.args.get("token")
+    ):
+        current_app.logger.warning("[SMSAPI WEBHOOK] Invalid token")
+        return "ERROR", 403
+
+    reports = parse_smsapi(request.values)
+    result = apply_reports(SMSMessage, reports)
+
+    current_app.logger.info(f"[SMSAPI WEBHOOK] {result}")
+
+    # SMSAPI ponawia callback, dopóki nie dostanie "OK"
+    return "OK"
+
+
+# ==================================================
+# RESEND – ZDARZENIA E-MAIL
+# ==================================================
+@webhooks_bp.route("/resend", methods=["POST"])
+def resend_event():
+
+    body = request.get_data()
+
+    if not verify_resend_signature(
+        current_app.config.get("RESEND_WEBHOOK_SECRET"),
+        request.headers,
+        body
+    ):
+        current_app.logger.warning("[RESEND WEBHOOK] Invalid signature")
+        return jsonify(success=False), 401
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return jsonify(success=False), 400
+
+    result = apply_reports(EmailMessage, parse_resend(payload))
+
+    current_app.logger.info(f"[RESEND WEBHOOK] {result}")
+
+    return jsonify(success=True, **result)
@@ -51,6 +51,14 @@ class Config:
     # ─────────────────────────
     RESEND_API_KEY = os.environ.get("RESEND_API_KEY")
 
+    # ─────────────────────────
+    # WEBHOOKI DORĘCZEŃ (blueprints/webhooks.py)
+    # ─────────────────────────
+    # callback SMSAPI: {BASE_URL}/webhooks/smsapi?token=…
+    SMSAPI_WEBHOOK_TOKEN = os.environ.get("SMSAPI_WEBHOOK_TOKEN")
+    # sekret podpisu webhooka Resend (whsec_…)
+    RESEND_WEBHOOK_SECRET = os.environ.get("RESEND_WEBHOOK_SECRET")
+
     # 📬 ADRES DO FORMULARZA KONTAKTOWEGO
     CONTACT_FORM_TO = os.environ.get(
         "CONTACT_FORM_TO",
@@ -85,3 +93,31 @@ class Config:
     P24_COUNTRY = "PL"
     P24_LANGUAGE = "pl"
 
+    # ─────────────────────────
+    # ZMIANY NA ŻYWO (SSE, utils/availability_events.py)
+    # ─────────────────────────
+    # każdy strumień trzyma wątek workera – włączać tylko z gunicorn.conf.py
+    # (gthread); WEB_THREADS ustawia gunicorn.conf.py, 1 = brak strumieni
+    LIVE_UPDATES = os.environ.get("LIVE_UPDATES") == "1"
+    WEB_THREADS = int(os.environ.get("WEB_THREADS") or 1)
+
+    # ─────────────────────────
+    # METRYKI (/metrics)
+    # ─────────────────────────
+    # bez tokenu /metrics działa tylko w trybie debug
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    # nagłówki X-SQL-* / Server-Timing także poza trybem debug
+    METRICS_HEADERS = os.environ.get("METRICS_HEADERS") == "1"
+
+    # ─────────────────────────
+    # WOLNE ZAPYTANIA (utils/slow_queries.py)
+    # ─────────────────────────
+    # próg w ms – brak zmiennej = log wyłączony
+    SLOW_QUERY_MS = (
+        float(os.environ["SLOW_QUERY_MS"])
+        if os.environ.get("SLOW_QUERY_MS")
+        else None
+    )
+    # domyślnie instance/slow_queries.jsonl
+    SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG")
+    SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1") == "1"
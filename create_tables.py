@@ -1,14 +1,32 @@
-from app import create_app
-from models import db, Doctor
+"""
+Przygotowanie bazy: migracje schematu + domyślne konto lekarza.
+Same migracje: python -m migrations
+"""
+import os
 
-app = create_app()
+from dotenv import load_dotenv
+import sqlalchemy as sa
+
+load_dotenv()
+
+from migrations import upgrade
+
+applied = upgrade(sa.create_engine(os.environ["DATABASE_URL"]))
+print(f"Migrations applied: {applied or 'none'}")
+
+# import aplikacji dopiero po migracjach – create_app() czyta tabelę settings
+from app import app
+from extensions import db
+from models import Doctor
 
 with app.app_context():
-    db.create_all()
 
     # create default doctor account
     if not Doctor.query.filter_by(username='doctor').first():
-        Doctor.create_default('doctor', 'doctorpass')
+        doctor = Doctor(username='doctor')
+        doctor.set_password('doctorpass')
+        db.session.add(doctor)
+        db.session.commit()
         print("Default doctor created: doctor / doctorpass")
 
     print("Tables created.")
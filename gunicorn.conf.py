@@ -0,0 +1,22 @@
+"""
+Gunicorn – workery gthread: strumień SSE (zmiany na żywo,
+utils/availability_events.py) zajmuje jeden wątek, a nie cały worker.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Zmiany na żywo dodatkowo wymagają LIVE_UPDATES=1; na strumienie idzie
+najwyżej połowa wątków workera.
+"""
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+workers = int(os.environ.get("WEB_WORKERS", "2"))
+worker_class = "gthread"
+
+# config.py czyta tę samą zmienną (limit strumieni na proces)
+threads = int(os.environ.setdefault("WEB_THREADS", "16"))
+
+# zamknięcie workera nie czeka 10 min na otwarte strumienie
+graceful_timeout = 10
@@ -0,0 +1,59 @@
+import logging
+from datetime import date, timedelta
+
+from utils.availability_archive import archive_before
+from utils import availability_events
+
+
+# ───────────────────────────────────────
+# KONFIGURACJA
+# ───────────────────────────────────────
+
+# ostatni tydzień zostaje w availabilities (korekty grafiku po fakcie)
+ARCHIVE_AFTER_DAYS = 7
+
+
+# ───────────────────────────────────────
+# LOGGING
+# ───────────────────────────────────────
+
+logger = logging.getLogger("archive_availability")
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter(
+        "[%(asctime)s] [ARCHIVE] %(levelname)s: %(message)s"
+    )
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+
+# ───────────────────────────────────────
+# CORE LOGIC (BEZ FLASK)
+# ───────────────────────────────────────
+
+def _run():
+    cutoff = date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+    logger.info(f"Archive job started (before {cutoff})")
+
+    result = archive_before(cutoff)
+
+    logger.info(
+        f"Job finished. Days: {result['days']} "
+        f"Slots archived: {result['slots']} "
+        f"Skipped (off-grid): {result['skipped']}"
+    )
+
+    # dziennik zmian dla SSE – potrzebny tylko na czas ponownych połączeń
+    pruned = availability_events.prune()
+    logger.info(f"Availability changes pruned: {pruned}")
+
+
+# ───────────────────────────────────────
+# ENTRYPOINT
+# ───────────────────────────────────────
+
+def run():
+    _run()
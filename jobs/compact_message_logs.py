@@ -0,0 +1,136 @@
+import logging
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import SMSMessage, EmailMessage
+from utils.settings import get_setting
+
+
+# ───────────────────────────────────────
+# KONFIGURACJA
+# ───────────────────────────────────────
+
+# domyślne wartości – nadpisywane z tabeli settings
+COMPRESS_AFTER_DAYS = 90
+PRUNE_AFTER_DAYS = 730
+
+BATCH_SIZE = 500
+
+MODELS = (SMSMessage, EmailMessage)
+
+
+# ───────────────────────────────────────
+# LOGGING
+# ───────────────────────────────────────
+
+logger = logging.getLogger("compact_messages")
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter(
+        "[%(asctime)s] [MESSAGES] %(levelname)s: %(message)s"
+    )
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+
+# ───────────────────────────────────────
+# KOMPRESJA / USUWANIE TREŚCI
+# ───────────────────────────────────────
+
+def _compress(model, cutoff):
+    """
+    Treść starszą niż cutoff → zlib w content_z (partiami po BATCH_SIZE).
+    """
+    compressed = 0
+    last_id = 0
+
+    while True:
+        batch = (
+            model.query
+            .filter(
+                model.id > last_id,
+                model.created_at < cutoff,
+                model.content.isnot(None)
+            )
+            .order_by(model.id)
+            .limit(BATCH_SIZE)
+            .all()
+        )
+
+        if not batch:
+            break
+
+        for message in batch:
+            message.compact()
+
+        db.session.commit()
+
+        compressed += len(batch)
+        last_id = batch[-1].id
+
+    return compressed
+
+
+def _prune(model, cutoff):
+    """
+    Usuwa treść starszą niż cutoff – wiersz (typ, status, daty) zostaje
+    dla statystyk i historii wizyty.
+    """
+    pruned = (
+        model.query
+        .filter(
+            model.created_at < cutoff,
+            model.content_pruned_at.is_(None)
+        )
+        .update(
+            {
+                model.content: None,
+                model.content_z: None,
+                model.params_json: None,
+                model.content_pruned_at: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+    )
+
+    db.session.commit()
+
+    return pruned
+
+
+# ───────────────────────────────────────
+# CORE LOGIC (BEZ FLASK)
+# ───────────────────────────────────────
+
+def _run():
+    now = datetime.utcnow()
+
+    compress_days = get_setting("message_compress_after_days", COMPRESS_AFTER_DAYS, cast=int)
+    prune_days = get_setting("message_prune_after_days", PRUNE_AFTER_DAYS, cast=int)
+
+    logger.info(f"Job started (compress > {compress_days}d, prune > {prune_days}d)")
+
+    for model in MODELS:
+        pruned = 0
+
+        # 0 = treść przechowywana bez limitu
+        if prune_days:
+            pruned = _prune(model, now - timedelta(days=prune_days))
+
+        compressed = _compress(model, now - timedelta(days=compress_days))
+
+        logger.info(
+            f"{model.__tablename__}: compressed={compressed} pruned={pruned}"
+        )
+
+    logger.info("Job finished")
+
+
+# ───────────────────────────────────────
+# ENTRYPOINT
+# ───────────────────────────────────────
+
+def run():
+    _run()
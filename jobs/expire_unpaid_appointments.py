@@ -1,9 +1,10 @@
 import logging
 from datetime import datetime, timedelta
 
-from models import Appointment, Payment
+from models import Appointment, Payment, SlotHold
 from extensions import db
 from utils.google_calendar import GoogleCalendarService
+from utils import availability_events
 
 
 # ───────────────────────────────────────
@@ -39,11 +40,53 @@ def _run():
     now = datetime.utcnow()
     threshold = now - timedelta(minutes=EXPIRE_MINUTES)
 
+    # ⏳ NOWY FLOW: płatności za wygasłe blokady terminu.
+    # Termin zwolnił się sam (blokada wygasła) – jedno UPDATE,
+    # bez anulowania wizyt i bez Google.
+    expired_holds = (
+        db.session.query(SlotHold.id)
+        .filter(
+            SlotHold.appointment_id.is_(None),
+            SlotHold.expires_at < now
+        )
+    )
+
+    # 📡 zwolnione terminy → otwarte strony rezerwacji (raz na blokadę –
+    # płatność zaraz przestanie być pending)
+    for hold_id, doctor_id, start in (
+        db.session.query(SlotHold.id, SlotHold.doctor_id, SlotHold.start)
+        .join(Payment, Payment.hold_id == SlotHold.id)
+        .filter(
+            SlotHold.id.in_(expired_holds),
+            Payment.provider == "przelewy24",
+            Payment.status.in_(["init", "pending"])
+        )
+        .distinct()
+    ):
+        availability_events.record_change(
+            doctor_id, start, kind="hold.expired", ref_id=hold_id
+        )
+
+    released = (
+        Payment.query
+        .filter(
+            Payment.provider == "przelewy24",
+            Payment.status.in_(["init", "pending"]),
+            Payment.appointment_id.is_(None),
+            Payment.hold_id.in_(expired_holds)
+        )
+        .update({"status": "failed"}, synchronize_session=False)
+    )
+
+    logger.info(f"Expired hold payments: {released}")
+
+    # 🕰 STARY FLOW: wizyty utworzone przed płatnością
     payments = (
         Payment.query
         .filter(
             Payment.provider == "przelewy24",   # 🔒 TYLKO P24
             Payment.status.in_(["init", "pending"]),
+            Payment.appointment_id.isnot(None),
             Payment.created_at < threshold
         )
         .all()
@@ -74,6 +117,11 @@ def _run():
         appointment.cancelled_by = "doctor"
         appointment.cancelled_at = datetime.utcnow()
 
+        availability_events.record_change(
+            appointment.doctor_id, appointment.start,
+            kind="appointment.cancelled", ref_id=appointment.id
+        )
+
         payment.status = "failed"
 
         expired_count += 1
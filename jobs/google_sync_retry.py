@@ -0,0 +1,103 @@
+import logging
+from datetime import datetime
+
+from extensions import db
+from models import Appointment
+from utils.circuit_breaker import is_available
+from utils.google_calendar import GoogleCalendarService
+
+
+# ───────────────────────────────────────
+# KONFIGURACJA
+# ───────────────────────────────────────
+
+# wizyt na jedno uruchomienie – po awarii Google zaległości
+# rozchodzą się w kolejnych przebiegach, nie jedną falą
+BATCH_SIZE = 50
+
+
+# ───────────────────────────────────────
+# LOGGING
+# ───────────────────────────────────────
+
+logger = logging.getLogger("google_sync_retry")
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter(
+        "[%(asctime)s] [GOOGLE RETRY] %(levelname)s: %(message)s"
+    )
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+
+# ───────────────────────────────────────
+# CORE LOGIC (BEZ FLASK)
+# ───────────────────────────────────────
+
+def _run():
+    if not is_available("google"):
+        logger.info("Google circuit open – skipping")
+        return
+
+    now = datetime.utcnow()
+
+    due = (
+        Appointment.query
+        .filter(
+            Appointment.google_sync_status.in_(["pending", "error"]),
+            Appointment.google_next_retry_at <= now
+        )
+        .order_by(Appointment.google_next_retry_at)
+        .limit(BATCH_SIZE)
+        .all()
+    )
+
+    if not due:
+        return
+
+    logger.info(f"Appointments to sync: {len(due)}")
+
+    service = GoogleCalendarService.ensure_connection()
+    if not service:
+        logger.warning("Google not connected – skipping")
+        return
+
+    synced = failed = skipped = 0
+
+    for appt in due:
+
+        # Google padło w trakcie przebiegu – reszta czeka na swoją kolej
+        if not is_available("google"):
+            skipped = len(due) - synced - failed
+            break
+
+        if appt.status == "cancelled":
+            if appt.google_event_id:
+                GoogleCalendarService.delete_appointment(appt, service=service)
+            else:
+                appt.google_sync_status = "deleted"
+                appt.google_next_retry_at = None
+                db.session.commit()
+            synced += 1
+            continue
+
+        GoogleCalendarService.sync_appointment(appt, force_update=True, service=service)
+
+        if appt.google_sync_status == "synced":
+            synced += 1
+        else:
+            failed += 1
+
+    logger.info(
+        f"Job finished. Synced: {synced}, failed: {failed}, skipped: {skipped}"
+    )
+
+
+# ───────────────────────────────────────
+# ENTRYPOINT
+# ───────────────────────────────────────
+
+def run():
+    _run()
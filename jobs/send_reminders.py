@@ -67,6 +67,11 @@ def _run():
     sent_sms = 0
     sent_email = 0
 
+    # SMS-y i e-maile wysyłane hurtowo po pętli
+    # (SMSAPI: wielu odbiorców w jednym wywołaniu, e-mail: jeden render szablonu)
+    sms_batch = []
+    email_batch = []
+
     for appt in appointments:
         hours_left = (appt.start - now).total_seconds() / 3600
 
@@ -82,13 +87,7 @@ def _run():
                 sms_enabled
                 and appt.sms_reminder_sent_at is None
             ):
-                try:
-                    sms_service.send_reminder(appt)
-                    sent_sms += 1
-                except Exception as e:
-                    logger.error(
-                        f"[SMS] Failed for appointment {appt.id}: {e}"
-                    )
+                sms_batch.append(appt)
 
             # ───── EMAIL ─────
             if (
@@ -96,13 +95,25 @@ def _run():
                 and appt.patient_email
                 and appt.email_reminder_sent_at is None
             ):
-                try:
-                    email_service.send_reminder(appt)
-                    sent_email += 1
-                except Exception as e:
-                    logger.error(
-                        f"[EMAIL] Failed for appointment {appt.id}: {e}"
-                    )
+                email_batch.append(appt)
+
+    if sms_batch:
+        try:
+            sent_sms = len(sms_service.send_reminders(sms_batch))
+        except Exception as e:
+            logger.error(
+                f"[SMS] Batch failed for appointments "
+                f"{[a.id for a in sms_batch]}: {e}"
+            )
+
+    if email_batch:
+        try:
+            sent_email = len(email_service.send_reminders(email_batch))
+        except Exception as e:
+            logger.error(
+                f"[EMAIL] Batch failed for appointments "
+                f"{[a.id for a in email_batch]}: {e}"
+            )
 
     logger.info(
         f"Job finished. SMS reminders sent: {sent_sms}, "
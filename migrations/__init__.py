@@ -0,0 +1,22 @@
+"""
+Wersjonowane migracje schematu bazy.
+
+Każda migracja to moduł vNNNN_nazwa.py z funkcją upgrade(conn)
+i opcjonalnie verify(conn) / downgrade(conn). Zastosowane wersje
+zapisywane są w tabeli schema_migrations.
+
+    python -m migrations              # upgrade do najnowszej wersji
+    python -m migrations status
+    python -m migrations verify
+    python -m migrations downgrade 2  # cofnięcie do wersji 2
+"""
+from migrations.runner import (
+    MigrationError,
+    schema_migrations,
+    discover,
+    applied_versions,
+    upgrade,
+    downgrade,
+    verify,
+    status,
+)
@@ -0,0 +1,59 @@
+import argparse
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+import sqlalchemy as sa
+
+from migrations.runner import upgrade, downgrade, verify, status, MigrationError
+
+
+def main(argv=None):
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(prog="python -m migrations")
+    parser.add_argument("command", nargs="?", default="upgrade",
+                        choices=["upgrade", "downgrade", "verify", "status"])
+    parser.add_argument("target", nargs="?", type=int)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("brak DATABASE_URL")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    engine = sa.create_engine(args.database_url)
+
+    try:
+        if args.command == "upgrade":
+            applied = upgrade(engine, args.target)
+            print(f"✅ Zastosowano: {applied or 'nic – schemat aktualny'}")
+
+        elif args.command == "downgrade":
+            if args.target is None:
+                parser.error("downgrade wymaga wersji docelowej")
+            print(f"↩️ Cofnięto: {downgrade(engine, args.target)}")
+
+        elif args.command == "verify":
+            problems = verify(engine)
+            for p in problems:
+                print(f"❌ {p}")
+            if problems:
+                return 1
+            print("✅ Schemat zgodny z migracjami")
+
+        else:
+            for version, name, applied, description in status(engine):
+                mark = "✔" if applied else " "
+                print(f"[{mark}] v{version:04d} {name:<24} {description}")
+
+    except MigrationError as e:
+        print(f"❌ {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import sqlalchemy as sa
+
+
+# ───────────────────────────────────────
+# INTROSPEKCJA
+# ───────────────────────────────────────
+# inspector tworzony za każdym razem od nowa – cache inspektora
+# nie widzi zmian wykonanych w tej samej migracji
+
+def has_table(conn, table):
+    return sa.inspect(conn).has_table(table)
+
+
+def columns(conn, table):
+    return {c["name"]: c for c in sa.inspect(conn).get_columns(table)}
+
+
+def has_column(conn, table, column):
+    return column in columns(conn, table)
+
+
+def indexes(conn, table):
+    """
+    nazwa → lista kolumn
+    """
+    return {
+        ix["name"]: list(ix["column_names"])
+        for ix in sa.inspect(conn).get_indexes(table)
+    }
+
+
+def has_index(conn, table, name, column_names=None):
+    found = indexes(conn, table).get(name)
+    if found is None:
+        return False
+    return column_names is None or found == list(column_names)
+
+
+# ───────────────────────────────────────
+# DDL
+# ───────────────────────────────────────
+
+def create_table(conn, table):
+    table.create(conn, checkfirst=True)
+
+
+def create_index(conn, index):
+    if not has_index(conn, index.table.name, index.name):
+        index.create(conn)
+
+
+def drop_index(conn, table, name):
+    if not has_index(conn, table, name):
+        return
+
+    if dialect(conn) in ("mysql", "mariadb"):
+        conn.exec_driver_sql(f"DROP INDEX {name} ON {table}")
+    else:
+        conn.exec_driver_sql(f"DROP INDEX {name}")
+
+
+def add_column(conn, table, ddl):
+    """
+    ddl – definicja kolumny, np. "hold_id INTEGER NULL",
+    albo kolumna z modelu (Model.__table__.c.nazwa)
+    """
+    if isinstance(ddl, sa.Column):
+        ddl = (
+            f"{ddl.name} {ddl.type.compile(dialect=conn.dialect)} "
+            + ("NULL" if ddl.nullable else "NOT NULL")
+        )
+
+    name = ddl.split()[0]
+    if not has_column(conn, table, name):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {ddl}")
+
+
+def dialect(conn):
+    return conn.dialect.name
+
+
+def model_index(table, name):
+    """
+    Definicja indeksu z models.py (__table_args__ / index=True).
+    """
+    for index in table.indexes:
+        if index.name == name:
+            return index
+    raise KeyError(f"{table.name}: brak indeksu {name} w modelu")
+
+
+def has_foreign_key(conn, table, column):
+    return any(
+        fk["constrained_columns"] == [column]
+        for fk in sa.inspect(conn).get_foreign_keys(table)
+    )
@@ -0,0 +1,185 @@
+import importlib
+import logging
+import pkgutil
+import re
+from datetime import datetime
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+
+# ───────────────────────────────────────
+# TABELA WERSJI
+# ───────────────────────────────────────
+# osobne MetaData – db.drop_all() nie kasuje historii migracji
+
+_metadata = sa.MetaData()
+
+schema_migrations = sa.Table(
+    "schema_migrations",
+    _metadata,
+    sa.Column("version", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+_MODULE = re.compile(r"^v(\d{4})_(\w+)$")
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+
+    @property
+    def description(self):
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+    def upgrade(self, conn):
+        self.module.upgrade(conn)
+
+    def verify(self, conn):
+        fn = getattr(self.module, "verify", None)
+        return fn(conn) if fn else []
+
+    def downgrade(self, conn):
+        fn = getattr(self.module, "downgrade", None)
+        if fn is None:
+            raise MigrationError(f"v{self.version:04d} ({self.name}) nie ma downgrade()")
+        fn(conn)
+
+
+# ───────────────────────────────────────
+# ODKRYWANIE MIGRACJI
+# ───────────────────────────────────────
+
+def discover():
+    import migrations
+
+    found = []
+
+    for info in pkgutil.iter_modules(migrations.__path__):
+        m = _MODULE.match(info.name)
+        if not m:
+            continue
+
+        module = importlib.import_module(f"migrations.{info.name}")
+        found.append(Migration(int(m.group(1)), m.group(2), module))
+
+    found.sort(key=lambda mig: mig.version)
+
+    versions = [mig.version for mig in found]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"Zduplikowane numery migracji: {versions}")
+
+    return found
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        rows = conn.execute(sa.select(schema_migrations.c.version)).scalars()
+        return set(rows)
+
+
+# ───────────────────────────────────────
+# UPGRADE / DOWNGRADE
+# ───────────────────────────────────────
+
+def upgrade(engine, target=None):
+    """
+    Stosuje brakujące migracje po kolei. Każda migracja jest
+    weryfikowana zaraz po wykonaniu – błąd przerywa proces.
+    Zwraca listę zastosowanych wersji.
+    """
+    done = applied_versions(engine)
+    applied = []
+
+    for mig in discover():
+        if mig.version in done:
+            continue
+        if target is not None and mig.version > target:
+            break
+
+        logger.info(f"Migracja v{mig.version:04d}: {mig.description}")
+
+        # MySQL i tak zatwierdza DDL od razu – transakcja chroni
+        # przynajmniej wpis w schema_migrations
+        with engine.begin() as conn:
+            mig.upgrade(conn)
+
+        with engine.begin() as conn:
+            problems = mig.verify(conn)
+            if problems:
+                raise MigrationError(
+                    f"v{mig.version:04d} ({mig.name}) – weryfikacja nieudana: "
+                    + "; ".join(problems)
+                )
+
+            conn.execute(schema_migrations.insert().values(
+                version=mig.version,
+                name=mig.name,
+                applied_at=datetime.utcnow(),
+            ))
+
+        applied.append(mig.version)
+
+    return applied
+
+
+def downgrade(engine, target):
+    done = applied_versions(engine)
+    reverted = []
+
+    for mig in reversed(discover()):
+        if mig.version <= target or mig.version not in done:
+            continue
+
+        logger.info(f"Cofnięcie v{mig.version:04d}: {mig.description}")
+
+        with engine.begin() as conn:
+            mig.downgrade(conn)
+            conn.execute(
+                schema_migrations.delete()
+                .where(schema_migrations.c.version == mig.version)
+            )
+
+        reverted.append(mig.version)
+
+    return reverted
+
+
+# ───────────────────────────────────────
+# WERYFIKACJA / STATUS
+# ───────────────────────────────────────
+
+def verify(engine):
+    """
+    Ponowna weryfikacja wszystkich zastosowanych migracji
+    (np. czy indeksy nie zostały usunięte ręcznie).
+    Zwraca listę problemów – pusta = OK.
+    """
+    done = applied_versions(engine)
+    problems = []
+
+    with engine.connect() as conn:
+        for mig in discover():
+            if mig.version in done:
+                problems += [f"v{mig.version:04d}: {p}" for p in mig.verify(conn)]
+
+    return problems
+
+
+def status(engine):
+    done = applied_versions(engine)
+    return [
+        (mig.version, mig.name, mig.version in done, mig.description)
+        for mig in discover()
+    ]
@@ -0,0 +1,23 @@
+"""
+Schemat bazowy – tabele z models.py (dawne create_tables.py).
+
+Na pustej bazie tworzy od razu aktualny schemat, dlatego kolejne
+migracje muszą być idempotentne (sprawdzają stan przed zmianą).
+Na istniejącej bazie produkcyjnej nic nie zmienia – tylko zapisuje wersję.
+"""
+from extensions import db
+import models  # noqa: F401 – rejestracja tabel
+
+
+def upgrade(conn):
+    db.metadata.create_all(conn, checkfirst=True)
+
+
+def verify(conn):
+    from migrations import ops
+
+    return [
+        f"brak tabeli {name}"
+        for name in db.metadata.tables
+        if not ops.has_table(conn, name)
+    ]
@@ -0,0 +1,47 @@
+"""
+Blokady terminów na czas płatności P24 (slot_holds, payments.hold_id).
+"""
+from migrations import ops
+from models import SlotHold, Payment
+
+
+def upgrade(conn):
+    ops.create_table(conn, SlotHold.__table__)
+
+    ops.add_column(conn, "payments", "hold_id INTEGER NULL")
+    ops.create_index(conn, ops.model_index(Payment.__table__, "ix_payments_hold_id"))
+
+    if ops.dialect(conn) in ("mysql", "mariadb"):
+        if not ops.has_foreign_key(conn, "payments", "hold_id"):
+            conn.exec_driver_sql(
+                "ALTER TABLE payments ADD CONSTRAINT fk_payments_hold_id "
+                "FOREIGN KEY (hold_id) REFERENCES slot_holds(id) ON DELETE SET NULL"
+            )
+
+        # płatność za blokadę nie ma jeszcze wizyty
+        if not ops.columns(conn, "payments")["appointment_id"]["nullable"]:
+            conn.exec_driver_sql(
+                "ALTER TABLE payments MODIFY appointment_id INTEGER NULL"
+            )
+
+    # SQLite (dev / benchmarki) nie zmienia NOT NULL przez ALTER –
+    # tam schemat i tak powstaje od zera w v0001
+
+
+def verify(conn):
+    problems = []
+
+    if not ops.has_table(conn, "slot_holds"):
+        problems.append("brak tabeli slot_holds")
+
+    cols = ops.columns(conn, "payments")
+
+    if "hold_id" not in cols:
+        problems.append("brak kolumny payments.hold_id")
+    elif not ops.has_index(conn, "payments", "ix_payments_hold_id"):
+        problems.append("brak indeksu ix_payments_hold_id")
+
+    if ops.dialect(conn) != "sqlite" and not cols["appointment_id"]["nullable"]:
+        problems.append("payments.appointment_id nadal NOT NULL")
+
+    return problems
@@ -0,0 +1,40 @@
+"""
+Indeksy złożone dla ścieżki rezerwacji, płatności i historii wiadomości.
+"""
+from migrations import ops
+from models import Appointment, Availability, Payment, SMSMessage, EmailMessage
+
+
+# tabela → indeksy zadeklarowane w __table_args__ modeli
+HOT_PATH_INDEXES = [
+    (Appointment.__table__, "ix_appointments_doctor_status_start_end"),
+    (Availability.__table__, "ix_availabilities_doctor_start_active"),
+    (Payment.__table__, "ix_payments_appointment_status"),
+    (Payment.__table__, "ix_payments_provider_status_created"),
+    (SMSMessage.__table__, "ix_sms_messages_created_at"),
+    (EmailMessage.__table__, "ix_email_messages_created_at"),
+]
+
+
+def upgrade(conn):
+    for table, name in HOT_PATH_INDEXES:
+        ops.create_index(conn, ops.model_index(table, name))
+
+
+def verify(conn):
+    problems = []
+
+    for table, name in HOT_PATH_INDEXES:
+        expected = [c.name for c in ops.model_index(table, name).columns]
+
+        if not ops.has_index(conn, table.name, name, expected):
+            problems.append(f"brak indeksu {table.name}.{name} ({', '.join(expected)})")
+
+    return problems
+
+
+def downgrade(conn):
+    # MySQL: ix_payments_appointment_status może obsługiwać klucz obcy
+    # appointment_id – wtedy DROP INDEX się nie uda (tylko baza testowa)
+    for table, name in reversed(HOT_PATH_INDEXES):
+        ops.drop_index(conn, table.name, name)
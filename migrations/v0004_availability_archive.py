@@ -0,0 +1,19 @@
+"""
+Archiwum przeszłych dni grafiku (availability_archive, maski bitowe).
+"""
+from migrations import ops
+from models import AvailabilityArchive
+
+
+def upgrade(conn):
+    ops.create_table(conn, AvailabilityArchive.__table__)
+
+
+def verify(conn):
+    if not ops.has_table(conn, "availability_archive"):
+        return ["brak tabeli availability_archive"]
+    return []
+
+
+def downgrade(conn):
+    AvailabilityArchive.__table__.drop(conn, checkfirst=True)
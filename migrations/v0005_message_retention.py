@@ -0,0 +1,41 @@
+"""
+Retencja treści SMS / e-mail (content_z, content_pruned_at, content NULL).
+"""
+from migrations import ops
+from models import SMSMessage, EmailMessage
+
+
+TABLES = [SMSMessage.__table__, EmailMessage.__table__]
+
+
+def upgrade(conn):
+    for table in TABLES:
+        ops.add_column(conn, table.name, table.c.content_z)
+        ops.add_column(conn, table.name, table.c.content_pruned_at)
+
+        if ops.dialect(conn) in ("mysql", "mariadb"):
+            if not ops.columns(conn, table.name)["content"]["nullable"]:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} MODIFY content TEXT NULL"
+                )
+
+
+def verify(conn):
+    problems = []
+
+    for table in TABLES:
+        cols = ops.columns(conn, table.name)
+
+        for name in ("content_z", "content_pruned_at"):
+            if name not in cols:
+                problems.append(f"brak kolumny {table.name}.{name}")
+
+        if ops.dialect(conn) != "sqlite" and not cols["content"]["nullable"]:
+            problems.append(f"{table.name}.content nadal NOT NULL")
+
+    return problems
+
+
+def downgrade(conn):
+    # kolumny zostają (dane); upgrade() pomija istniejące
+    pass
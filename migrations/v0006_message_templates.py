@@ -0,0 +1,28 @@
+"""
+Wiadomości jako szablon + parametry (template_id, params_json).
+"""
+from migrations import ops
+from models import SMSMessage, EmailMessage
+
+
+TABLES = [SMSMessage.__table__, EmailMessage.__table__]
+
+
+def upgrade(conn):
+    for table in TABLES:
+        ops.add_column(conn, table.name, table.c.template_id)
+        ops.add_column(conn, table.name, table.c.params_json)
+
+
+def verify(conn):
+    return [
+        f"brak kolumny {table.name}.{name}"
+        for table in TABLES
+        for name in ("template_id", "params_json")
+        if not ops.has_column(conn, table.name, name)
+    ]
+
+
+def downgrade(conn):
+    # kolumny zostają (dane); upgrade() pomija istniejące
+    pass
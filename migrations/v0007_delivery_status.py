@@ -0,0 +1,43 @@
+"""
+Status doręczenia z webhooków SMSAPI / Resend + indeks provider_message_id.
+"""
+from migrations import ops
+from models import SMSMessage, EmailMessage
+
+
+TABLES = [SMSMessage.__table__, EmailMessage.__table__]
+
+COLUMNS = ("delivery_status", "delivered_at", "delivery_updated_at")
+
+
+def _index_name(table):
+    return f"ix_{table.name}_provider_message_id"
+
+
+def upgrade(conn):
+    for table in TABLES:
+        for name in COLUMNS:
+            ops.add_column(conn, table.name, table.c[name])
+        ops.create_index(conn, ops.model_index(table, _index_name(table)))
+
+
+def verify(conn):
+    problems = [
+        f"brak kolumny {table.name}.{name}"
+        for table in TABLES
+        for name in COLUMNS
+        if not ops.has_column(conn, table.name, name)
+    ]
+
+    problems += [
+        f"brak indeksu {table.name}.{_index_name(table)}"
+        for table in TABLES
+        if not ops.has_index(conn, table.name, _index_name(table), ["provider_message_id"])
+    ]
+
+    return problems
+
+
+def downgrade(conn):
+    for table in TABLES:
+        ops.drop_index(conn, table.name, _index_name(table))
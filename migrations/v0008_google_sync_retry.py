@@ -0,0 +1,105 @@
+"""
+Synchronizacja Google z ponowieniami: status "pending", licznik prób,
+termin następnej próby + indeks kolejki. Istniejące wizyty z błędem
+trafiają do kolejki – rozłożone na kolejne przebiegi joba.
+"""
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from migrations import ops
+from models import Appointment
+
+
+INDEX = "ix_appointments_google_retry"
+
+STATUSES = "'never','pending','synced','deleted','error'"
+
+# jobs/google_sync_retry.py: BATCH_SIZE wizyt co 5 minut
+BATCH_SIZE = 50
+RUN_INTERVAL = timedelta(minutes=5)
+
+
+def _unscheduled_errors(table):
+    return (
+        table.c.google_sync_status == "error",
+        table.c.google_sync_attempts == 0,
+        table.c.google_next_retry_at.is_(None),
+    )
+
+
+def _backfill(conn):
+    """
+    Błędy sprzed kolejki ponowień: attempts = 0, kolejne paczki
+    po BATCH_SIZE co RUN_INTERVAL (najbliższe wizyty najpierw).
+    """
+    table = Appointment.__table__
+
+    ids = conn.execute(
+        sa.select(table.c.id)
+        .where(*_unscheduled_errors(table))
+        .order_by(table.c.start, table.c.id)
+    ).scalars().all()
+
+    if not ids:
+        return
+
+    now = datetime.utcnow()
+
+    conn.execute(
+        table.update()
+        .where(table.c.id == sa.bindparam("appt_id"))
+        .values(
+            google_sync_attempts=0,
+            google_next_retry_at=sa.bindparam("retry_at")
+        ),
+        [
+            {"appt_id": appt_id, "retry_at": now + RUN_INTERVAL * (i // BATCH_SIZE)}
+            for i, appt_id in enumerate(ids)
+        ]
+    )
+
+
+def upgrade(conn):
+    ops.add_column(conn, "appointments", "google_sync_attempts INTEGER NOT NULL DEFAULT 0")
+    ops.add_column(conn, "appointments", Appointment.__table__.c.google_next_retry_at)
+    ops.create_index(conn, ops.model_index(Appointment.__table__, INDEX))
+
+    # SQLite nie ma typu ENUM (zwykły VARCHAR)
+    if ops.dialect(conn) in ("mysql", "mariadb"):
+        conn.exec_driver_sql(
+            f"ALTER TABLE appointments MODIFY google_sync_status "
+            f"ENUM({STATUSES}) NOT NULL"
+        )
+
+    _backfill(conn)
+
+
+def verify(conn):
+    problems = []
+    cols = ops.columns(conn, "appointments")
+
+    for name in ("google_sync_attempts", "google_next_retry_at"):
+        if name not in cols:
+            problems.append(f"brak kolumny appointments.{name}")
+
+    if not ops.has_index(conn, "appointments", INDEX, ["google_sync_status", "google_next_retry_at"]):
+        problems.append(f"brak indeksu appointments.{INDEX}")
+
+    enums = getattr(cols["google_sync_status"]["type"], "enums", None)
+    if enums is not None and "pending" not in enums:
+        problems.append("appointments.google_sync_status bez wartości 'pending'")
+
+    if not problems:
+        table = Appointment.__table__
+        stuck = conn.execute(
+            sa.select(sa.func.count()).select_from(table).where(*_unscheduled_errors(table))
+        ).scalar()
+        if stuck:
+            problems.append(f"{stuck} wizyt z błędem Google bez google_next_retry_at")
+
+    return problems
+
+
+def downgrade(conn):
+    ops.drop_index(conn, "appointments", INDEX)
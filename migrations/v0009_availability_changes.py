@@ -0,0 +1,19 @@
+"""
+Dziennik zmian dostępności dla SSE (availability_changes).
+"""
+from migrations import ops
+from models import AvailabilityChange
+
+
+def upgrade(conn):
+    ops.create_table(conn, AvailabilityChange.__table__)
+
+
+def verify(conn):
+    if not ops.has_table(conn, "availability_changes"):
+        return ["brak tabeli availability_changes"]
+    return []
+
+
+def downgrade(conn):
+    AvailabilityChange.__table__.drop(conn, checkfirst=True)
@@ -0,0 +1,28 @@
+"""
+Typ zmiany i id obiektu w availability_changes – delty SSE
+dla kalendarza lekarza.
+"""
+from migrations import ops
+from models import AvailabilityChange
+
+
+COLUMNS = ("kind", "ref_id")
+
+
+def upgrade(conn):
+    for name in COLUMNS:
+        ops.add_column(conn, "availability_changes", AvailabilityChange.__table__.c[name])
+
+
+def verify(conn):
+    cols = ops.columns(conn, "availability_changes")
+    return [
+        f"brak kolumny availability_changes.{name}"
+        for name in COLUMNS
+        if name not in cols
+    ]
+
+
+def downgrade(conn):
+    # kolumny zostają (nullable – starszy kod ich nie ustawia)
+    pass
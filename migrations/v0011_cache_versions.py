@@ -0,0 +1,19 @@
+"""
+Wersje cache w pamięci procesów (cache_versions) – rejestr typów wizyt.
+"""
+from migrations import ops
+from models import CacheVersion
+
+
+def upgrade(conn):
+    ops.create_table(conn, CacheVersion.__table__)
+
+
+def verify(conn):
+    if not ops.has_table(conn, "cache_versions"):
+        return ["brak tabeli cache_versions"]
+    return []
+
+
+def downgrade(conn):
+    CacheVersion.__table__.drop(conn, checkfirst=True)
@@ -0,0 +1,38 @@
+"""
+Wiersze cache_versions dla śledzonych cache (settings, visit_types,
+availability) – pierwsze podbicie to zawsze UPDATE, bez wyścigu INSERT.
+"""
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from models import CacheVersion
+
+
+NAMES = ("settings", "visit_types", "availability")
+
+
+def _existing(conn):
+    table = CacheVersion.__table__
+    return set(conn.execute(sa.select(table.c.name)).scalars())
+
+
+def upgrade(conn):
+    table = CacheVersion.__table__
+    missing = [name for name in NAMES if name not in _existing(conn)]
+
+    if missing:
+        conn.execute(table.insert(), [
+            {"name": name, "version": 0, "updated_at": datetime.utcnow()}
+            for name in missing
+        ])
+
+
+def verify(conn):
+    existing = _existing(conn)
+    return [f"brak wiersza cache_versions.{name}" for name in NAMES if name not in existing]
+
+
+def downgrade(conn):
+    # wiersze bez znaczenia dla starszego kodu
+    pass
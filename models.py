@@ -3,6 +3,7 @@ from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import json
+import zlib
 
 
 # ==================================================
@@ -23,6 +24,55 @@ class TimestampMixin:
     )
 
 
+# ==================================================
+# TREŚĆ WIADOMOŚCI (SMS / EMAIL) – RETENCJA
+# ==================================================
+class MessageBodyMixin:
+    """
+    template_id + params_json – treść renderowana na żądanie
+                                (utils/message_templates.py)
+    content    – treść jawna (wiadomości sprzed rejestru szablonów)
+    content_z  – treść skompresowana zlib (jobs/compact_message_logs.py)
+    wszystko NULL – treść usunięta po horyzoncie retencji, metadane zostają
+    """
+    template_id = db.Column(db.String(64))
+    params_json = db.Column(db.Text)
+
+    content_z = db.Column(db.LargeBinary)
+    content_pruned_at = db.Column(db.DateTime)
+
+    @property
+    def body(self):
+        if self.content is not None:
+            return self.content
+        if self.content_z is not None:
+            return zlib.decompress(self.content_z).decode("utf-8")
+        if self.template_id and self.params_json:
+            from utils.message_templates import render
+            return render(self.template_id, self.params_json)[1]
+        return None
+
+    def compact(self):
+        if self.content is not None:
+            self.content_z = zlib.compress(self.content.encode("utf-8"), 9)
+            self.content = None
+
+
+# ==================================================
+# STATUS DORĘCZENIA (WEBHOOKI DOSTAWCÓW)
+# ==================================================
+class DeliveryStatusMixin:
+    """
+    delivery_status     – ostatni raport dostawcy (delivered, undelivered,
+                          bounced, …) – utils/delivery_reports.py
+    delivery_updated_at – czas zdarzenia u dostawcy; starszy raport
+                          nie nadpisuje nowszego
+    """
+    delivery_status = db.Column(db.String(32))
+    delivered_at = db.Column(db.DateTime)
+    delivery_updated_at = db.Column(db.DateTime)
+
+
 # ==================================================
 # LEKARZ / AUTH
 # ==================================================
@@ -45,6 +95,10 @@ class Doctor(UserMixin, TimestampMixin, db.Model):
 # ==================================================
 class Availability(TimestampMixin, db.Model):
     __tablename__ = "availabilities"
+    __table_args__ = (
+        # api_days / api_hours / reserve – zakres dnia lub miesiąca
+        db.Index("ix_availabilities_doctor_start_active", "doctor_id", "start", "active"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -60,11 +114,72 @@ class Availability(TimestampMixin, db.Model):
     active = db.Column(db.Boolean, nullable=False, default=True)
 
 
+# ==================================================
+# ARCHIWUM DOSTĘPNOŚCI (PRZESZŁE DNI)
+# ==================================================
+class AvailabilityArchive(TimestampMixin, db.Model):
+    """
+    Jeden wiersz = jeden przeszły dzień grafiku (jobs/archive_availability.py).
+    Bit i maski = slot 08:00 + i * 15 min.
+    """
+    __tablename__ = "availability_archive"
+    __table_args__ = (
+        db.UniqueConstraint("doctor_id", "day", name="uq_availability_archive_day"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    doctor_id = db.Column(
+        db.Integer,
+        db.ForeignKey("doctors.id"),
+        nullable=False
+    )
+
+    day = db.Column(db.Date, nullable=False)
+
+    # sloty istniejące w grafiku / w tym aktywne
+    slot_mask = db.Column(db.BigInteger, nullable=False, default=0)
+    active_mask = db.Column(db.BigInteger, nullable=False, default=0)
+
+    # liczniki do statystyk (SUM bez rozpakowywania masek)
+    slot_count = db.Column(db.Integer, nullable=False, default=0)
+    active_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AvailabilityChange(db.Model):
+    """
+    Dziennik zmian dostępności (utils/availability_events.py) – jeden
+    wiersz = zakres dni, w którym zmieniły się wolne terminy. Źródło
+    zdarzeń SSE dla otwartych stron rezerwacji i kalendarza lekarza
+    we wszystkich workerach.
+    """
+    __tablename__ = "availability_changes"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    doctor_id = db.Column(db.Integer, nullable=False)
+
+    day_from = db.Column(db.Date, nullable=False)
+    day_to = db.Column(db.Date, nullable=False)
+
+    # typ zmiany (availability_events.KINDS) + id wizyty / blokady / slotu / urlopu
+    kind = db.Column(db.String(30), nullable=True)
+    ref_id = db.Column(db.Integer, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 # ==================================================
 # WIZYTY
 # ==================================================
 class Appointment(TimestampMixin, db.Model):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # kolizje terminów: doctor_id + status IN (...) + start < :end AND end > :start
+        db.Index("ix_appointments_doctor_status_start_end", "doctor_id", "status", "start", "end"),
+        # kolejka ponowień synchronizacji Google (jobs/google_sync_retry.py)
+        db.Index("ix_appointments_google_retry", "google_sync_status", "google_next_retry_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, nullable=False)
@@ -99,12 +214,15 @@ class Appointment(TimestampMixin, db.Model):
     )
 
     google_event_id = db.Column(db.String(255))
+    # never → (pending) → synced / error (ponowienia) – utils/google_calendar.py
     google_sync_status = db.Column(
-        db.Enum("never", "synced", "deleted", "error", name="google_sync_status"),
+        db.Enum("never", "pending", "synced", "deleted", "error", name="google_sync_status"),
         default="never",
         nullable=False
     )
     google_last_sync_at = db.Column(db.DateTime)
+    google_sync_attempts = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    google_next_retry_at = db.Column(db.DateTime)
 
     sms_confirmation_sent_at = db.Column(db.DateTime)
     sms_reminder_sent_at = db.Column(db.DateTime)
@@ -136,11 +254,62 @@ class Appointment(TimestampMixin, db.Model):
     )
 
 
+# ==================================================
+# BLOKADA TERMINU NA CZAS PŁATNOŚCI ONLINE
+# ==================================================
+class SlotHold(TimestampMixin, db.Model):
+    """
+    Krótkotrwała blokada terminu na czas płatności P24.
+
+    Aktywna (expires_at > teraz) zajmuje termin tak samo jak wizyta.
+    Po wygaśnięciu po prostu przestaje się liczyć – bez anulowania
+    i bez wywołań Google. Wizyta powstaje dopiero po opłaceniu.
+    """
+    __tablename__ = "slot_holds"
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, nullable=False)
+
+    token = db.Column(db.String(64), unique=True, nullable=False, index=True)
+
+    start = db.Column(db.DateTime, nullable=False)
+    end = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Integer, nullable=False)
+
+    visit_type = db.Column(db.String(50), nullable=False)
+
+    patient_first_name = db.Column(db.String(100))
+    patient_last_name = db.Column(db.String(100))
+    patient_phone = db.Column(db.String(20))
+    patient_email = db.Column(db.String(120))
+
+    client_ip = db.Column(db.String(45))
+
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    # wizyta utworzona z blokady po opłaceniu
+    appointment_id = db.Column(
+        db.Integer,
+        db.ForeignKey("appointments.id", ondelete="SET NULL"),
+        nullable=True
+    )
+
+    payments = db.relationship("Payment", backref="hold", lazy=True)
+
+    def is_active(self, now=None) -> bool:
+        now = now or datetime.utcnow()
+        return self.appointment_id is None and self.expires_at > now
+
+
 # ==================================================
 # SMS
 # ==================================================
-class SMSMessage(TimestampMixin, db.Model):
+class SMSMessage(MessageBodyMixin, DeliveryStatusMixin, TimestampMixin, db.Model):
     __tablename__ = "sms_messages"
+    __table_args__ = (
+        db.Index("ix_sms_messages_created_at", "created_at"),
+        db.Index("ix_sms_messages_provider_message_id", "provider_message_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -174,7 +343,8 @@ class SMSMessage(TimestampMixin, db.Model):
     provider = db.Column(db.String(50), default="smsapi")
     provider_message_id = db.Column(db.String(100))
 
-    content = db.Column(db.Text, nullable=False)
+    # NULL po kompresji / usunięciu – odczyt przez .body
+    content = db.Column(db.Text, nullable=True)
     error_message = db.Column(db.Text)
 
     sent_at = db.Column(db.DateTime)
@@ -183,8 +353,12 @@ class SMSMessage(TimestampMixin, db.Model):
 # ==================================================
 # EMAIL
 # ==================================================
-class EmailMessage(TimestampMixin, db.Model):
+class EmailMessage(MessageBodyMixin, DeliveryStatusMixin, TimestampMixin, db.Model):
     __tablename__ = "email_messages"
+    __table_args__ = (
+        db.Index("ix_email_messages_created_at", "created_at"),
+        db.Index("ix_email_messages_provider_message_id", "provider_message_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -219,7 +393,8 @@ class EmailMessage(TimestampMixin, db.Model):
     provider_message_id = db.Column(db.String(100))
 
     subject = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    # NULL po kompresji / usunięciu – odczyt przez .body
+    content = db.Column(db.Text, nullable=True)
 
     error_message = db.Column(db.Text)
     sent_at = db.Column(db.DateTime)
@@ -337,14 +512,26 @@ class Payment(TimestampMixin, db.Model):
             "provider_session_id",
             name="uq_provider_session"
         ),
+        # pending_payments / payment_status
+        db.Index("ix_payments_appointment_status", "appointment_id", "status"),
+        # expire_unpaid_appointments
+        db.Index("ix_payments_provider_status_created", "provider", "status", "created_at"),
     )
 
     id = db.Column(db.Integer, primary_key=True)
 
+    # NULL dopóki płatność dotyczy tylko blokady terminu (SlotHold)
     appointment_id = db.Column(
         db.Integer,
         db.ForeignKey("appointments.id", ondelete="CASCADE"),
-        nullable=False
+        nullable=True
+    )
+
+    hold_id = db.Column(
+        db.Integer,
+        db.ForeignKey("slot_holds.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True
     )
 
     provider = db.Column(db.String(32), nullable=False, default="przelewy24")
@@ -379,6 +566,23 @@ class Setting(TimestampMixin, db.Model):
     value = db.Column(db.Text, nullable=False)
 
 
+# ==================================================
+# WERSJE CACHE (SPÓJNOŚĆ MIĘDZY WORKERAMI)
+# ==================================================
+class CacheVersion(db.Model):
+    """
+    Jeden wiersz na cache w pamięci procesu (utils/cache_versions.py) –
+    zapis danych podbija wersję w tej samej transakcji, pozostałe
+    workery przeładowują cache po zmianie numeru.
+    """
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 # ==================================================
 # GOOGLE CALENDAR ERRORS
 # ==================================================
@@ -8,6 +8,16 @@ def init_default_settings():
             "key": "calendar_visible_days",
             "description": "Dni tygodnia widoczne w kalendarzu lekarza",
             "value": "mon,tue,wed,thu,fri"
+        },
+        {
+            "key": "message_compress_after_days",
+            "description": "Po ilu dniach treść SMS / e-mail jest kompresowana",
+            "value": "90"
+        },
+        {
+            "key": "message_prune_after_days",
+            "description": "Po ilu dniach treść SMS / e-mail jest usuwana (0 = nigdy)",
+            "value": "730"
         }
     ]
 
@@ -0,0 +1,225 @@
+from datetime import datetime, date, time, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import func
+
+from extensions import db
+from models import Availability, AvailabilityArchive
+
+
+# ───────────────────────────────────────
+# SIATKA SLOTÓW (jak generate_schedule / generate_day)
+# ───────────────────────────────────────
+
+GRID_START = time(8, 0)
+GRID_END = time(19, 0)
+SLOT_MINUTES = 15
+GRID_SLOTS = (
+    (GRID_END.hour * 60 + GRID_END.minute)
+    - (GRID_START.hour * 60 + GRID_START.minute)
+) // SLOT_MINUTES
+
+# dni przeniesione do archiwum w jednej transakcji
+BATCH_DAYS = 31
+
+
+class ArchivedSlot(NamedTuple):
+    start: datetime
+    end: datetime
+    active: bool
+
+
+def slot_index(start, end):
+    """
+    Numer slotu w siatce dnia albo None, jeśli slot do niej nie pasuje
+    (taki slot zostaje w tabeli availabilities).
+    """
+    if end - start != timedelta(minutes=SLOT_MINUTES):
+        return None
+
+    minutes = (
+        (start.hour * 60 + start.minute)
+        - (GRID_START.hour * 60 + GRID_START.minute)
+    )
+
+    if start.second or start.microsecond or minutes % SLOT_MINUTES:
+        return None
+
+    idx = minutes // SLOT_MINUTES
+    return idx if 0 <= idx < GRID_SLOTS else None
+
+
+def unpack(row):
+    base = datetime.combine(row.day, GRID_START)
+    step = timedelta(minutes=SLOT_MINUTES)
+
+    slots = []
+    mask = row.slot_mask
+
+    for idx in range(GRID_SLOTS):
+        if mask >> idx & 1:
+            start = base + idx * step
+            slots.append(ArchivedSlot(start, start + step, bool(row.active_mask >> idx & 1)))
+
+    return slots
+
+
+# ───────────────────────────────────────
+# ODCZYT (WIDOKI PRZESZŁYCH MIESIĘCY)
+# ───────────────────────────────────────
+
+def archived_slots(doctor_id, start, end):
+    """
+    Sloty z archiwum nachodzące na [start, end) – ten sam kształt
+    co Availability (start / end / active), bez id.
+    """
+    if start.date() >= date.today():
+        return []
+
+    rows = (
+        AvailabilityArchive.query
+        .filter(
+            AvailabilityArchive.doctor_id == doctor_id,
+            AvailabilityArchive.day >= start.date(),
+            AvailabilityArchive.day <= end.date()
+        )
+        .order_by(AvailabilityArchive.day)
+        .all()
+    )
+
+    return [
+        s
+        for row in rows
+        for s in unpack(row)
+        if s.start < end and s.end > start
+    ]
+
+
+def is_archived_day(doctor_id, day):
+    return db.session.query(
+        AvailabilityArchive.query
+        .filter_by(doctor_id=doctor_id, day=day)
+        .exists()
+    ).scalar()
+
+
+def archived_counts(doctor_id):
+    """
+    (sloty, aktywne sloty) w archiwum – do statystyk.
+    """
+    total, active = (
+        db.session.query(
+            func.coalesce(func.sum(AvailabilityArchive.slot_count), 0),
+            func.coalesce(func.sum(AvailabilityArchive.active_count), 0)
+        )
+        .filter(AvailabilityArchive.doctor_id == doctor_id)
+        .one()
+    )
+    return int(total), int(active)
+
+
+# ───────────────────────────────────────
+# ARCHIWIZACJA
+# ───────────────────────────────────────
+
+def _archive_range(range_start, range_end):
+    """
+    Przenosi sloty z [range_start, range_end) do archiwum.
+    Zwraca (dni, przeniesione sloty, pominięte sloty).
+    """
+    rows = (
+        db.session.query(
+            Availability.id,
+            Availability.doctor_id,
+            Availability.start,
+            Availability.end,
+            Availability.active
+        )
+        .filter(
+            Availability.start >= range_start,
+            Availability.start < range_end
+        )
+        .all()
+    )
+
+    masks = {}          # (doctor_id, day) → [slot_mask, active_mask]
+    archived_ids = []
+    skipped = 0
+
+    for slot_id, doctor_id, start, end, active in rows:
+        idx = slot_index(start, end)
+
+        if idx is None:
+            skipped += 1
+            continue
+
+        entry = masks.setdefault((doctor_id, start.date()), [0, 0])
+        entry[0] |= 1 << idx
+        if active:
+            entry[1] |= 1 << idx
+
+        archived_ids.append(slot_id)
+
+    if not masks:
+        return 0, 0, skipped
+
+    existing = {
+        (row.doctor_id, row.day): row
+        for row in AvailabilityArchive.query.filter(
+            AvailabilityArchive.day >= range_start.date(),
+            AvailabilityArchive.day < range_end.date()
+        )
+    }
+
+    for (doctor_id, day), (slot_mask, active_mask) in masks.items():
+        row = existing.get((doctor_id, day))
+
+        if row is None:
+            row = AvailabilityArchive(doctor_id=doctor_id, day=day, slot_mask=0, active_mask=0)
+            db.session.add(row)
+
+        # ponowna archiwizacja dnia (np. ręcznie dodany slot) – scalenie masek
+        row.active_mask = (row.active_mask & ~slot_mask) | active_mask
+        row.slot_mask = row.slot_mask | slot_mask
+        row.slot_count = bin(row.slot_mask).count("1")
+        row.active_count = bin(row.active_mask).count("1")
+
+    for i in range(0, len(archived_ids), 1000):
+        (
+            Availability.query
+            .filter(Availability.id.in_(archived_ids[i:i + 1000]))
+            .delete(synchronize_session=False)
+        )
+
+    db.session.commit()
+
+    return len(masks), len(archived_ids), skipped
+
+
+def archive_before(cutoff):
+    """
+    Archiwizuje wszystkie sloty sprzed dnia cutoff (date),
+    partiami po BATCH_DAYS dni – każda partia w osobnej transakcji.
+    """
+    oldest = db.session.query(func.min(Availability.start)).scalar()
+
+    result = {"days": 0, "slots": 0, "skipped": 0}
+
+    if oldest is None:
+        return result
+
+    range_start = datetime.combine(oldest.date(), time.min)
+    cutoff_dt = datetime.combine(cutoff, time.min)
+
+    while range_start < cutoff_dt:
+        range_end = min(range_start + timedelta(days=BATCH_DAYS), cutoff_dt)
+
+        days, slots, skipped = _archive_range(range_start, range_end)
+
+        result["days"] += days
+        result["slots"] += slots
+        result["skipped"] += skipped
+
+        range_start = range_end
+
+    return result
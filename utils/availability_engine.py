@@ -0,0 +1,402 @@
+"""
+Wolne terminy jako bitmapy (numpy).
+
+Każdy dzień to wiersz komórek siatki (domyślnie 44 × 15 min, 08:00–19:00):
+
+    free = active & ~occupied & ~closed
+
+- active   – aktywne sloty Availability,
+- occupied – wizyty (scheduled / completed) i blokady płatności online,
+- closed   – urlopy i święta (cały dzień).
+
+Wizyta na n komórek może zacząć się w komórce, od której n kolejnych
+komórek jest wolnych – jedno przesuwane okno AND dla całego miesiąca
+zamiast pętli po obiektach ORM i zapytania o konflikt dla każdego okna.
+"""
+from datetime import datetime, time, timedelta
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import func
+from numpy.lib.stride_tricks import sliding_window_view
+
+from extensions import db
+from models import Availability, Appointment, Vacation
+from utils import holiday_calendar, read_models
+from utils.availability_archive import GRID_START, GRID_END, SLOT_MINUTES
+
+
+# ───────────────────────────────────────
+# SIATKA
+# ───────────────────────────────────────
+
+class Grid(NamedTuple):
+    start: time = GRID_START
+    end: time = GRID_END
+    slot_minutes: int = SLOT_MINUTES
+
+    @property
+    def first_minute(self):
+        return self.start.hour * 60 + self.start.minute
+
+    @property
+    def cells(self):
+        return (self.end.hour * 60 + self.end.minute - self.first_minute) // self.slot_minutes
+
+
+DEFAULT_GRID = Grid()
+
+# dozwolone minuty startu wg długości wizyty (inne długości – dowolna minuta)
+NICE_START_MINUTES = {
+    60: {0},
+    30: {0, 30},
+    45: {0, 15},
+}
+
+# statusy wizyt zajmujących termin
+BUSY_STATUSES = ("scheduled", "completed")
+
+# najbliższy wolny termin – koszt ograniczony z góry: najwyżej
+# SEARCH_HORIZON_DAYS dni w oknach 7 → 14 → 28 → 56 dni (≤ 6 okien,
+# każde to 5 zapytań po indeksie (doctor_id, start, active))
+SEARCH_HORIZON_DAYS = 180
+SEARCH_FIRST_WINDOW_DAYS = 7
+SEARCH_MAX_WINDOW_DAYS = 56
+SEARCH_MAX_LIMIT = 10
+
+# wynik check()
+UNAVAILABLE = "unavailable"
+OCCUPIED = "occupied"
+
+
+def _seconds(values, base):
+    """
+    datetime → sekundy od base (wektorowo).
+    """
+    if not values:
+        return np.empty(0, dtype=np.int64)
+
+    stamps = np.array(values, dtype="datetime64[s]")
+    return (stamps - np.datetime64(base, "s")).astype(np.int64)
+
+
+# ───────────────────────────────────────
+# MAPA DOSTĘPNOŚCI
+# ───────────────────────────────────────
+
+class AvailabilityMap:
+    """
+    Dni [first_day, end_day) jednego lekarza na siatce grid.
+    """
+
+    def __init__(self, first_day, end_day, *, slots=(), busy=(), closed_ranges=(), grid=DEFAULT_GRID):
+        self.first_day = first_day
+        self.end_day = end_day
+        self.grid = grid
+        self.busy = list(busy)
+
+        days = max((end_day - first_day).days, 0)
+        cells = grid.cells
+        step = grid.slot_minutes * 60
+        base = datetime.combine(first_day, time.min)
+
+        # ───── aktywne sloty (tylko pasujące do siatki)
+        self.active = np.zeros((days, cells), dtype=bool)
+
+        if slots:
+            starts = _seconds([s for s, _ in slots], base)
+            ends = _seconds([e for _, e in slots], base)
+
+            day_idx = starts // 86400
+            offset = starts % 86400 - grid.first_minute * 60
+            fits = (
+                (ends - starts == step)
+                & (offset % step == 0)
+                & (offset >= 0)
+                & (offset < cells * step)
+                & (day_idx >= 0)
+                & (day_idx < days)
+            )
+
+            self.active[day_idx[fits], offset[fits] // step] = True
+
+        # ───── zajęte komórki: tablica różnic na osi całych dób
+        per_day = 86400 // step
+        diff = np.zeros(days * per_day + 1, dtype=np.int32)
+
+        if self.busy:
+            lo = _seconds([s for s, _ in self.busy], base) // step
+            hi = -(-_seconds([e for _, e in self.busy], base) // step)
+
+            lo = np.clip(lo, 0, days * per_day)
+            hi = np.clip(hi, 0, days * per_day)
+            keep = hi > lo
+
+            np.add.at(diff, lo[keep], 1)
+            np.add.at(diff, hi[keep], -1)
+
+        first_cell = grid.first_minute * 60 // step
+        timeline = np.cumsum(diff[:-1]).reshape(days, per_day)
+        self.occupied = timeline[:, first_cell:first_cell + cells] > 0
+
+        # ───── dni zamknięte (urlopy + święta)
+        if days:
+            open_days = holiday_calendar.open_days_mask(
+                first_day,
+                end_day - timedelta(days=1),
+                closed_ranges=closed_ranges
+            )
+            self.closed = ~np.array(open_days, dtype=bool)
+        else:
+            self.closed = np.zeros(0, dtype=bool)
+
+        self.free = self.active & ~self.occupied & ~self.closed[:, None]
+        self._starts = {}
+
+    # ───────────────────────────────────────
+    # ZAPYTANIA
+    # ───────────────────────────────────────
+
+    def _cells_for(self, visit_minutes):
+        return max(-(-visit_minutes // self.grid.slot_minutes), 1)
+
+    def _fits(self, mask, visit_minutes):
+        """
+        [dzień, komórka] → True, jeśli od komórki mieści się cała wizyta.
+        """
+        n = self._cells_for(visit_minutes)
+        days, cells = mask.shape
+        result = np.zeros((days, cells), dtype=bool)
+
+        if n <= cells:
+            result[:, :cells - n + 1] = sliding_window_view(mask, n, axis=1).all(axis=2)
+
+        return result
+
+    def _nice_columns(self, visit_minutes):
+        allowed = NICE_START_MINUTES.get(visit_minutes)
+        if allowed is None:
+            return np.ones(self.grid.cells, dtype=bool)
+
+        minutes = (self.grid.first_minute + np.arange(self.grid.cells) * self.grid.slot_minutes) % 60
+        return np.isin(minutes, list(allowed))
+
+    def valid_starts(self, visit_minutes, nice=True):
+        """
+        Maska [dzień, komórka] możliwych początków wizyty
+        (liczona raz na długość wizyty – mapa się nie zmienia).
+        """
+        key = (visit_minutes, nice)
+        starts = self._starts.get(key)
+
+        if starts is None:
+            starts = self._fits(self.free, visit_minutes)
+            if nice:
+                starts &= self._nice_columns(visit_minutes)
+            self._starts[key] = starts
+
+        return starts
+
+    def day(self, index):
+        return self.first_day + timedelta(days=int(index))
+
+    def cell_start(self, day_index, cell):
+        return (
+            datetime.combine(self.day(day_index), self.grid.start)
+            + timedelta(minutes=int(cell) * self.grid.slot_minutes)
+        )
+
+    def iter_starts(self, visit_minutes, nice=True):
+        """
+        Początki wizyt rosnąco (wiersz po wierszu = chronologicznie).
+        """
+        days, cells = np.nonzero(self.valid_starts(visit_minutes, nice))
+        for day_index, cell in zip(days, cells):
+            yield self.cell_start(day_index, cell)
+
+    def days_with_start(self, visit_minutes, nice=True, min_day=None):
+        days = np.flatnonzero(self.valid_starts(visit_minutes, nice).any(axis=1))
+        result = [self.day(i) for i in days]
+
+        if min_day is not None:
+            result = [d for d in result if d >= min_day]
+        return result
+
+    def _day_index(self, day):
+        index = (day - self.first_day).days
+        return index if 0 <= index < self.free.shape[0] else None
+
+    def is_closed(self, day):
+        index = self._day_index(day)
+        return index is None or bool(self.closed[index])
+
+    def starts_on(self, day, visit_minutes, nice=True):
+        index = self._day_index(day)
+        if index is None:
+            return []
+
+        cells = np.flatnonzero(self.valid_starts(visit_minutes, nice)[index])
+        return [self.cell_start(index, c) for c in cells]
+
+    def busy_on(self, day):
+        lo = datetime.combine(day, time.min)
+        hi = lo + timedelta(days=1)
+        return [(s, e) for s, e in self.busy if s < hi and e > lo]
+
+    def check(self, start, visit_minutes):
+        """
+        None – termin wolny, UNAVAILABLE – brak aktywnych slotów / dzień
+        zamknięty, OCCUPIED – sloty są, ale termin zajęty.
+        """
+        index = self._day_index(start.date())
+        if index is None or self.closed[index]:
+            return UNAVAILABLE
+
+        offset = (
+            (start.hour * 60 + start.minute - self.grid.first_minute) * 60
+            + start.second
+        )
+        step = self.grid.slot_minutes * 60
+        n = self._cells_for(visit_minutes)
+
+        if start.microsecond or offset < 0 or offset % step:
+            return UNAVAILABLE
+
+        cell = offset // step
+        if cell + n > self.grid.cells:
+            return UNAVAILABLE
+
+        if not self.active[index, cell:cell + n].all():
+            return UNAVAILABLE
+
+        if self.occupied[index, cell:cell + n].any():
+            return OCCUPIED
+
+        return None
+
+
+# ───────────────────────────────────────
+# ŁADOWANIE Z BAZY
+# ───────────────────────────────────────
+
+def load(doctor_id, first_day, end_day, *, statuses=BUSY_STATUSES,
+         exclude_appointment_id=None, grid=DEFAULT_GRID):
+    """
+    Cztery zapytania (sloty, wizyty, blokady, urlopy) – same kolumny,
+    bez obiektów ORM.
+    """
+    range_start = datetime.combine(first_day, time.min)
+    range_end = datetime.combine(end_day, time.min)
+
+    slots = (
+        db.session.query(Availability.start, Availability.end)
+        .filter(
+            Availability.doctor_id == doctor_id,
+            Availability.start >= range_start,
+            Availability.start < range_end,
+            Availability.active.is_(True)
+        )
+        .all()
+    )
+
+    q = (
+        db.session.query(Appointment.start, Appointment.end)
+        .filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.status.in_(statuses),
+            Appointment.start < range_end,
+            Appointment.end > range_start
+        )
+    )
+
+    if exclude_appointment_id is not None:
+        q = q.filter(Appointment.id != exclude_appointment_id)
+
+    busy = [(s, e) for s, e in q.all()]
+
+    # ⏳ blokady na czas płatności online zajmują termin jak wizyty
+    busy += [
+        (h.start, h.end)
+        for h in read_models.holds(doctor_id, range_start, range_end)
+    ]
+
+    vacations = (
+        db.session.query(Vacation.date_from, Vacation.date_to)
+        .filter(
+            Vacation.doctor_id == doctor_id,
+            Vacation.active.is_(True),
+            Vacation.date_from < end_day,
+            Vacation.date_to >= first_day
+        )
+        .all()
+    )
+
+    return AvailabilityMap(
+        first_day,
+        end_day,
+        slots=[(s, e) for s, e in slots],
+        busy=busy,
+        closed_ranges=[(f, t) for f, t in vacations],
+        grid=grid,
+    )
+
+
+def load_day(doctor_id, day, **kwargs):
+    return load(doctor_id, day, day + timedelta(days=1), **kwargs)
+
+
+# ───────────────────────────────────────
+# NAJBLIŻSZY WOLNY TERMIN
+# ───────────────────────────────────────
+
+def _next_active_day(doctor_id, since, until):
+    """
+    Dzień pierwszego aktywnego slotu w [since, until) – przeskok nad
+    tygodniami bez grafiku jednym zapytaniem MIN() po indeksie.
+    """
+    first = (
+        db.session.query(func.min(Availability.start))
+        .filter(
+            Availability.doctor_id == doctor_id,
+            Availability.active.is_(True),
+            Availability.start >= since,
+            Availability.start < until
+        )
+        .scalar()
+    )
+    return first.date() if first else None
+
+
+def first_available(doctor_id, visit_minutes, after, limit=1, *,
+                    horizon_days=SEARCH_HORIZON_DAYS, nice=True, grid=DEFAULT_GRID):
+    """
+    Pierwsze `limit` wolnych początków wizyty >= after (datetime).
+    Zwraca (starts, searched_until) – searched_until to pierwszy dzień
+    poza przeszukanym zakresem.
+    """
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    horizon = after.date() + timedelta(days=horizon_days)
+    window = SEARCH_FIRST_WINDOW_DAYS
+
+    starts = []
+    day = after.date()
+
+    while day < horizon:
+        since = max(after, datetime.combine(day, time.min))
+        day = _next_active_day(doctor_id, since, datetime.combine(horizon, time.min))
+        if day is None:
+            break
+
+        end_day = min(day + timedelta(days=window), horizon)
+        availability = load(doctor_id, day, end_day, grid=grid)
+
+        for start in availability.iter_starts(visit_minutes, nice):
+            if start >= after:
+                starts.append(start)
+                if len(starts) == limit:
+                    return starts, end_day
+
+        day = end_day
+        window = min(window * 2, SEARCH_MAX_WINDOW_DAYS)
+
+    return starts, horizon
@@ -0,0 +1,458 @@
+"""
+Zmiany dostępności → otwarte strony rezerwacji (Server-Sent Events).
+
+Zapis: record_change(doctor_id, day_from, day_to) w tej samej transakcji
+co zmiana (rezerwacja, anulowanie, przeniesienie, sloty, urlopy) –
+wiersz w availability_changes.
+
+Odczyt: jeden wątek na proces (hub) czyta nowe wiersze co POLL_SECONDS,
+a po commicie ze zmianą w tym samym procesie – od razu. Dni trafiają
+do subskrybentów, których miesiąc obejmują. Przy kilku workerach
+każdy widzi zmiany pozostałych przez tabelę (polling bazy).
+
+Każdy wpis ma typ (kind) i id obiektu (ref_id) – kalendarz lekarza
+dostaje z nich zdarzenia "delta" (subscribe_calendar), strony
+rezerwacji tylko dni.
+
+Strumień zajmuje wątek workera aż do STREAM_MAX_SECONDS – domyślnie
+wyłączone; LIVE_UPDATES=1 tylko z workerami gthread (gunicorn.conf.py).
+Zapis zmian działa zawsze.
+"""
+import queue
+import threading
+import time as _time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import AvailabilityChange
+
+
+# ───────────────────────────────────────
+# KONFIGURACJA
+# ───────────────────────────────────────
+
+POLL_SECONDS = 2.0
+HEARTBEAT_SECONDS = 15.0
+
+# połączenie zamykane po tym czasie – EventSource sam się połączy
+# ponownie (z Last-Event-ID), a worker nie jest zajęty bez końca
+STREAM_MAX_SECONDS = 600
+
+# otwarte strumienie na proces: każdy trzyma wątek workera, więc
+# najwyżej ta część WEB_THREADS (gunicorn.conf.py, gthread) –
+# reszta zostaje dla zwykłych żądań
+STREAM_THREAD_SHARE = 0.5
+
+# zbudowane zdarzenia współdzielone przez strumienie (shared_payload)
+SHARED_PAYLOADS = 64
+
+# wiersze z jednego odczytu
+BATCH_SIZE = 500
+
+# jobs/archive_availability.py usuwa starsze wpisy
+KEEP_HOURS = 24
+
+_PENDING = "availability_changed"
+
+# typy zmian (kind) – ref_id to id wizyty / blokady / slotu / urlopu
+KINDS = (
+    "appointment.created",
+    "appointment.moved",
+    "appointment.updated",
+    "appointment.cancelled",
+    "appointment.paid",
+    "appointment.completed",
+    "hold.created",
+    "hold.expired",
+    "slot.toggled",
+    "slots.generated",
+    "vacation.changed",
+)
+
+# zmiany widoczne tylko w kalendarzu lekarza – wolne terminy bez zmian
+CALENDAR_ONLY = {"appointment.paid", "appointment.completed"}
+
+
+# ───────────────────────────────────────
+# LIMIT STRUMIENI
+# ───────────────────────────────────────
+
+def max_streams():
+    """
+    0 – zmiany na żywo wyłączone (LIVE_UPDATES) albo worker
+    bez wątków na strumienie (sync, WEB_THREADS = 1).
+    """
+    config = current_app.config
+
+    if not config.get("LIVE_UPDATES"):
+        return 0
+
+    return int(config.get("WEB_THREADS", 1) * STREAM_THREAD_SHARE)
+
+
+def enabled():
+    return max_streams() > 0
+
+
+# ───────────────────────────────────────
+# ZAPIS
+# ───────────────────────────────────────
+
+def record_change(doctor_id, day_from, day_to=None, *, kind=None, ref_id=None):
+    """
+    Dodaje wpis do sesji (bez commita) – zapisze się razem ze zmianą.
+    Przyjmuje date albo datetime; kind – jeden z KINDS.
+    """
+    if isinstance(day_from, datetime):
+        day_from = day_from.date()
+    if isinstance(day_to, datetime):
+        day_to = day_to.date()
+
+    day_to = day_to or day_from
+
+    db.session.add(AvailabilityChange(
+        doctor_id=doctor_id,
+        day_from=min(day_from, day_to),
+        day_to=max(day_from, day_to),
+        kind=kind,
+        ref_id=ref_id,
+    ))
+    db.session.info[_PENDING] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop(_PENDING, False):
+        hub.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
+
+
+def latest_id():
+    return db.session.query(func.max(AvailabilityChange.id)).scalar() or 0
+
+
+def changes_since(last_id, doctor_id=None, limit=BATCH_SIZE):
+    q = (
+        db.session.query(
+            AvailabilityChange.id,
+            AvailabilityChange.doctor_id,
+            AvailabilityChange.day_from,
+            AvailabilityChange.day_to,
+            AvailabilityChange.kind,
+            AvailabilityChange.ref_id
+        )
+        .filter(AvailabilityChange.id > last_id)
+    )
+
+    if doctor_id is not None:
+        q = q.filter(AvailabilityChange.doctor_id == doctor_id)
+
+    return q.order_by(AvailabilityChange.id).limit(limit).all()
+
+
+def prune(now=None):
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=KEEP_HOURS)
+
+    deleted = (
+        AvailabilityChange.query
+        .filter(AvailabilityChange.created_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.session.commit()
+    return deleted
+
+
+# ───────────────────────────────────────
+# SUBSKRYPCJE
+# ───────────────────────────────────────
+
+# w kolejce subskrypcji: koniec strumienia (zastąpiony nowym)
+_CLOSE = object()
+
+
+class Subscription:
+    """
+    Jedna otwarta strona: lekarz + dni [first_day, end_day).
+    """
+
+    def __init__(self, doctor_id, first_day, end_day, last_id, key=None):
+        self.doctor_id = doctor_id
+        self.first_day = first_day
+        self.end_day = end_day
+        self.last_id = last_id
+        self.key = key
+        self._queue = queue.SimpleQueue()
+
+    def close(self):
+        self._queue.put(_CLOSE)
+
+    def wants(self, kind):
+        return kind not in CALENDAR_ONLY
+
+    def offer(self, change_id, doctor_id, day_from, day_to, kind=None, ref_id=None):
+        if doctor_id != self.doctor_id or change_id <= self.last_id:
+            return
+
+        if not self.wants(kind):
+            return
+
+        lo = max(day_from, self.first_day)
+        hi = min(day_to, self.end_day - timedelta(days=1))
+
+        if lo <= hi:
+            days = {lo + timedelta(days=i) for i in range((hi - lo).days + 1)}
+            self._queue.put((change_id, days, [(kind, ref_id)]))
+
+    def events(self, max_seconds=STREAM_MAX_SECONDS):
+        """
+        (id, {dni}, [(kind, ref_id)]) – kilka zmian naraz łączonych
+        w jedno zdarzenie; (None, None, None) co HEARTBEAT_SECONDS bez zmian.
+        """
+        deadline = _time.monotonic() + max_seconds
+
+        while True:
+            timeout = min(HEARTBEAT_SECONDS, deadline - _time.monotonic())
+            if timeout <= 0:
+                return
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                yield None, None, None
+                continue
+
+            if item is _CLOSE:
+                return
+
+            change_id, days, changes = item
+
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if item is _CLOSE:
+                    return
+
+                more_id, more_days, more_changes = item
+                change_id = max(change_id, more_id)
+                days |= more_days
+                changes += more_changes
+
+            if change_id <= self.last_id:
+                continue
+
+            self.last_id = change_id
+            yield change_id, days, changes
+
+
+class CalendarSubscription(Subscription):
+    """
+    Kalendarz lekarza – wszystkie typy zmian, także bez wpływu
+    na wolne terminy (opłacenie, zrealizowanie).
+    """
+
+    def wants(self, kind):
+        return True
+
+
+class Hub:
+    """
+    Rozsyłanie zmian do subskrybentów w procesie.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._wake = threading.Event()
+        self._thread = None
+        self._app = None
+        self.cursor = None
+
+    def subscribe(self, doctor_id, first_day, end_day, last_event_id=None, *,
+                  calendar=False, key=None):
+        """
+        Wymaga kontekstu aplikacji. None – limit strumieni wyczerpany
+        (albo zmiany na żywo wyłączone).
+        last_event_id (ponowne połączenie) → najpierw zaległe zmiany.
+        key – poprzedni strumień z tym samym kluczem (ta sama karta)
+        jest zamykany od razu, a nie dopiero przy następnym zapisie.
+        """
+        limit = max_streams()
+
+        with self._lock:
+            if limit and key is not None:
+                for old in [other for other in self._subscribers if other.key == key]:
+                    self._subscribers.discard(old)
+                    old.close()
+
+            if len(self._subscribers) >= limit:
+                return None
+
+        current = latest_id()
+        last_id = current
+
+        if last_event_id is not None and 0 <= last_event_id < current:
+            last_id = last_event_id
+
+        cls = CalendarSubscription if calendar else Subscription
+        sub = cls(doctor_id, first_day, end_day, last_id, key)
+
+        if last_id < current:
+            for change in changes_since(last_id, doctor_id):
+                sub.offer(*change)
+
+        with self._lock:
+            if self.cursor is None or not self._subscribers:
+                self.cursor = current
+            self._subscribers.add(sub)
+            self._start()
+
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def wake(self):
+        self._wake.set()
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._app = current_app._get_current_object()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="availability-events",
+            daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+
+            with self._lock:
+                subscribers = list(self._subscribers)
+                cursor = self.cursor
+
+            if not subscribers:
+                continue
+
+            try:
+                with self._app.app_context():
+                    changes = changes_since(cursor)
+                    db.session.remove()
+            except Exception as e:
+                self._app.logger.warning(f"[AVAILABILITY EVENTS] poll failed: {e}")
+                continue
+
+            if not changes:
+                continue
+
+            with self._lock:
+                self.cursor = max(self.cursor or 0, changes[-1].id)
+
+            for change in changes:
+                for sub in subscribers:
+                    sub.offer(*change)
+
+            # więcej niż jedna partia – od razu kolejny odczyt
+            if len(changes) == BATCH_SIZE:
+                self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "cursor": self.cursor}
+
+
+hub = Hub()
+
+
+def subscribe(doctor_id, first_day, end_day, last_event_id=None):
+    return hub.subscribe(doctor_id, first_day, end_day, last_event_id)
+
+
+def subscribe_calendar(doctor_id, first_day, end_day, last_event_id=None, tab=None):
+    """
+    tab – id karty przeglądarki: zmiana zakresu kalendarza zamyka
+    poprzedni strumień tej karty.
+    """
+    key = ("calendar", doctor_id, tab) if tab else None
+    return hub.subscribe(
+        doctor_id, first_day, end_day, last_event_id, calendar=True, key=key
+    )
+
+
+def unsubscribe(sub):
+    hub.unsubscribe(sub)
+
+
+# ───────────────────────────────────────
+# WSPÓLNE ZDARZENIA
+# ───────────────────────────────────────
+
+class _Shared:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedPayloads:
+    """
+    Jedna zmiana budzi naraz wszystkie strumienie – zdarzenie o tym samym
+    kluczu buduje pierwszy z nich, pozostałe czekają na jego wynik.
+    """
+
+    def __init__(self, size=SHARED_PAYLOADS):
+        self._size = size
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key, build):
+        with self._lock:
+            entry = self._items.get(key)
+            owner = entry is None
+
+            if owner:
+                entry = self._items[key] = _Shared()
+                while len(self._items) > self._size:
+                    self._items.popitem(last=False)
+
+        if owner:
+            try:
+                entry.value = build()
+            except Exception as e:
+                entry.error = e
+                with self._lock:
+                    if self._items.get(key) is entry:
+                        del self._items[key]
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+
+        if entry.error is not None:
+            raise entry.error
+
+        return entry.value
+
+
+payloads = SharedPayloads()
+
+
+def shared_payload(key, build):
+    return payloads.get(key, build)
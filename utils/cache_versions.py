@@ -0,0 +1,263 @@
+"""
+Wersje cache w pamięci procesu – spójność między workerami bez Redisa.
+
+Zapis: każda transakcja, która zmienia śledzone modele (TRACKED), przed
+commitem podbija wiersz "nazwy" w cache_versions – w tej samej
+transakcji. Dotyczy zmian przez sesję (add / zmiana pól / delete)
+i zbiorczych Query.update() / delete() – filtr kolumn z TRACKED
+obowiązuje w obu przypadkach. Zmiany poza aplikacją: bump()
+albo ręczne podbicie wiersza.
+
+Odczyt: current(name) czyta całą (kilkuwierszową) tabelę najwyżej raz
+na CHECK_MS w procesie; pomiędzy zwraca ostatnio odczytane numery.
+Po własnym commicie proces czyta wersje od razu.
+
+VersionedCache – wartość liczona raz i przeładowywana po zmianie wersji.
+"""
+import threading
+import time as _time
+from datetime import datetime
+
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import (
+    Appointment,
+    Availability,
+    CacheVersion,
+    Setting,
+    SlotHold,
+    Vacation,
+    VisitType,
+)
+
+
+# jak długo inne workery mogą widzieć starą wersję
+CHECK_MS = 1000
+
+# model → (nazwa wersji, kolumny; None = każda zmiana)
+TRACKED = {
+    Setting: ("settings", None),
+    VisitType: ("visit_types", None),
+    Availability: ("availability", None),
+    Vacation: ("availability", None),
+    SlotHold: ("availability", None),
+    # status synchronizacji Google itp. nie zmienia wolnych terminów
+    Appointment: ("availability", {"doctor_id", "start", "end", "status"}),
+}
+
+_PENDING = "cache_versions_pending"
+_BUMPED = "cache_versions_bumped"
+
+_lock = threading.Lock()
+
+_versions = {}
+_checked_at = None
+
+
+# ───────────────────────────────────────
+# ZAPIS
+# ───────────────────────────────────────
+
+def bump(name):
+    """
+    Podbicie wersji przy commicie bieżącej transakcji (poza TRACKED).
+    """
+    db.session.info.setdefault(_PENDING, set()).add(name)
+
+
+def _tracked_name(obj, only_changed):
+    tracked = TRACKED.get(type(obj))
+    if tracked is None:
+        return None
+
+    name, columns = tracked
+
+    if only_changed and columns is not None:
+        attrs = inspect(obj).attrs
+        if not any(attrs[c].history.has_changes() for c in columns):
+            return None
+
+    return name
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session, flush_context, instances):
+    names = set()
+
+    for obj in list(session.new) + list(session.deleted):
+        names.add(_tracked_name(obj, only_changed=False))
+
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            names.add(_tracked_name(obj, only_changed=True))
+
+    names.discard(None)
+    if names:
+        session.info.setdefault(_PENDING, set()).update(names)
+
+
+def _key_name(key):
+    return key if isinstance(key, str) else getattr(key, "key", None)
+
+
+def _update_columns(state):
+    """
+    Kolumny zbiorczego UPDATE: .values() / Query.update({...}) oraz
+    klucze wierszy w UPDATE po kluczu głównym (execute(update(M), rows)).
+    None – nie da się ustalić (traktowane jak zmiana wszystkiego).
+    """
+    stmt = state.statement
+    keys = list(getattr(stmt, "_values", None) or ())
+    keys += [key for key, _ in getattr(stmt, "_ordered_values", None) or ()]
+
+    params = state.parameters
+    rows = params if isinstance(params, (list, tuple)) else [params or {}]
+    for row in rows:
+        keys += list(row)
+
+    names = {_key_name(key) for key in keys}
+    if not names or None in names:
+        return None
+
+    return names
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _orm_execute(state):
+    if not (state.is_update or state.is_delete or state.is_insert):
+        return
+
+    mapper = state.bind_mapper
+    tracked = TRACKED.get(mapper.class_) if mapper is not None else None
+
+    if tracked is None:
+        return
+
+    name, columns = tracked
+
+    # np. same *_reminder_sent_at – wolne terminy bez zmian
+    if state.is_update and columns is not None:
+        changed = _update_columns(state)
+        if changed is not None and not changed & columns:
+            return
+
+    state.session.info.setdefault(_PENDING, set()).add(name)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    # ostatni flush commita byłby już po tym zdarzeniu
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+
+    names = session.info.pop(_PENDING, None)
+    if not names:
+        return
+
+    conn = session.connection()
+    table = CacheVersion.__table__
+    now = datetime.utcnow()
+
+    # stała kolejność – dwie transakcje nie blokują się nawzajem
+    for name in sorted(names):
+        bumped = conn.execute(
+            update(table)
+            .where(table.c.name == name)
+            .values(version=table.c.version + 1, updated_at=now)
+        ).rowcount
+
+        if not bumped:
+            conn.execute(insert(table).values(name=name, version=1, updated_at=now))
+
+    session.info[_BUMPED] = names
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop(_BUMPED, None):
+        forget()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
+    session.info.pop(_BUMPED, None)
+
+
+# ───────────────────────────────────────
+# ODCZYT
+# ───────────────────────────────────────
+
+def current(name):
+    global _versions, _checked_at
+
+    now = _time.monotonic()
+
+    with _lock:
+        if _checked_at is not None and (now - _checked_at) * 1000 < CHECK_MS:
+            return _versions.get(name, 0)
+
+    versions = dict(
+        db.session.execute(select(CacheVersion.name, CacheVersion.version)).all()
+    )
+
+    with _lock:
+        _versions = versions
+        _checked_at = now
+
+    return versions.get(name, 0)
+
+
+def forget():
+    """
+    Następne current() czyta wersje z bazy.
+    """
+    global _checked_at
+
+    with _lock:
+        _checked_at = None
+
+
+class VersionedCache:
+    """
+    Wartość load() trzymana w procesie do zmiany wersji name
+    (albo najwyżej max_age_seconds – zabezpieczenie na ręczny SQL).
+    """
+
+    def __init__(self, name, load, max_age_seconds=300):
+        self.name = name
+        self._load = load
+        self._max_age = max_age_seconds
+        self._lock = threading.Lock()
+        self._entry = None    # (wersja, time.monotonic(), wartość)
+
+    def get(self):
+        return self._current()[2]
+
+    @property
+    def version(self):
+        return self._current()[0]
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+
+    def _current(self):
+        version = current(self.name)
+        entry = self._entry
+
+        if (
+            entry is None
+            or entry[0] != version
+            or _time.monotonic() - entry[1] > self._max_age
+        ):
+            entry = (version, _time.monotonic(), self._load())
+
+            with self._lock:
+                # równoległe przeładowanie z nowszą wersją wygrywa
+                if self._entry is None or self._entry[0] <= version:
+                    self._entry = entry
+
+        return entry
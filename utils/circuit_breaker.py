@@ -0,0 +1,237 @@
+"""
+Circuit breaker + bulkhead dla dostawców zewnętrznych
+(google / smsapi / resend / p24).
+
+- closed     – wywołania normalnie; failure_threshold błędów z rzędu → open,
+- open       – natychmiastowy ProviderUnavailable przez reset_timeout sekund,
+- half_open  – przepuszcza jedno wywołanie próbne: sukces → closed,
+               błąd → znowu open,
+- bulkhead   – najwyżej max_concurrency równoległych wywołań dostawcy;
+               kolejne od razu ProviderUnavailable zamiast czekać
+               w kolejce na wolny wątek.
+
+Stan jest per proces (każdy worker liczy osobno).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# provider → ustawienia (reszta z DEFAULTS)
+DEFAULTS = {
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+    "max_concurrency": 8,
+}
+
+PROVIDERS = {
+    "google": {"max_concurrency": 4},
+    "smsapi": {},
+    "resend": {},
+    "p24": {"failure_threshold": 3},
+}
+
+
+class ProviderUnavailable(Exception):
+    """
+    Wywołanie odrzucone bez kontaktu z dostawcą.
+    """
+
+    def __init__(self, provider, reason, retry_after=None):
+        self.provider = provider
+        self.reason = reason                 # open | half_open | bulkhead
+        self.retry_after = retry_after
+        super().__init__(f"{provider} unavailable ({reason})")
+
+
+class _Call:
+    """
+    Wynik wywołania w guard() – fail() dla odpowiedzi, które nie rzucają
+    wyjątku, a świadczą o awarii (np. HTTP 5xx).
+    """
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, *, failure_threshold, reset_timeout, max_concurrency, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_concurrency = max_concurrency
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probe_running = False
+
+        # liczniki do podglądu (admin / metrics)
+        self.in_flight = 0
+        self.rejected = 0
+        self.opened_count = 0
+        self.last_error = None
+
+    # ───────────────────────────────────────
+    # STAN
+    # ───────────────────────────────────────
+    def _admit(self):
+        """
+        True, jeśli wywołanie jest próbą half-open.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                waited = self._clock() - self.opened_at
+                if waited < self.reset_timeout:
+                    self.rejected += 1
+                    raise ProviderUnavailable(self.name, OPEN, self.reset_timeout - waited)
+                self.state = HALF_OPEN
+
+            if self.state == HALF_OPEN:
+                if self._probe_running:
+                    self.rejected += 1
+                    raise ProviderUnavailable(self.name, HALF_OPEN)
+                self._probe_running = True
+                return True
+
+            return False
+
+    def _record(self, probe, error):
+        with self._lock:
+            if probe:
+                self._probe_running = False
+
+            if error is None:
+                self.state = CLOSED
+                self.failures = 0
+                self.opened_at = None
+                return
+
+            self.failures += 1
+            self.last_error = error
+
+            if probe or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened_count += 1
+                self.state = OPEN
+                self.opened_at = self._clock()
+
+    # ───────────────────────────────────────
+    # WYWOŁANIE
+    # ───────────────────────────────────────
+    @contextmanager
+    def guard(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ProviderUnavailable(self.name, "bulkhead")
+
+        try:
+            probe = self._admit()
+        except ProviderUnavailable:
+            self._slots.release()
+            raise
+
+        call = _Call()
+        with self._lock:
+            self.in_flight += 1
+
+        try:
+            yield call
+        except Exception as e:
+            self._record(probe, f"{type(e).__name__}: {e}")
+            raise
+        else:
+            self._record(probe, "failure reported" if call.failed else None)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probe_running = False
+
+    def snapshot(self):
+        with self._lock:
+            retry_after = None
+            if self.state == OPEN:
+                retry_after = max(0.0, self.reset_timeout - (self._clock() - self.opened_at))
+
+            return {
+                "provider": self.name,
+                "state": self.state,
+                "failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_after": round(retry_after, 1) if retry_after is not None else None,
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "rejected": self.rejected,
+                "opened_count": self.opened_count,
+                "last_error": self.last_error,
+            }
+
+
+# ───────────────────────────────────────
+# REJESTR (PER PROCES)
+# ───────────────────────────────────────
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+def get_breaker(provider):
+    breaker = _breakers.get(provider)
+
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(provider)
+            if breaker is None:
+                settings = dict(DEFAULTS, **PROVIDERS.get(provider, {}))
+                breaker = CircuitBreaker(provider, **settings)
+                _breakers[provider] = breaker
+
+    return breaker
+
+
+def guard(provider):
+    return get_breaker(provider).guard()
+
+
+def is_available(provider):
+    """
+    Szybkie sprawdzenie bez rezerwowania wywołania (np. przed
+    kosztowną budową klienta Google).
+    """
+    breaker = get_breaker(provider)
+    with breaker._lock:
+        return not (
+            breaker.state == OPEN
+            and breaker._clock() - breaker.opened_at < breaker.reset_timeout
+        )
+
+
+def snapshot():
+    return [get_breaker(name).snapshot() for name in sorted(set(PROVIDERS) | set(_breakers))]
+
+
+def reset(provider=None):
+    for name, breaker in list(_breakers.items()):
+        if provider is None or name == provider:
+            breaker.reset()
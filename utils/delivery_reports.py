@@ -0,0 +1,256 @@
+"""
+Raporty doręczenia od dostawców (webhooki SMSAPI i Resend).
+
+Raport → DeliveryReport, a apply_reports() nanosi partię raportów
+na SMSMessage / EmailMessage po provider_message_id:
+- jeden SELECT … IN (…) i jeden UPDATE po kluczu głównym na partię,
+- idempotentnie – powtórzony raport zapisuje to samo, a starszy
+  (delivery_updated_at) nie nadpisuje nowszego.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import update
+
+from extensions import db
+
+
+# raporty z jednego żądania przetwarzane w partiach po tyle id
+BATCH_SIZE = 500
+
+# Resend (Svix): maksymalny wiek podpisanego żądania
+SIGNATURE_TOLERANCE_SECONDS = 5 * 60
+
+
+class DeliveryReport(NamedTuple):
+    provider_message_id: str
+    status: str                     # delivered, undelivered, bounced, …
+    occurred_at: datetime           # UTC, bez strefy
+    failed: bool = False            # ostateczna porażka → status "failed"
+    error: Optional[str] = None
+
+
+# ───────────────────────────────────────
+# SMSAPI
+# ───────────────────────────────────────
+
+# kod → (status, ostateczna porażka)
+SMSAPI_STATUSES = {
+    "401": ("not_found", True),
+    "402": ("expired", True),
+    "403": ("sent", False),
+    "404": ("delivered", False),
+    "405": ("undelivered", True),
+    "406": ("failed", True),
+    "407": ("rejected", True),
+    "408": ("unknown", False),
+    "409": ("queue", False),
+    "410": ("accepted", False),
+    "411": ("renewal", False),
+    "412": ("stop", True),
+}
+
+
+def verify_smsapi_token(expected, received) -> bool:
+    """
+    SMSAPI nie podpisuje callbacków – sekret w adresie (?token=…).
+    """
+    return bool(expected) and hmac.compare_digest(
+        str(received or "").encode(), str(expected).encode()
+    )
+
+
+def _split(values, key):
+    raw = values.get(key) or ""
+    return raw.split(",") if raw else []
+
+
+def parse_smsapi(values):
+    """
+    Callback SMSAPI (GET/POST): wiele raportów w jednym żądaniu,
+    wartości parametrów rozdzielone przecinkami.
+    """
+    ids = _split(values, "MsgId")
+    codes = _split(values, "status")
+    dates = _split(values, "donedate")
+
+    reports = []
+
+    for i, msg_id in enumerate(ids):
+        code = codes[i] if i < len(codes) else ""
+        status, failed = SMSAPI_STATUSES.get(code, (f"status_{code or 'unknown'}", False))
+
+        try:
+            occurred_at = datetime.fromtimestamp(int(dates[i]), timezone.utc).replace(tzinfo=None)
+        except (IndexError, ValueError):
+            occurred_at = datetime.utcnow()
+
+        reports.append(DeliveryReport(
+            provider_message_id=msg_id.strip(),
+            status=status,
+            occurred_at=occurred_at,
+            failed=failed,
+            error=f"SMSAPI: {status} ({code})" if failed else None,
+        ))
+
+    return reports
+
+
+# ───────────────────────────────────────
+# RESEND
+# ───────────────────────────────────────
+
+# typ zdarzenia → (status, ostateczna porażka); opened / clicked pomijamy
+RESEND_EVENTS = {
+    "email.sent": ("sent", False),
+    "email.delivered": ("delivered", False),
+    "email.delivery_delayed": ("delayed", False),
+    "email.complained": ("complained", False),
+    "email.bounced": ("bounced", True),
+    "email.failed": ("failed", True),
+}
+
+
+def verify_resend_signature(secret, headers, body: bytes, now=None) -> bool:
+    """
+    Podpis Svix: HMAC-SHA256("{svix-id}.{svix-timestamp}.{body}")
+    kluczem whsec_…, nagłówek svix-signature: "v1,<base64> v1,<base64>".
+    """
+    msg_id = headers.get("svix-id")
+    timestamp = headers.get("svix-timestamp")
+    signatures = headers.get("svix-signature")
+
+    if not (secret and msg_id and timestamp and signatures):
+        return False
+
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        return False
+
+    now = time.time() if now is None else now
+    if abs(now - sent_at) > SIGNATURE_TOLERANCE_SECONDS:
+        return False
+
+    try:
+        key = base64.b64decode(secret.split("_", 1)[1] if secret.startswith("whsec_") else secret)
+    except ValueError:
+        return False
+
+    signed = f"{msg_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest())
+
+    for item in signatures.split():
+        version, _, signature = item.partition(",")
+        if version == "v1" and hmac.compare_digest(signature.encode(), expected):
+            return True
+
+    return False
+
+
+def _parse_timestamp(value):
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return datetime.utcnow()
+
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_resend(payload):
+    """
+    Zdarzenie Resend (albo lista zdarzeń) → raporty.
+    """
+    events = payload if isinstance(payload, list) else [payload]
+    reports = []
+
+    for event in events:
+        mapped = RESEND_EVENTS.get(event.get("type"))
+        data = event.get("data") or {}
+
+        if mapped is None or not data.get("email_id"):
+            continue
+
+        status, failed = mapped
+        error = None
+
+        if failed:
+            detail = (data.get("bounce") or data.get("failed") or {}).get("message")
+            error = f"Resend: {status}" + (f" – {detail}" if detail else "")
+
+        reports.append(DeliveryReport(
+            provider_message_id=data["email_id"],
+            status=status,
+            occurred_at=_parse_timestamp(event.get("created_at") or data.get("created_at")),
+            failed=failed,
+            error=error,
+        ))
+
+    return reports
+
+
+# ───────────────────────────────────────
+# ZAPIS
+# ───────────────────────────────────────
+
+def apply_reports(model, reports):
+    """
+    Nanosi raporty na model (SMSMessage / EmailMessage).
+    Zwraca {"received", "matched", "updated"}.
+    """
+    latest = {}
+    for report in reports:
+        current = latest.get(report.provider_message_id)
+        if current is None or report.occurred_at >= current.occurred_at:
+            latest[report.provider_message_id] = report
+
+    ids = list(latest)
+    rows = []
+    matched = 0
+
+    for i in range(0, len(ids), BATCH_SIZE):
+        found = (
+            db.session.query(
+                model.id,
+                model.provider_message_id,
+                model.delivery_updated_at
+            )
+            .filter(model.provider_message_id.in_(ids[i:i + BATCH_SIZE]))
+            .all()
+        )
+
+        for message_id, provider_message_id, updated_at in found:
+            report = latest[provider_message_id]
+            matched += 1
+
+            # nowszy raport już zapisany
+            if updated_at is not None and updated_at > report.occurred_at:
+                continue
+
+            row = {
+                "id": message_id,
+                "delivery_status": report.status,
+                "delivery_updated_at": report.occurred_at,
+            }
+
+            if report.status == "delivered":
+                row["delivered_at"] = report.occurred_at
+
+            if report.failed:
+                row["status"] = "failed"
+                row["error_message"] = report.error
+
+            rows.append(row)
+
+    if rows:
+        # bulk UPDATE po kluczu głównym (SQLAlchemy grupuje wiersze po zestawie kolumn)
+        db.session.execute(update(model), rows)
+        db.session.commit()
+
+    return {"received": len(reports), "matched": matched, "updated": len(rows)}
@@ -1,10 +1,14 @@
-import resend
 from datetime import datetime
 from flask import current_app
+from sqlalchemy import update
 
 from extensions import db
 from models import Appointment, EmailMessage
 from utils.settings import get_setting
+from utils.http_clients import get_client
+from utils.message_templates import (
+    current, dump_params, appointment_params, get_template, render, render_many
+)
 
 
 class EmailService:
@@ -13,7 +17,6 @@ class EmailService:
         self.enabled = get_setting("email_enabled", "1") == "1"
 
         self.resend_api_key = current_app.config.get("RESEND_API_KEY")
-        resend.api_key = self.resend_api_key
         self.sender = current_app.config.get("MAIL_FROM")
 
         self.base_url = (
@@ -32,67 +35,156 @@ class EmailService:
         )
 
     # ───────────────────────────────────────
-    # CORE SEND (SENDGRID API)
+    # CORE SEND (RESEND API)
     # ───────────────────────────────────────
+    def _client(self):
+        client = get_client("resend")
+        client.configure(self.resend_api_key)
+        return client
+
+    def _message(self, *, to_email, subject, body, html=True) -> dict:
+        return {
+            "from": self.sender or "onboarding@resend.dev",
+            "to": [to_email],
+            "subject": subject,
+            "html": body if html else None,
+            "text": body if not html else None,
+        }
+
     def _send_email(self, *, to_email, subject, body, html=True):
 
         try:
-            resend.Emails.send({
-                "from": self.sender or "onboarding@resend.dev",
-                "to": [to_email],
-                "subject": subject,
-                "html": body if html else None,
-                "text": body if not html else None,
-            })
+            return self._client().send(self._message(
+                to_email=to_email,
+                subject=subject,
+                body=body,
+                html=html
+            ))
 
         except Exception as e:
             raise Exception(f"Resend error: {str(e)}")
 
+    def _send_batch(self, messages: list) -> list:
+        """
+        [(provider_message_id, błąd)] w kolejności messages –
+        partie po batch_size w jednym wywołaniu /emails/batch.
+        """
+        client = self._client()
+        size = getattr(client, "batch_size", 100)
+        results = []
+
+        for i in range(0, len(messages), size):
+            chunk = messages[i:i + size]
+
+            try:
+                response = client.send_batch(chunk)
+            except Exception as e:
+                results.extend([(None, f"Resend error: {str(e)}")] * len(chunk))
+                continue
+
+            data = list(response.get("data") or [])
+            errors = {
+                err.get("index"): err.get("message", "Unknown error")
+                for err in response.get("errors") or []
+            }
+
+            # permissive: data tylko dla przyjętych wiadomości, w kolejności
+            accepted = iter(data)
+            for idx in range(len(chunk)):
+                if idx in errors:
+                    results.append((None, errors[idx]))
+                    continue
+
+                item = next(accepted, None)
+                if item is None:
+                    results.append((None, "Brak wiadomości w odpowiedzi Resend"))
+                else:
+                    results.append((item.get("id"), None))
+
+        return results
+
     # ───────────────────────────────────────
-    # CONFIRMATION EMAIL
+    # LOG + WYSYŁKA
     # ───────────────────────────────────────
-    def send_confirmation(self, appointment: Appointment):
-
-        if not self._can_send():
-            return None
-
-        if not appointment.patient_email:
-            return None
-
-        subject, body = self._build_confirmation_content(appointment)
+    def _create_log(self, appointment: Appointment, kind: str, params: dict):
+        template_id = current("email", kind)
+        subject, _ = render(template_id, params)
 
         email_log = EmailMessage(
             appointment_id=appointment.id,
             email=appointment.patient_email,
-            type="confirmation",
+            type=kind,
+            provider="resend",
             subject=subject,
-            content=body,
+            template_id=template_id,
+            params_json=dump_params(params),
             status="pending"
         )
 
         db.session.add(email_log)
         db.session.commit()
 
+        return email_log
+
+    def _is_html(self, email_log: EmailMessage) -> bool:
+        if email_log.template_id:
+            return get_template(email_log.template_id).html
+        # stare wiersze z pełną treścią – tylko dane do przelewu były tekstem
+        return email_log.type != "payment_retry"
+
+    def _deliver(self, email_log: EmailMessage, body=None) -> bool:
         try:
-            self._send_email(
+            response = self._send_email(
                 to_email=email_log.email,
-                subject=subject,
-                body=body,
-                html=True
+                subject=email_log.subject,
+                body=body if body is not None else email_log.body,
+                html=self._is_html(email_log)
             )
 
             email_log.status = "sent"
             email_log.sent_at = datetime.utcnow()
-
-            appointment.email_confirmation_sent_at = email_log.sent_at
+            email_log.error_message = None
+            email_log.provider_message_id = (response or {}).get("id")
+            return True
 
         except Exception as e:
             email_log.status = "failed"
             email_log.error_message = str(e)
 
+        return False
+
+    def _mark_appointment(self, appointment: Appointment, email_log: EmailMessage):
+        if email_log.type == "confirmation":
+            appointment.email_confirmation_sent_at = email_log.sent_at
+        elif email_log.type == "reminder":
+            appointment.email_reminder_sent_at = email_log.sent_at
+
+    def _send_logged(self, appointment: Appointment, kind: str, params: dict):
+        email_log = self._create_log(appointment, kind, params)
+
+        if self._deliver(email_log):
+            self._mark_appointment(appointment, email_log)
+
         db.session.commit()
         return email_log
 
+    # ───────────────────────────────────────
+    # CONFIRMATION EMAIL
+    # ───────────────────────────────────────
+    def send_confirmation(self, appointment: Appointment):
+
+        if not self._can_send():
+            return None
+
+        if not appointment.patient_email:
+            return None
+
+        return self._send_logged(
+            appointment,
+            "confirmation",
+            appointment_params(appointment, base_url=self.base_url)
+        )
+
     def send_raw(self, *, to_email, subject, body, html=True):
 
         if not self._can_send():
@@ -122,164 +214,119 @@ class EmailService:
         if not appointment.patient_email:
             return None
 
-        subject, body = self._build_reminder_content(appointment)
-
-        email_log = EmailMessage(
-            appointment_id=appointment.id,
-            email=appointment.patient_email,
-            type="reminder",
-            subject=subject,
-            content=body,
-            status="pending"
+        return self._send_logged(
+            appointment,
+            "reminder",
+            appointment_params(appointment)
         )
 
-        db.session.add(email_log)
-        db.session.commit()
-
-        try:
-            self._send_email(
-                to_email=email_log.email,
-                subject=subject,
-                body=body,
-                html=True
-            )
-
-            email_log.status = "sent"
-            email_log.sent_at = datetime.utcnow()
-
-            appointment.email_reminder_sent_at = email_log.sent_at
-
-        except Exception as e:
-            email_log.status = "failed"
-            email_log.error_message = str(e)
-
-        db.session.commit()
-        return email_log
+    def send_reminders(self, appointments):
+        """
+        Przypomnienia dla wielu wizyt (job).
+        """
+        return self.send_many("reminder", appointments, appointment_params)
 
     # ───────────────────────────────────────
-    # TRADITIONAL PAYMENT EMAIL
+    # WYSYŁKA HURTOWA
     # ───────────────────────────────────────
-    def send_traditional_payment_info(self, appointment, amount):
-
-        if not appointment.patient_email:
-            return None
-
-        subject = "Dane do przelewu – potwierdzenie rezerwacji"
-
-        body = f"""
-Dzień dobry {appointment.patient_first_name},
-
-Data wizyty: {appointment.start.strftime('%d.%m.%Y %H:%M')}
-Kwota: {amount:.2f} PLN
-
-Numer konta:
-70 1140 2004 0000 3502 5354 7449
-
-Tytuł przelewu: Wizyta {appointment.id}
-
-Po zaksięgowaniu płatności wizyta zostanie potwierdzona.
-"""
+    def send_many(self, kind: str, appointments: list, build_params):
+        """
+        Jeden szablon do wielu wizyt: logi zapisane jednym commitem,
+        treści renderowane hurtowo, wysyłka przez /emails/batch
+        (do 100 wiadomości na wywołanie), statusy jednym UPDATE.
+        """
+        if not self._can_send():
+            return []
+
+        appointments = [a for a in appointments if a.patient_email]
+        if not appointments:
+            return []
+
+        template_id = current("email", kind)
+        template = get_template(template_id)
+        params = [build_params(a) for a in appointments]
+
+        logs = [
+            EmailMessage(
+                appointment_id=a.id,
+                email=a.patient_email,
+                type=kind,
+                provider="resend",
+                subject=template.subject,
+                template_id=template_id,
+                params_json=dump_params(p),
+                status="pending"
+            )
+            for a, p in zip(appointments, params)
+        ]
 
-        email_log = EmailMessage(
-            appointment_id=appointment.id,
-            email=appointment.patient_email,
-            type="payment_retry",
-            subject=subject,
-            content=body,
-            status="pending"
-        )
+        db.session.add_all(logs)
+        db.session.flush()
 
-        db.session.add(email_log)
+        # (id, appointment_id, email) – bez odświeżania obiektów po commicie
+        entries = [(e.id, e.appointment_id, e.email) for e in logs]
         db.session.commit()
 
-        try:
-            self._send_email(
-                to_email=email_log.email,
-                subject=subject,
+        bodies = render_many(template_id, params)
+        messages = [
+            self._message(
+                to_email=email,
+                subject=template.subject,
                 body=body,
-                html=False
+                html=template.html
             )
+            for (_, _, email), body in zip(entries, bodies)
+        ]
+
+        results = self._send_batch(messages)
+
+        sent_at = datetime.utcnow()
+        email_rows = []
+        appointment_ids = []
+
+        for (email_id, appointment_id, _), (message_id, error) in zip(entries, results):
+            email_rows.append({
+                "id": email_id,
+                "status": "failed" if error else "sent",
+                "sent_at": None if error else sent_at,
+                "provider_message_id": message_id,
+                "error_message": error,
+            })
 
-            email_log.status = "sent"
-            email_log.sent_at = datetime.utcnow()
+            if error is None:
+                appointment_ids.append(appointment_id)
 
-        except Exception as e:
-            email_log.status = "failed"
-            email_log.error_message = str(e)
+        # bulk UPDATE po kluczu głównym – bez ładowania obiektów
+        db.session.execute(update(EmailMessage), email_rows)
 
-        db.session.commit()
-        return email_log
+        column = {
+            "confirmation": "email_confirmation_sent_at",
+            "reminder": "email_reminder_sent_at",
+        }.get(kind)
 
-    # ───────────────────────────────────────
-    # CONTENT BUILDERS
-    # ───────────────────────────────────────
+        if column and appointment_ids:
+            db.session.execute(
+                update(Appointment),
+                [{"id": a_id, column: sent_at} for a_id in appointment_ids]
+            )
+
+        db.session.commit()
+        return logs
 
     # ───────────────────────────────────────
-    # CONTENT BUILDERS
+    # TRADITIONAL PAYMENT EMAIL
     # ───────────────────────────────────────
-    def _build_confirmation_content(self, appointment):
-        date_str = appointment.start.strftime("%d.%m.%Y")
-        time_str = appointment.start.strftime("%H:%M")
-
-        cancel_url = f"{self.base_url}/c/{appointment.cancel_token}"
-
-        subject = "Potwierdzenie wizyty"
-
-        body = f"""
-    <div style="font-family: Arial, Helvetica, sans-serif; background:#f4f4f4; padding:30px 15px;">
-
-    <div style="max-width:520px; margin:0 auto; background:#ffffff; border-radius:8px; padding:30px; border:1px solid #e6e6e6;">
-
-        <h2 style="margin-top:0; color:#000000;">
-        Potwierdzenie wizyty
-        </h2>
-
-        <p style="font-size:16px; color:#333;">
-        Dzień dobry {appointment.patient_first_name},
-        </p>
-
-        <p style="font-size:16px; color:#333;">
-        Dziękujemy za rezerwację wizyty.
-        </p>
-
-        <div style="background:#f8f9fa; padding:15px; border-radius:6px; border:1px solid #eee; margin:20px 0;">
-        <p style="margin:0; font-size:18px; font-weight:bold; color:#000;">
-            {date_str}
-        </p>
-        <p style="margin:5px 0 0 0; font-size:16px; color:#555;">
-            godz. {time_str}
-        </p>
-        </div>
-
-        <p style="font-size:14px; color:#666;">
-        Jeśli nie możesz przyjść, prosimy o anulowanie wizyty z wyprzedzeniem:
-        </p>
-
-        <div style="text-align:center; margin:25px 0;">
-        <a href="{cancel_url}"
-            style="background:#d73930; color:#ffffff; text-decoration:none; padding:12px 22px; border-radius:6px; font-weight:bold; display:inline-block;">
-            Anuluj wizytę
-        </a>
-        </div>
-
-        <hr style="border:none; border-top:1px solid #eee; margin:25px 0;">
+    def send_traditional_payment_info(self, appointment, amount):
 
-        <p style="font-size:12px; color:#999; text-align:center; line-height:1.6;">
-        Rejestracja wizyt<br>
-        W razie potrzeby prosimy o kontakt.<br>
-        <a href="tel:+48698554077" style="color:#d73930; text-decoration:none;">
-            +48 698 554 077
-        </a><br><br>
-        Ta wiadomość została wygenerowana automatycznie.
-        </p>
+        if not appointment.patient_email:
+            return None
 
-    </div>
+        params = appointment_params(appointment)
+        params["amount"] = f"{amount:.2f}"
+        params["appointment_id"] = appointment.id
 
-    </div>
-    """
+        return self._send_logged(appointment, "payment_retry", params)
 
-        return subject, body
-    
     # ───────────────────────────────────────
     # ONLINE VISIT LINK EMAIL
     # ───────────────────────────────────────
@@ -291,135 +338,28 @@ Po zaksięgowaniu płatności wizyta zostanie potwierdzona.
         if not appointment.patient_email:
             return None
 
-        subject, body = self._build_online_meet_content(appointment)
-
-        email_log = EmailMessage(
-            appointment_id=appointment.id,
-            email=appointment.patient_email,
-            type="online_meet",
-            subject=subject,
-            content=body,
-            status="pending"
+        return self._send_logged(
+            appointment,
+            "online_meet",
+            appointment_params(appointment)
         )
 
-        db.session.add(email_log)
-        db.session.commit()
-
-        try:
-            self._send_email(
-                to_email=email_log.email,
-                subject=subject,
-                body=body,
-                html=True
-            )
+    # ───────────────────────────────────────
+    # RETRY – ta sama wiadomość (szablon + parametry z logu)
+    # ───────────────────────────────────────
+    def retry(self, email_log: EmailMessage):
 
-            email_log.status = "sent"
-            email_log.sent_at = datetime.utcnow()
+        if not self._can_send():
+            return None
 
-        except Exception as e:
+        if email_log.body is None:
             email_log.status = "failed"
-            email_log.error_message = str(e)
+            email_log.error_message = "Treść usunięta (retencja)"
+            db.session.commit()
+            return email_log
+
+        if self._deliver(email_log):
+            self._mark_appointment(email_log.appointment, email_log)
 
         db.session.commit()
         return email_log
-
-    def _build_reminder_content(self, appointment):
-        date_str = appointment.start.strftime("%d.%m.%Y")
-        time_str = appointment.start.strftime("%H:%M")
-
-        subject = "Przypomnienie o wizycie"
-
-        body = f"""
-    <div style="font-family: Arial, Helvetica, sans-serif; background:#f4f4f4; padding:30px 15px;">
-
-    <div style="max-width:520px; margin:0 auto; background:#ffffff; border-radius:8px; padding:30px; border:1px solid #e6e6e6;">
-
-        <h2 style="margin-top:0; color:#000000;">
-        Przypomnienie o wizycie
-        </h2>
-
-        <p style="font-size:16px; color:#333;">
-        Dzień dobry {appointment.patient_first_name},
-        </p>
-
-        <p style="font-size:16px; color:#333;">
-        Przypominamy o nadchodzącej wizycie:
-        </p>
-
-        <div style="background:#f8f9fa; padding:15px; border-radius:6px; border:1px solid #eee; margin:20px 0;">
-        <p style="margin:0; font-size:18px; font-weight:bold; color:#000;">
-            {date_str}
-        </p>
-        <p style="margin:5px 0 0 0; font-size:16px; color:#555;">
-            godz. {time_str}
-        </p>
-        </div>
-
-        <p style="font-size:14px; color:#666;">
-        W razie potrzeby prosimy o kontakt z gabinetem.
-        </p>
-
-        <hr style="border:none; border-top:1px solid #eee; margin:25px 0;">
-
-        <p style="font-size:12px; color:#999; text-align:center; line-height:1.6;">
-        Rejestracja wizyt<br>
-        W razie potrzeby prosimy o kontakt.<br>
-        <a href="tel:+48698554077" style="color:#d73930; text-decoration:none;">
-            +48 698 554 077
-        </a><br><br>
-        Ta wiadomość została wygenerowana automatycznie.
-        </p>
-
-    </div>
-
-    </div>
-    """
-
-        return subject, body
-    
-
-    def _build_online_meet_content(self, appointment):
-
-        date_str = appointment.start.strftime("%d.%m.%Y")
-        time_str = appointment.start.strftime("%H:%M")
-
-        meet_link = "https://meet.google.com/eev-cxtv-ycq"
-
-        subject = "Link do wizyty online"
-
-        body = f"""
-    <div style="font-family: Arial, Helvetica, sans-serif; background:#f4f4f4; padding:30px 15px;">
-
-    <div style="max-width:520px; margin:0 auto; background:#ffffff; border-radius:8px; padding:30px; border:1px solid #e6e6e6;">
-
-    <h2 style="margin-top:0; color:#000;">
-    Wizyta online
-    </h2>
-
-    <p>Dzień dobry {appointment.patient_first_name},</p>
-
-    <p>Twoja wizyta odbędzie się online:</p>
-
-    <div style="background:#f8f9fa; padding:15px; border-radius:6px; border:1px solid #eee; margin:20px 0;">
-    <p style="margin:0; font-size:18px; font-weight:bold;">{date_str}</p>
-    <p style="margin:5px 0 0 0;">godz. {time_str}</p>
-    </div>
-
-    <p>Aby dołączyć do wizyty kliknij w link:</p>
-
-    <div style="text-align:center; margin:25px 0;">
-    <a href="{meet_link}"
-    style="background:#d73930; color:#ffffff; text-decoration:none; padding:12px 22px; border-radius:6px; font-weight:bold;">
-    Dołącz do wizyty
-    </a>
-    </div>
-
-    <p style="font-size:14px; color:#666;">
-    Prosimy dołączyć kilka minut przed rozpoczęciem wizyty.
-    </p>
-
-    </div>
-    </div>
-    """
-
-        return subject, body
\ No newline at end of file
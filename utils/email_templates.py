@@ -0,0 +1,124 @@
+"""
+Szablony e-mail (templates/email/) – osobne, skompilowane środowisko Jinja.
+
+- bytecode cache na dysku: nowy worker nie parsuje szablonów od zera,
+- auto_reload=False: szablony sprawdzane tylko przy starcie procesu,
+- fragmenty statyczne (_*.html, np. stopka) renderowane raz i wstawiane
+  jako gotowy Markup (fragments.footer),
+- render_many(): wiele treści jednym wywołaniem (job przypomnień).
+"""
+import os
+import tempfile
+import threading
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    StrictUndefined,
+    select_autoescape,
+)
+from markupsafe import Markup
+
+
+TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "templates",
+    "email"
+)
+
+CACHE_DIR = os.environ.get(
+    "EMAIL_TEMPLATE_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "terminarz-email-jinja")
+)
+
+# stałe dostępne we wszystkich szablonach
+GLOBALS = {
+    "meet_link": "https://meet.google.com/eev-cxtv-ycq",
+}
+
+_env = None
+_lock = threading.Lock()
+
+
+class _Fragments(dict):
+    __getattr__ = dict.__getitem__
+
+
+# ───────────────────────────────────────
+# ŚRODOWISKO
+# ───────────────────────────────────────
+
+def build_environment(cache_dir=CACHE_DIR):
+    """
+    cache_dir=None – bez bytecode cache (benchmark zimnego startu).
+    """
+    bytecode_cache = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=select_autoescape(["html"]),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+        keep_trailing_newline=True,
+        undefined=StrictUndefined,
+    )
+
+    env.globals.update(GLOBALS)
+
+    # fragmenty statyczne – render raz, potem zwykły string
+    fragments = _Fragments()
+    for name in env.list_templates():
+        if os.path.basename(name).startswith("_"):
+            key = os.path.splitext(os.path.basename(name))[0].lstrip("_")
+            fragments[key] = Markup(env.get_template(name).render())
+
+    env.globals["fragments"] = fragments
+
+    # prekompilacja wszystkich szablonów przy starcie
+    for name in env.list_templates():
+        env.get_template(name)
+
+    return env
+
+
+def get_environment():
+    global _env
+
+    if _env is None:
+        with _lock:
+            if _env is None:
+                _env = build_environment()
+
+    return _env
+
+
+# ───────────────────────────────────────
+# RENDER
+# ───────────────────────────────────────
+
+def render(name, params):
+    return get_environment().get_template(name).render(params)
+
+
+def render_many(name, params_list):
+    """
+    Ten sam szablon dla wielu zestawów parametrów – jedno pobranie
+    szablonu, bez powtórnego wyszukiwania w loaderze.
+    """
+    template = get_environment().get_template(name)
+    return [template.render(params) for params in params_list]
+
+
+def renderer(name):
+    """
+    Funkcja render(params) dla MessageTemplate.
+    """
+    def _render(params):
+        return render(name, params)
+
+    _render.template_name = name
+    return _render
@@ -1,13 +1,58 @@
 import json
-from datetime import datetime
+import random
+from datetime import datetime, timedelta
 from flask import current_app
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
 
 from extensions import db
 from utils.settings import get_setting
-from models import VisitType, GoogleCalendarError
+from models import GoogleCalendarError
+from utils import visit_types
+from utils.metrics import track_external
+from utils.circuit_breaker import guard, is_available, ProviderUnavailable
+
+
+# ───────────────────────────────────────
+# PONOWIENIA SYNCHRONIZACJI
+# ───────────────────────────────────────
+
+MAX_SYNC_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 3600
+
+
+def retry_delay(attempts):
+    """
+    Wykładniczo (1, 2, 4 … min, max 6 h) z losowym rozrzutem 50–100%,
+    żeby po awarii Google ponowienia nie poszły jedną falą.
+    """
+    ceiling = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=ceiling * random.uniform(0.5, 1.0))
+
+
+class _TimedHttpRequest(HttpRequest):
+    """
+    Każde .execute() klienta Google liczy się do czasu zewnętrznego requestu
+    i przechodzi przez circuit breaker "google".
+    """
+
+    def execute(self, *args, **kwargs):
+        client_error = None
+
+        with guard("google") as call, track_external("google"):
+            try:
+                return super().execute(*args, **kwargs)
+            except HttpError as e:
+                # 5xx / 429 – awaria po stronie Google
+                if e.resp.status >= 500 or e.resp.status == 429:
+                    raise
+                # 4xx (np. 404 usuniętego eventu) – Google działa
+                client_error = e
+
+        raise client_error
 
 
 # ======================================================
@@ -37,7 +82,12 @@ class GoogleCalendarService:
                 scopes=GoogleCalendarService.SCOPES
             )
 
-            return build("calendar", "v3", credentials=credentials)
+            return build(
+                "calendar",
+                "v3",
+                credentials=credentials,
+                requestBuilder=_TimedHttpRequest
+            )
 
         except Exception as e:
             current_app.logger.error(f"[GOOGLE] service init error: {e}")
@@ -45,17 +95,13 @@ class GoogleCalendarService:
 
     @staticmethod
     def ensure_connection():
-        service = GoogleCalendarService.get_service()
-
-        if not service:
+        # bez wywołania testowego – awarie wyłapuje circuit breaker,
+        # a przy otwartym obwodzie nie budujemy nawet klienta
+        if not is_available("google"):
+            current_app.logger.warning("[GOOGLE] circuit open – skipping")
             return None
 
-        try:
-            service.calendarList().list(maxResults=1).execute()
-            return service
-        except Exception as e:
-            current_app.logger.error(f"[GOOGLE] connection test failed: {e}")
-            return None
+        return GoogleCalendarService.get_service()
 
     # --------------------------------------------------
     # 🧱 EVENT BUILDER
@@ -66,7 +112,7 @@ class GoogleCalendarService:
 
         from models import Payment
 
-        visit_type = VisitType.query.filter_by(code=appt.visit_type).first()
+        visit_type = visit_types.get(appt.visit_type)
         base_color_id = visit_type.color if visit_type and visit_type.color else "1"
         color_id = base_color_id
 
@@ -141,33 +187,76 @@ class GoogleCalendarService:
     # --------------------------------------------------
 
     @staticmethod
-    def sync_appointment(appt, force_update=False, payment_context=None):
+    def _mark_synced(appt):
+        appt.google_sync_status = "synced"
+        appt.google_last_sync_at = datetime.utcnow()
+        appt.google_sync_attempts = 0
+        appt.google_next_retry_at = None
 
-        service = GoogleCalendarService.ensure_connection()
+    @staticmethod
+    def _mark_failed(appt, error_type, error, count_attempt=True):
+        """
+        error   – próba nieudana, kolejna o google_next_retry_at
+                  (po MAX_SYNC_ATTEMPTS: next_retry_at = NULL, koniec),
+        pending – Google niedostępne (circuit breaker), próba nie liczy się.
+        Wiersz GoogleCalendarError tylko przy pierwszym błędzie i przy rezygnacji.
+        """
+        now = datetime.utcnow()
+        appt.google_last_sync_at = now
+
+        if not count_attempt:
+            if appt.google_sync_status != "error":
+                appt.google_sync_status = "pending"
+            appt.google_next_retry_at = now + retry_delay(max(appt.google_sync_attempts or 0, 1))
+            return
 
-        if not service:
+        appt.google_sync_attempts = (appt.google_sync_attempts or 0) + 1
+        appt.google_sync_status = "error"
 
-            appt.google_sync_status = "error"
-            appt.google_last_sync_at = datetime.utcnow()
+        exhausted = appt.google_sync_attempts >= MAX_SYNC_ATTEMPTS
+        appt.google_next_retry_at = None if exhausted else now + retry_delay(appt.google_sync_attempts)
 
+        if appt.google_sync_attempts == 1 or exhausted:
             db.session.add(
                 GoogleCalendarError(
                     appointment_id=appt.id,
                     email=appt.patient_email,
                     phone=appt.patient_phone,
-                    error_type="NotConnected",
-                    error="Google Calendar not connected"
+                    error_type=error_type,
+                    error=error if not exhausted else f"[rezygnacja po {appt.google_sync_attempts} próbach] {error}"
                 )
             )
 
-            db.session.commit()
+        current_app.logger.error(
+            f"[GOOGLE] sync failed appt={appt.id} "
+            f"attempt={appt.google_sync_attempts}: {error}"
+        )
+
+    @staticmethod
+    def sync_appointment(appt, force_update=False, payment_context=None, service=None):
+        """
+        Jedna próba synchronizacji – bez ponowień w wątku requestu.
+        Błąd → status error + google_next_retry_at (jobs/google_sync_retry.py).
+        service – gotowy klient (job przetwarza wiele wizyt jednym).
+        """
+        if appt.google_sync_status == "synced" and not force_update:
             return
 
-        calendar_id = get_setting("google_calendar_id") or current_app.config["GOOGLE_CALENDAR_ID"]
+        service = service or GoogleCalendarService.ensure_connection()
 
-        if appt.google_sync_status == "synced" and not force_update:
+        if not service:
+            # otwarty obwód → odłożone; brak konfiguracji → zwykły błąd
+            GoogleCalendarService._mark_failed(
+                appt,
+                "NotConnected",
+                "Google Calendar not connected",
+                count_attempt=is_available("google")
+            )
+            db.session.commit()
             return
 
+        calendar_id = get_setting("google_calendar_id") or current_app.config["GOOGLE_CALENDAR_ID"]
+
         event_body = GoogleCalendarService._build_event(
             appt,
             payment_context=payment_context
@@ -177,13 +266,21 @@ class GoogleCalendarService:
 
             if appt.google_event_id:
 
-                service.events().update(
-                    calendarId=calendar_id,
-                    eventId=appt.google_event_id,
-                    body=event_body
-                ).execute()
+                try:
+                    service.events().update(
+                        calendarId=calendar_id,
+                        eventId=appt.google_event_id,
+                        body=event_body
+                    ).execute()
 
-            else:
+                except HttpError as e:
+                    if e.resp.status != 404:
+                        raise
+
+                    # 📅 event nie istnieje → utwórz ponownie (jedna próba)
+                    appt.google_event_id = None
+
+            if not appt.google_event_id:
 
                 created = service.events().insert(
                     calendarId=calendar_id,
@@ -192,81 +289,31 @@ class GoogleCalendarService:
 
                 appt.google_event_id = created["id"]
 
-            appt.google_sync_status = "synced"
-            appt.google_last_sync_at = datetime.utcnow()
-
+            GoogleCalendarService._mark_synced(appt)
             db.session.commit()
 
-        except HttpError as e:
+        except ProviderUnavailable as e:
 
             db.session.rollback()
-
-            # 📅 event nie istnieje → utwórz ponownie
-            if e.resp.status == 404:
-
-                appt.google_event_id = None
-                db.session.commit()
-
-                GoogleCalendarService.sync_appointment(
-                    appt,
-                    force_update=True,
-                    payment_context=payment_context
-                )
-                return
-
-            # 🔴 zapis błędu
-            appt.google_sync_status = "error"
-            appt.google_last_sync_at = datetime.utcnow()
-
-            db.session.add(
-                GoogleCalendarError(
-                    appointment_id=appt.id,
-                    email=appt.patient_email,
-                    phone=appt.patient_phone,
-                    error_type="HttpError",
-                    error=str(e)
-                )
-            )
-
+            GoogleCalendarService._mark_failed(appt, "ProviderUnavailable", str(e), count_attempt=False)
             db.session.commit()
 
-            current_app.logger.error(
-                f"[GOOGLE] sync failed appt={appt.id}: {e}"
-            )
-
         except Exception as e:
 
             db.session.rollback()
-
-            appt.google_sync_status = "error"
-            appt.google_last_sync_at = datetime.utcnow()
-
-            db.session.add(
-                GoogleCalendarError(
-                    appointment_id=appt.id,
-                    email=appt.patient_email,
-                    phone=appt.patient_phone,
-                    error_type=type(e).__name__,
-                    error=str(e)
-                )
-            )
-
+            GoogleCalendarService._mark_failed(appt, type(e).__name__, str(e))
             db.session.commit()
 
-            current_app.logger.error(
-                f"[GOOGLE] sync failed appt={appt.id}: {e}"
-            )
-
     # --------------------------------------------------
     # 🗑 DELETE
     # --------------------------------------------------
 
     @staticmethod
-    def delete_appointment(appt):
+    def delete_appointment(appt, service=None):
         if not appt.google_event_id:
             return
 
-        service = GoogleCalendarService.ensure_connection()
+        service = service or GoogleCalendarService.ensure_connection()
         if not service:
             return
 
@@ -285,6 +332,7 @@ class GoogleCalendarService:
         appt.google_event_id = None
         appt.google_sync_status = "deleted"
         appt.google_last_sync_at = datetime.utcnow()
+        appt.google_next_retry_at = None
         db.session.commit()
 
     # --------------------------------------------------
@@ -293,8 +341,20 @@ class GoogleCalendarService:
 
     @staticmethod
     def force_create_event(appt):
+        """
+        Nowy event niezależnie od stanu. Błąd → ten sam tryb ponowień
+        co sync_appointment (_mark_failed).
+        """
         service = GoogleCalendarService.ensure_connection()
+
         if not service:
+            GoogleCalendarService._mark_failed(
+                appt,
+                "NotConnected",
+                "Google Calendar not connected",
+                count_attempt=is_available("google")
+            )
+            db.session.commit()
             return
 
         calendar_id = get_setting("google_calendar_id") or current_app.config["GOOGLE_CALENDAR_ID"]
@@ -307,13 +367,17 @@ class GoogleCalendarService:
             ).execute()
 
             appt.google_event_id = created["id"]
-            appt.google_sync_status = "synced"
-            appt.google_last_sync_at = datetime.utcnow()
+            GoogleCalendarService._mark_synced(appt)
+            db.session.commit()
+
+        except ProviderUnavailable as e:
+
+            db.session.rollback()
+            GoogleCalendarService._mark_failed(appt, "ProviderUnavailable", str(e), count_attempt=False)
             db.session.commit()
 
         except Exception as e:
-            appt.google_sync_status = "error"
+
+            db.session.rollback()
+            GoogleCalendarService._mark_failed(appt, type(e).__name__, str(e))
             db.session.commit()
-            current_app.logger.error(
-                f"[GOOGLE] force create failed appt={appt.id}: {e}"
-            )
\ No newline at end of file
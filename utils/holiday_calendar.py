@@ -0,0 +1,96 @@
+"""
+Święta państwowe (PL) liczone raz na proces.
+
+holidays.PL(years=…) przelicza reguły (Wielkanoc, Boże Ciało…) przy każdym
+utworzeniu obiektu – tu lata z okna wokół bieżącego roku liczone są przy
+starcie (warm()), pozostałe przy pierwszym użyciu, i trzymane jako
+frozenset dat: sprawdzenie dnia to jedno wyszukiwanie w zbiorze.
+"""
+import threading
+from datetime import date, timedelta
+
+import holidays
+
+
+# okno liczone przy starcie procesu
+YEARS_BACK = 1
+YEARS_AHEAD = 2
+
+_dates = {}         # rok → frozenset(date)
+_names = {}         # rok → {date: nazwa}
+_lock = threading.Lock()
+
+
+def _load(year):
+    with _lock:
+        if year not in _dates:
+            calendar = holidays.PL(years={year})
+            _names[year] = dict(sorted(calendar.items()))
+            _dates[year] = frozenset(_names[year])
+    return _dates[year]
+
+
+def warm(today=None):
+    today = today or date.today()
+    for year in range(today.year - YEARS_BACK, today.year + YEARS_AHEAD + 1):
+        _load(year)
+
+
+def _year(year):
+    found = _dates.get(year)
+    return found if found is not None else _load(year)
+
+
+# ───────────────────────────────────────
+# ZAPYTANIA
+# ───────────────────────────────────────
+
+def is_holiday(d) -> bool:
+    return d in _year(d.year)
+
+
+def holidays_between(start, end):
+    """
+    [(data, nazwa)] dla start <= data < end, rosnąco.
+    """
+    result = []
+
+    for year in range(start.year, end.year + 1):
+        _year(year)
+        result.extend(
+            (d, name)
+            for d, name in _names[year].items()
+            if start <= d < end
+        )
+
+    return result
+
+
+def open_days_mask(start, end, *, weekdays=None, closed_ranges=()):
+    """
+    [bool] dla każdego dnia start..end (włącznie): True = gabinet może
+    pracować – nie święto, nie w closed_ranges (np. urlopy jako pary
+    (date_from, date_to)), dzień tygodnia w weekdays (None = wszystkie).
+    """
+    days = (end - start).days + 1
+    if days <= 0:
+        return []
+
+    mask = [True] * days
+
+    for d, _ in holidays_between(start, end + timedelta(days=1)):
+        mask[(d - start).days] = False
+
+    for date_from, date_to in closed_ranges:
+        lo = max((date_from - start).days, 0)
+        hi = min((date_to - start).days, days - 1)
+        for i in range(lo, hi + 1):
+            mask[i] = False
+
+    if weekdays is not None:
+        first = start.weekday()
+        for i in range(days):
+            if (first + i) % 7 not in weekdays:
+                mask[i] = False
+
+    return mask
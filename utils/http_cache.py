@@ -0,0 +1,85 @@
+"""
+Odpowiedzi JSON z walidacją (ETag) i kompresją gzip.
+
+- ETag (słaby) z wersji danych (utils/cache_versions.py, kwadrans) – If-None-Match z tą samą wartością → 304 bez ciała
+  i bez liczenia odpowiedzi,
+- Cache-Control: private, max-age – przeglądarka nie pyta ponownie
+  przez max_age sekund (opcjonalnie stale-while-revalidate),
+- gzip, gdy klient go akceptuje, a odpowiedź nie jest mała.
+"""
+import gzip
+import hashlib
+from datetime import datetime
+
+from flask import current_app, request
+
+from utils import cache_versions
+
+
+# mniejszych odpowiedzi nie opłaca się kompresować
+GZIP_MIN_BYTES = 512
+GZIP_LEVEL = 6
+
+# odpowiedzi zależne od "teraz" – nowa wersja co kwadrans
+TIME_BUCKET_MINUTES = 15
+
+
+# ───────────────────────────────────────
+# WERSJE DANYCH
+# ───────────────────────────────────────
+
+def availability_version():
+    """
+    Wersja "availability" – podbijana przez każdą zmianę slotów, wizyt,
+    blokad i urlopów. Kwadrans dochodzi, bo blokady wygasają z upływem
+    czasu (a "od jutra" zmienia się o północy).
+    """
+    return cache_versions.current("availability"), time_bucket()
+
+
+def time_bucket(now=None, minutes=TIME_BUCKET_MINUTES):
+    now = now or datetime.now()
+    return now.replace(minute=now.minute - now.minute % minutes, second=0, microsecond=0)
+
+
+# ───────────────────────────────────────
+# ODPOWIEDZI
+# ───────────────────────────────────────
+
+def versioned_json(version, build, *, max_age=30, stale_while_revalidate=0):
+    """
+    version – krotka wersji danych, od których zależy odpowiedź;
+    build() liczy treść tylko, gdy klient nie ma aktualnej wersji.
+    """
+    etag = hashlib.sha1(repr((request.full_path, version)).encode()).hexdigest()
+
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        body = current_app.json.dumps(build()).encode()
+        response = current_app.response_class(body, mimetype="application/json")
+
+    response.set_etag(etag, weak=True)
+    _cache_headers(response, max_age, stale_while_revalidate)
+
+    if response.status_code == 304:
+        return response
+
+    return _compress(response, body)
+
+
+def _cache_headers(response, max_age, stale_while_revalidate=0):
+    cache_control = f"private, max-age={max_age}"
+    if stale_while_revalidate:
+        cache_control += f", stale-while-revalidate={stale_while_revalidate}"
+
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+
+
+def _compress(response, body):
+    if len(body) >= GZIP_MIN_BYTES and request.accept_encodings["gzip"]:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+
+    return response
@@ -0,0 +1,250 @@
+"""
+Klienci HTTP dostawców (SMSAPI, Przelewy24, Resend) na współdzielonej
+sesji requests z pulą połączeń keep-alive – bez nowego TCP + TLS przy
+każdym SMS-ie / e-mailu / wywołaniu płatności.
+
+Klient jest jeden na proces (get_client). W benchmarkach i testach
+można go podmienić atrapą: override_client("smsapi", Fake()).
+"""
+import threading
+
+import requests
+import resend
+from requests.adapters import HTTPAdapter
+from resend.http_client import HTTPClient
+from urllib3.util.retry import Retry
+
+from utils.circuit_breaker import guard
+from utils.metrics import track_external
+
+
+# ───────────────────────────────────────
+# BAZA
+# ───────────────────────────────────────
+
+class ProviderClient:
+    provider = None
+    base_url = None
+
+    # (connect, read) w sekundach
+    timeout = (3.05, 10)
+
+    # połączenia trzymane na host – wątki workera dzielą pulę
+    pool_maxsize = 10
+
+    # ponowienia tylko dla błędów połączenia – żądanie nie dotarło
+    # do dostawcy, więc nie ma ryzyka podwójnego SMS-a / płatności
+    connect_retries = 2
+    status_retries = 0
+    # metody bezpieczne do ponowienia po odpowiedzi 5xx (POST nigdy)
+    retry_methods = frozenset({"GET", "HEAD"})
+
+    def __init__(self):
+        self.session = requests.Session()
+
+        retry = Retry(
+            total=None,
+            connect=self.connect_retries,
+            read=0,
+            redirect=0,
+            status=self.status_retries,
+            status_forcelist=(502, 503, 504) if self.status_retries else (),
+            allowed_methods=self.retry_methods,
+            backoff_factor=0.3,
+            raise_on_status=False,
+        )
+
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+        )
+
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        """
+        Przez circuit breaker dostawcy – przy awarii ProviderUnavailable
+        od razu, bez czekania na timeout.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        with guard(self.provider) as call, track_external(self.provider):
+            response = self.session.request(method, url, **kwargs)
+
+            if response.status_code >= 500:
+                call.fail()
+
+            return response
+
+    def close(self):
+        self.session.close()
+
+
+# ───────────────────────────────────────
+# SMSAPI
+# ───────────────────────────────────────
+
+class SMSAPIClient(ProviderClient):
+    provider = "smsapi"
+    base_url = "https://api.smsapi.pl"
+    timeout = (3.05, 10)
+
+    def send(self, *, token, sender, to, message, **params):
+        """
+        to – jeden numer albo kilka po przecinku.
+        """
+        data = {
+            "to": to,
+            "message": message,
+            "from": sender,
+            "format": "json",
+        }
+        data.update(params)
+
+        return self.request(
+            "POST",
+            f"{self.base_url}/sms.do",
+            data=data,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+
+# ───────────────────────────────────────
+# PRZELEWY24
+# ───────────────────────────────────────
+
+class P24Client(ProviderClient):
+    provider = "p24"
+    timeout = (3.05, 15)
+
+    # verify (PUT) jest idempotentne – można ponowić po 502/503/504
+    status_retries = 2
+    retry_methods = frozenset({"GET", "HEAD", "PUT"})
+
+    def _auth(self, pos_id, api_key):
+        return (str(pos_id), api_key)
+
+    def register(self, url, payload, *, pos_id, api_key):
+        return self.request(
+            "POST",
+            url,
+            json=payload,
+            auth=self._auth(pos_id, api_key),
+        )
+
+    def verify(self, url, payload, *, pos_id, api_key):
+        return self.request(
+            "PUT",
+            url,
+            json=payload,
+            auth=self._auth(pos_id, api_key),
+        )
+
+
+# ───────────────────────────────────────
+# RESEND
+# ───────────────────────────────────────
+
+class _ResendTransport(HTTPClient):
+    """
+    Transport SDK resend na sesji klienta (domyślnie SDK woła
+    requests.request – nowe połączenie przy każdym e-mailu).
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def request(self, method, url, headers, json=None, files=None, data=None):
+        try:
+            response = self._client.request(
+                method,
+                url,
+                headers=headers,
+                json=json if data is None else None,
+                files=files,
+                data=data,
+            )
+            return response.content, response.status_code, response.headers
+
+        except requests.RequestException as e:
+            # SDK zamienia RuntimeError na ResendError
+            raise RuntimeError(f"Request failed: {e}") from e
+
+
+class ResendClient(ProviderClient):
+    provider = "resend"
+    timeout = (3.05, 30)
+
+    # limit endpointu /emails/batch
+    batch_size = 100
+
+    def __init__(self):
+        super().__init__()
+        self._api_key = None
+
+        # SDK trzyma transport i klucz globalnie – ustawiane raz na proces
+        resend.default_http_client = _ResendTransport(self)
+
+    def configure(self, api_key):
+        if api_key != self._api_key:
+            resend.api_key = api_key
+            self._api_key = api_key
+
+    def send(self, params):
+        return resend.Emails.send(params)
+
+    def send_batch(self, params_list):
+        """
+        Do batch_size wiadomości. Tryb permissive: błędna wiadomość
+        nie blokuje reszty – odpowiedź {"data": [...], "errors": [{index, message}]}.
+        """
+        return resend.Batch.send(params_list, {"batch_validation": "permissive"})
+
+
+# ───────────────────────────────────────
+# REJESTR KLIENTÓW (PER PROCES)
+# ───────────────────────────────────────
+
+CLIENT_CLASSES = {
+    "smsapi": SMSAPIClient,
+    "p24": P24Client,
+    "resend": ResendClient,
+}
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(name):
+    client = _clients.get(name)
+
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = CLIENT_CLASSES[name]()
+                _clients[name] = client
+
+    return client
+
+
+def override_client(name, client):
+    """
+    Podmiana klienta (atrapy w benchmarkach / testach).
+    Zwraca poprzedniego klienta.
+    """
+    with _lock:
+        previous = _clients.get(name)
+        _clients[name] = client
+    return previous
+
+
+def reset_clients():
+    with _lock:
+        for client in _clients.values():
+            close = getattr(client, "close", None)
+            if close:
+                close()
+        _clients.clear()
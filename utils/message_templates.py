@@ -0,0 +1,209 @@
+"""
+Rejestr wersjonowanych szablonów SMS / e-mail.
+
+Wiadomość w logu (SMSMessage / EmailMessage) przechowuje tylko
+template_id + params_json – treść renderowana jest przy podglądzie
+i przy ponownej wysyłce.
+
+Treści e-mail: templates/email/*.html (utils/email_templates.py).
+
+Opublikowanej wersji NIE zmieniamy – stare wiersze logu renderują się
+swoją wersją. Zmiana treści = nowy szablon (…v2) + wpis w CURRENT.
+"""
+import json
+from typing import Callable, NamedTuple, Optional
+
+from utils import email_templates
+from utils.email_templates import renderer, GLOBALS
+
+
+MEET_LINK = GLOBALS["meet_link"]
+
+
+class MessageTemplate(NamedTuple):
+    id: str
+    channel: str                      # sms | email
+    subject: Optional[str]
+    render: Callable[[dict], str]
+    html: bool = False
+
+
+class UnknownTemplate(KeyError):
+    pass
+
+
+TEMPLATES = {}
+
+
+def register(template):
+    if template.id in TEMPLATES:
+        raise ValueError(f"Szablon {template.id} już istnieje")
+    TEMPLATES[template.id] = template
+    return template
+
+
+# ───────────────────────────────────────
+# PARAMETRY
+# ───────────────────────────────────────
+
+def appointment_params(appointment, *, base_url=None):
+    """
+    Wspólne parametry wizyty – tylko to, czego używają szablony.
+    """
+    params = {
+        "first_name": appointment.patient_first_name or "",
+        "date": appointment.start.strftime("%d.%m.%Y"),
+        "time": appointment.start.strftime("%H:%M"),
+    }
+
+    if base_url is not None:
+        params["cancel_url"] = f"{base_url}/c/{appointment.cancel_token}"
+
+    return params
+
+
+def dump_params(params):
+    return json.dumps(params, ensure_ascii=False, separators=(",", ":"))
+
+
+def get_template(template_id):
+    try:
+        return TEMPLATES[template_id]
+    except KeyError:
+        raise UnknownTemplate(template_id)
+
+
+def render(template_id, params):
+    """
+    (subject, body) – subject None dla SMS.
+    """
+    template = get_template(template_id)
+
+    if isinstance(params, str):
+        params = json.loads(params)
+
+    return template.subject, template.render(params)
+
+
+def render_many(template_id, params_list):
+    """
+    Treści wielu wiadomości jednego szablonu (np. przypomnienia z joba).
+    Szablony Jinja renderowane są hurtowo, pozostałe po kolei.
+    """
+    template = get_template(template_id)
+    params_list = [
+        json.loads(p) if isinstance(p, str) else p
+        for p in params_list
+    ]
+
+    name = getattr(template.render, "template_name", None)
+    if name:
+        return email_templates.render_many(name, params_list)
+
+    return [template.render(p) for p in params_list]
+
+
+# ───────────────────────────────────────
+# SMS
+# ───────────────────────────────────────
+
+register(MessageTemplate(
+    id="sms.confirmation.v1",
+    channel="sms",
+    subject=None,
+    render=lambda p: (
+        f"{p['date']} godz. {p['time']}\n"
+        f"Aby anulowac wizyte wejdz na: {p['cancel_url']}\n"
+        f"Auto-wiadomosc - prosimy nie odpowiadac"
+    ),
+))
+
+register(MessageTemplate(
+    id="sms.reminder.v1",
+    channel="sms",
+    subject=None,
+    render=lambda p: (
+        f"Przypomnienie o wizycie:\n"
+        f"{p['date']} godz. {p['time']}\n"
+        f"Do zobaczenia."
+    ),
+))
+
+register(MessageTemplate(
+    id="sms.online_meet.v1",
+    channel="sms",
+    subject=None,
+    render=lambda p: (
+        f"Wizyta online {p['date']} {p['time']}. "
+        f"Link do spotkania: {MEET_LINK}. "
+        f"Prosze dolaczyc kilka minut przed wizyta."
+    ),
+))
+
+register(MessageTemplate(
+    id="sms.payment_notification.v1",
+    channel="sms",
+    subject=None,
+    render=lambda p: (
+        f"Pacjent {p['full_name']} "
+        f"({p['phone']}) "
+        f"zarezerwowal i oplacil wizyte w P24."
+    ),
+))
+
+
+# ───────────────────────────────────────
+# EMAIL
+# ───────────────────────────────────────
+
+register(MessageTemplate(
+    id="email.confirmation.v1",
+    channel="email",
+    subject="Potwierdzenie wizyty",
+    html=True,
+    render=renderer("confirmation_v1.html"),
+))
+
+register(MessageTemplate(
+    id="email.reminder.v1",
+    channel="email",
+    subject="Przypomnienie o wizycie",
+    html=True,
+    render=renderer("reminder_v1.html"),
+))
+
+register(MessageTemplate(
+    id="email.online_meet.v1",
+    channel="email",
+    subject="Link do wizyty online",
+    html=True,
+    render=renderer("online_meet_v1.html"),
+))
+
+register(MessageTemplate(
+    id="email.traditional_payment.v1",
+    channel="email",
+    subject="Dane do przelewu – potwierdzenie rezerwacji",
+    html=False,
+    render=renderer("traditional_payment_v1.txt"),
+))
+
+
+# ───────────────────────────────────────
+# AKTUALNE WERSJE
+# ───────────────────────────────────────
+
+CURRENT = {
+    ("sms", "confirmation"): "sms.confirmation.v1",
+    ("sms", "reminder"): "sms.reminder.v1",
+    ("sms", "online_meet"): "sms.online_meet.v1",
+    ("sms", "payment_notification"): "sms.payment_notification.v1",
+    ("email", "confirmation"): "email.confirmation.v1",
+    ("email", "reminder"): "email.reminder.v1",
+    ("email", "online_meet"): "email.online_meet.v1",
+    ("email", "payment_retry"): "email.traditional_payment.v1",
+}
+
+
+def current(channel, kind):
+    return CURRENT[(channel, kind)]
@@ -0,0 +1,285 @@
+import hmac
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import g, request, has_app_context, current_app, abort
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# ───────────────────────────────────────
+# KONFIGURACJA
+# ───────────────────────────────────────
+
+PROVIDERS = ("google", "smsapi", "resend", "p24")
+
+# zapytania / wywołania spoza requestu (APScheduler, skrypty)
+BACKGROUND_ENDPOINT = "_background"
+
+
+# ───────────────────────────────────────
+# AGREGACJA (PER PROCES / WORKER)
+# ───────────────────────────────────────
+
+class _Registry:
+    """
+    Liczniki zagregowane po endpointach blueprintów.
+    Każdy worker gunicorna ma własny rejestr – Prometheus sumuje instancje.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.request_seconds = defaultdict(float)
+        self.sql_queries = defaultdict(int)
+        self.sql_seconds = defaultdict(float)
+        self.external_calls = defaultdict(int)      # (endpoint, provider)
+        self.external_seconds = defaultdict(float)  # (endpoint, provider)
+
+    def add_request(self, endpoint, seconds, stats):
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.request_seconds[endpoint] += seconds
+            self.sql_queries[endpoint] += stats.sql_queries
+            self.sql_seconds[endpoint] += stats.sql_seconds
+
+            for provider, (calls, secs) in stats.external.items():
+                self.external_calls[(endpoint, provider)] += calls
+                self.external_seconds[(endpoint, provider)] += secs
+
+    def add_external(self, endpoint, provider, seconds):
+        with self._lock:
+            self.external_calls[(endpoint, provider)] += 1
+            self.external_seconds[(endpoint, provider)] += seconds
+
+    def add_sql(self, endpoint, seconds):
+        with self._lock:
+            self.sql_queries[endpoint] += 1
+            self.sql_seconds[endpoint] += seconds
+
+
+registry = _Registry()
+
+# dodatkowi obserwatorzy zapytań: fn(conn, cursor, statement, parameters,
+# executemany, elapsed) – np. utils.slow_queries
+_query_observers = []
+
+
+def add_query_observer(fn):
+    if fn not in _query_observers:
+        _query_observers.append(fn)
+
+
+class RequestStats:
+    __slots__ = ("started", "sql_queries", "sql_seconds", "external")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.external = {}   # provider → [calls, seconds]
+
+    def add_external(self, provider, seconds):
+        entry = self.external.setdefault(provider, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def current_stats():
+    if not has_app_context():
+        return None
+    return g.get("_request_stats")
+
+
+# ───────────────────────────────────────
+# SQLALCHEMY – HOOKI
+# ───────────────────────────────────────
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_query_started")
+    if not stack:
+        return
+
+    elapsed = time.perf_counter() - stack.pop()
+
+    stats = current_stats()
+    if stats is not None:
+        stats.sql_queries += 1
+        stats.sql_seconds += elapsed
+    else:
+        registry.add_sql(BACKGROUND_ENDPOINT, elapsed)
+
+    for observer in _query_observers:
+        observer(conn, cursor, statement, parameters, executemany, elapsed)
+
+
+# ───────────────────────────────────────
+# WYWOŁANIA ZEWNĘTRZNE
+# ───────────────────────────────────────
+
+@contextmanager
+def track_external(provider):
+    """
+    Mierzy czas oczekiwania na dostawcę (google / smsapi / resend / p24).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+
+        stats = current_stats()
+        if stats is not None:
+            stats.add_external(provider, elapsed)
+        else:
+            registry.add_external(BACKGROUND_ENDPOINT, provider, elapsed)
+
+
+# ───────────────────────────────────────
+# FLASK – HOOKI REQUESTU
+# ───────────────────────────────────────
+
+def _before_request():
+    g._request_stats = RequestStats()
+
+
+def _after_request(response):
+    stats = g.pop("_request_stats", None)
+    if stats is None:
+        return response
+
+    elapsed = time.perf_counter() - stats.started
+    endpoint = request.endpoint or "unmatched"
+
+    registry.add_request(endpoint, elapsed, stats)
+
+    if current_app.debug or current_app.config.get("METRICS_HEADERS"):
+        response.headers["X-SQL-Queries"] = str(stats.sql_queries)
+        response.headers["X-SQL-Time-Ms"] = f"{stats.sql_seconds * 1000:.1f}"
+
+        timings = [f"db;dur={stats.sql_seconds * 1000:.1f}"]
+
+        for provider, (calls, secs) in stats.external.items():
+            response.headers[f"X-External-{provider.capitalize()}-Ms"] = f"{secs * 1000:.1f}"
+            timings.append(f"{provider};dur={secs * 1000:.1f}")
+
+        timings.append(f"total;dur={elapsed * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+
+    return response
+
+
+# ───────────────────────────────────────
+# /metrics (PROMETHEUS TEXT FORMAT)
+# ───────────────────────────────────────
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_metrics():
+    lines = []
+
+    def block(name, kind, help_text, rows):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in rows:
+            rendered = ",".join(f'{k}="{_label(v)}"' for k, v in labels)
+            lines.append(f"{name}{{{rendered}}} {value}")
+
+    with registry._lock:
+        requests_ = sorted(registry.requests.items())
+        request_seconds = sorted(registry.request_seconds.items())
+        sql_queries = sorted(registry.sql_queries.items())
+        sql_seconds = sorted(registry.sql_seconds.items())
+        ext_calls = sorted(registry.external_calls.items())
+        ext_seconds = sorted(registry.external_seconds.items())
+
+    block(
+        "terminarz_requests_total", "counter",
+        "Liczba obsłużonych requestów",
+        [((("endpoint", e),), v) for e, v in requests_]
+    )
+    block(
+        "terminarz_request_seconds_sum", "counter",
+        "Łączny czas obsługi requestów (s)",
+        [((("endpoint", e),), f"{v:.6f}") for e, v in request_seconds]
+    )
+    block(
+        "terminarz_sql_queries_total", "counter",
+        "Liczba zapytań SQL",
+        [((("endpoint", e),), v) for e, v in sql_queries]
+    )
+    block(
+        "terminarz_sql_seconds_sum", "counter",
+        "Łączny czas zapytań SQL (s)",
+        [((("endpoint", e),), f"{v:.6f}") for e, v in sql_seconds]
+    )
+    block(
+        "terminarz_external_calls_total", "counter",
+        "Liczba wywołań dostawców zewnętrznych",
+        [((("endpoint", e), ("provider", p)), v) for (e, p), v in ext_calls]
+    )
+    block(
+        "terminarz_external_seconds_sum", "counter",
+        "Łączny czas oczekiwania na dostawców zewnętrznych (s)",
+        [((("endpoint", e), ("provider", p)), f"{v:.6f}") for (e, p), v in ext_seconds]
+    )
+
+    from utils import circuit_breaker
+
+    breakers = circuit_breaker.snapshot()
+
+    block(
+        "terminarz_circuit_open", "gauge",
+        "Obwód dostawcy otwarty (1) / półotwarty (0.5) / zamknięty (0)",
+        [
+            ((("provider", b["provider"]),), {"open": 1, "half_open": 0.5}.get(b["state"], 0))
+            for b in breakers
+        ]
+    )
+    block(
+        "terminarz_circuit_rejected_total", "counter",
+        "Wywołania odrzucone przez circuit breaker / bulkhead",
+        [((("provider", b["provider"]),), b["rejected"]) for b in breakers]
+    )
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+
+    if token:
+        auth = request.headers.get("Authorization", "")
+        given = auth[7:] if auth.startswith("Bearer ") else request.args.get("token", "")
+
+        if not hmac.compare_digest(given, token):
+            abort(403)
+
+    elif not current_app.debug:
+        # bez tokenu /metrics jest dostępne tylko lokalnie w trybie debug
+        abort(404)
+
+    return current_app.response_class(
+        render_metrics(),
+        mimetype="text/plain; version=0.0.4"
+    )
+
+
+# ───────────────────────────────────────
+# INIT
+# ───────────────────────────────────────
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
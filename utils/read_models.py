@@ -0,0 +1,182 @@
+"""
+Lekkie wiersze do odczytu – bez encji ORM.
+
+Widoki tylko czytające (kalendarz lekarza, lista urlopów, statystyki)
+pobierają kolumny przez select() wprost do krotek (NamedTuple, jak
+ArchivedSlot w utils/availability_archive.py): bez mapy tożsamości,
+śledzenia zmian i leniwych relacji. Dane do zmiany – nadal przez modele.
+
+Porównanie z ORM (czas i pamięć na 10 tys. wierszy):
+    python -m benchmarks.read_models
+"""
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+
+from extensions import db
+from models import Appointment, Availability, Payment, SlotHold, Vacation
+from utils.slot_holds import active_filter
+
+
+BUSY_STATUSES = ("scheduled", "completed")
+
+
+class SlotRow(NamedTuple):
+    id: int
+    start: datetime
+    end: datetime
+    active: bool
+
+
+class AppointmentRow(NamedTuple):
+    id: int
+    start: datetime
+    end: datetime
+    duration: int
+    visit_type: str
+    status: str
+    created_by: str
+    patient_first_name: str
+    patient_last_name: str
+    patient_phone: str
+    # ostatnia płatność (None – bez płatności / nie pobierano)
+    payment_status: Optional[str] = None
+    payment_provider: Optional[str] = None
+
+
+class VacationRow(NamedTuple):
+    id: int
+    date_from: date
+    date_to: date
+    description: Optional[str]
+    active: bool
+
+
+class HoldRow(NamedTuple):
+    id: int
+    start: datetime
+    end: datetime
+    visit_type: str
+    patient_first_name: str
+    patient_last_name: str
+
+
+def _columns(model, row_type, fields=None):
+    return [getattr(model, name) for name in (fields or row_type._fields)]
+
+
+_APPOINTMENT_FIELDS = AppointmentRow._fields[:-2]
+
+
+# ───────────────────────────────────────
+# SLOTY
+# ───────────────────────────────────────
+
+def slots(doctor_id, start, end):
+    """
+    Sloty nachodzące na [start, end), według startu.
+    """
+    rows = db.session.execute(
+        select(*_columns(Availability, SlotRow))
+        .where(
+            Availability.doctor_id == doctor_id,
+            Availability.start < end,
+            Availability.end > start
+        )
+        .order_by(Availability.start)
+    )
+    return [SlotRow(*row) for row in rows]
+
+
+# ───────────────────────────────────────
+# WIZYTY
+# ───────────────────────────────────────
+
+def appointments(doctor_id, start, end, *, statuses=BUSY_STATUSES, with_payment=False):
+    """
+    Wizyty nachodzące na [start, end). with_payment – status i dostawca
+    ostatniej płatności (jedno zapytanie z LEFT JOIN).
+    """
+    filters = (
+        Appointment.doctor_id == doctor_id,
+        Appointment.status.in_(statuses),
+        Appointment.start < end,
+        Appointment.end > start,
+    )
+
+    if not with_payment:
+        rows = db.session.execute(
+            select(*_columns(Appointment, AppointmentRow, _APPOINTMENT_FIELDS))
+            .where(*filters)
+            .order_by(Appointment.start)
+        )
+        return [AppointmentRow(*row) for row in rows]
+
+    rows = db.session.execute(
+        select(
+            *_columns(Appointment, AppointmentRow, _APPOINTMENT_FIELDS),
+            Payment.status,
+            Payment.provider
+        )
+        .outerjoin(Payment, Payment.appointment_id == Appointment.id)
+        .where(*filters)
+        .order_by(Appointment.start, Appointment.id, Payment.created_at, Payment.id)
+    )
+
+    # wiersz na płatność – zostaje ostatnia (najpóźniej utworzona)
+    latest = {}
+    for row in rows:
+        latest[row[0]] = AppointmentRow(*row)
+
+    return list(latest.values())
+
+
+def overdue_appointments(doctor_id, now):
+    """
+    Wizyty "scheduled", które już się skończyły – najnowsze najpierw.
+    """
+    rows = db.session.execute(
+        select(*_columns(Appointment, AppointmentRow, _APPOINTMENT_FIELDS))
+        .where(
+            Appointment.doctor_id == doctor_id,
+            Appointment.status == "scheduled",
+            Appointment.end < now
+        )
+        .order_by(Appointment.start.desc())
+    )
+    return [AppointmentRow(*row) for row in rows]
+
+
+# ───────────────────────────────────────
+# URLOPY I BLOKADY
+# ───────────────────────────────────────
+
+def vacations(doctor_id, first_day=None, last_day=None, *, active_only=False, newest_first=False):
+    """
+    Urlopy lekarza; z zakresem – tylko nachodzące na [first_day, last_day].
+    """
+    q = select(*_columns(Vacation, VacationRow)).where(Vacation.doctor_id == doctor_id)
+
+    if active_only:
+        q = q.where(Vacation.active.is_(True))
+    if first_day is not None:
+        q = q.where(Vacation.date_to >= first_day)
+    if last_day is not None:
+        q = q.where(Vacation.date_from <= last_day)
+
+    q = q.order_by(Vacation.date_from.desc() if newest_first else Vacation.date_from)
+
+    return [VacationRow(*row) for row in db.session.execute(q)]
+
+
+def holds(doctor_id, start, end):
+    """
+    Aktywne blokady terminów (płatność w toku) nachodzące na [start, end).
+    """
+    rows = db.session.execute(
+        select(*_columns(SlotHold, HoldRow))
+        .where(SlotHold.doctor_id == doctor_id, *active_filter(start, end))
+        .order_by(SlotHold.start)
+    )
+    return [HoldRow(*row) for row in rows]
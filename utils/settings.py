@@ -1,22 +1,34 @@
 # utils/settings.py
 import json
+from types import MappingProxyType
+
 from extensions import db
 from models import Setting
+from utils import cache_versions
+
+
+def _load():
+    # cała tabela (kilkadziesiąt kluczy) – jedno zapytanie na wersję
+    return MappingProxyType(dict(
+        db.session.query(Setting.key, Setting.value).all()
+    ))
+
+
+# każda zmiana Setting podbija wersję "settings" (utils/cache_versions.py)
+_cache = cache_versions.VersionedCache("settings", _load)
 
 
 def get_setting(key, default=None, cast=None):
     """
-    Pobiera ustawienie z tabeli settings.
+    Pobiera ustawienie z tabeli settings (cache procesu).
     cast: list | int | bool | str | None
     """
 
-    setting = Setting.query.filter_by(key=key).first()
+    value = _cache.get().get(key)
 
-    if not setting:
+    if value is None:
         return default
 
-    value = setting.value
-
     try:
         if cast == list:
             return json.loads(value)
@@ -0,0 +1,151 @@
+import uuid
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import SlotHold, Appointment
+
+
+# ───────────────────────────────────────
+# KONFIGURACJA
+# ───────────────────────────────────────
+
+# tyle samo, ile wcześniej czekał job expire_unpaid_appointments
+HOLD_MINUTES = 30
+
+
+# ───────────────────────────────────────
+# ZAPYTANIA
+# ───────────────────────────────────────
+
+def active_filter(start, end, now=None):
+    now = now or datetime.utcnow()
+
+    return (
+        SlotHold.appointment_id.is_(None),
+        SlotHold.expires_at > now,
+        SlotHold.start < end,
+        SlotHold.end > start,
+    )
+
+
+def active_holds(start, end, doctor_id=None, exclude_id=None):
+    """
+    Aktywne blokady nachodzące na zakres [start, end).
+    Wygasłe blokady są po prostu pomijane – nikt ich nie anuluje.
+    """
+    q = SlotHold.query.filter(*active_filter(start, end))
+
+    if doctor_id is not None:
+        q = q.filter(SlotHold.doctor_id == doctor_id)
+
+    if exclude_id is not None:
+        q = q.filter(SlotHold.id != exclude_id)
+
+    return q.all()
+
+
+def has_active_hold(start, end, doctor_id=None, exclude_id=None):
+    q = db.session.query(SlotHold.id).filter(*active_filter(start, end))
+
+    if doctor_id is not None:
+        q = q.filter(SlotHold.doctor_id == doctor_id)
+
+    if exclude_id is not None:
+        q = q.filter(SlotHold.id != exclude_id)
+
+    return q.first() is not None
+
+
+def get_hold(token):
+    if not token:
+        return None
+    return SlotHold.query.filter_by(token=token).first()
+
+
+# ───────────────────────────────────────
+# TWORZENIE / KONWERSJA
+# ───────────────────────────────────────
+
+def create_hold(*, doctor_id, start, visit_type, first_name, last_name,
+                phone, email, client_ip):
+    """
+    Tworzy blokadę terminu (bez commita).
+    """
+    now = datetime.utcnow()
+
+    hold = SlotHold(
+        doctor_id=doctor_id,
+        token=uuid.uuid4().hex,
+        start=start,
+        end=start + timedelta(minutes=visit_type.duration_minutes),
+        duration=visit_type.duration_minutes,
+        visit_type=visit_type.code,
+        patient_first_name=first_name,
+        patient_last_name=last_name,
+        patient_phone=phone,
+        patient_email=email or None,
+        client_ip=client_ip,
+        expires_at=now + timedelta(minutes=HOLD_MINUTES),
+    )
+
+    db.session.add(hold)
+    db.session.flush()
+
+    return hold
+
+
+def convert_hold(hold):
+    """
+    Zamienia opłaconą blokadę w wizytę (bez commita).
+
+    Jeśli blokada zdążyła wygasnąć i termin zajął ktoś inny,
+    wizyta powstaje jako anulowana – płatność trafia wtedy
+    do listy zwrotów, tak jak przy anulowaniu w trakcie płatności.
+    """
+    if hold.appointment_id:
+        return db.session.get(Appointment, hold.appointment_id)
+
+    conflict = (
+        Appointment.query
+        .filter(
+            Appointment.doctor_id == hold.doctor_id,
+            Appointment.status.in_(["scheduled", "completed"]),
+            Appointment.start < hold.end,
+            Appointment.end > hold.start
+        )
+        .first()
+        is not None
+    ) or has_active_hold(
+        hold.start, hold.end, doctor_id=hold.doctor_id, exclude_id=hold.id
+    )
+
+    appointment = Appointment(
+        doctor_id=hold.doctor_id,
+        start=hold.start,
+        end=hold.end,
+        duration=hold.duration,
+        visit_type=hold.visit_type,
+        patient_first_name=hold.patient_first_name,
+        patient_last_name=hold.patient_last_name,
+        patient_phone=hold.patient_phone,
+        patient_email=hold.patient_email,
+        cancel_token=uuid.uuid4().hex,
+        created_by="patient",
+        client_ip=hold.client_ip,
+        status="scheduled"
+    )
+
+    if conflict:
+        appointment.status = "cancelled"
+        appointment.cancelled_by = "doctor"
+        appointment.cancelled_at = datetime.utcnow()
+
+    db.session.add(appointment)
+    db.session.flush()
+
+    hold.appointment_id = appointment.id
+
+    for payment in hold.payments:
+        payment.appointment = appointment
+
+    return appointment
@@ -0,0 +1,271 @@
+"""
+Log wolnych zapytań SQL z planem EXPLAIN.
+
+Włączenie: SLOW_QUERY_MS=50 (próg w ms). Każde zapytanie powyżej progu
+trafia do pliku JSONL (SLOW_QUERY_LOG, domyślnie instance/slow_queries.jsonl)
+razem z endpointem, z którego przyszło, i planem zapytania.
+Parametry zapytań NIE są zapisywane (dane pacjentów).
+
+Raport najgorszych zapytań:
+    flask --app app slow-queries --top 20
+    python -m utils.slow_queries instance/slow_queries.jsonl --top 20
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+import click
+from flask import has_request_context, request
+
+from utils.metrics import add_query_observer, BACKGROUND_ENDPOINT
+
+
+# ───────────────────────────────────────
+# KONFIGURACJA
+# ───────────────────────────────────────
+
+_state = {
+    "threshold_ms": None,
+    "path": None,
+    "explain": True,
+}
+
+_write_lock = threading.Lock()
+
+_EXPLAINABLE = ("select", "update", "delete")
+
+
+# ───────────────────────────────────────
+# NORMALIZACJA
+# ───────────────────────────────────────
+
+_WS = re.compile(r"\s+")
+_NUM = re.compile(r"\b\d+\b")
+_STR = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))+\s*\)")
+
+
+def fingerprint(statement):
+    """
+    Zapytanie bez literałów – te same zapytania z różnymi parametrami
+    grupują się w raporcie razem.
+    """
+    s = _WS.sub(" ", statement.strip())
+    s = _STR.sub("?", s)
+    s = _NUM.sub("?", s)
+    s = _IN_LIST.sub("(?+)", s)
+    return s
+
+
+def _digest(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+# ───────────────────────────────────────
+# EXPLAIN
+# ───────────────────────────────────────
+
+def explain_statement(conn, statement, parameters):
+    """
+    EXPLAIN na surowym kursorze DBAPI tego samego połączenia –
+    nie przechodzi przez eventy SQLAlchemy, więc nie liczy się
+    do metryk i nie wywołuje rekurencyjnie tego obserwatora.
+    """
+    dialect = conn.dialect.name
+
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect in ("mysql", "mariadb", "postgresql"):
+        prefix = "EXPLAIN "
+    else:
+        return None
+
+    raw = conn.connection.dbapi_connection.cursor()
+
+    try:
+        raw.execute(prefix + statement, parameters or ())
+        columns = [c[0] for c in raw.description or []]
+        return [
+            dict(zip(columns, (str(v) if v is not None else None for v in row)))
+            for row in raw.fetchall()
+        ]
+    except Exception as e:
+        return [{"error": str(e)}]
+    finally:
+        raw.close()
+
+
+# ───────────────────────────────────────
+# OBSERWATOR
+# ───────────────────────────────────────
+
+def _observe(conn, cursor, statement, parameters, executemany, elapsed):
+    threshold = _state["threshold_ms"]
+    if threshold is None:
+        return
+
+    ms = elapsed * 1000
+    if ms < threshold:
+        return
+
+    normalized = fingerprint(statement)
+
+    plan = None
+    if (
+        _state["explain"]
+        and not executemany
+        and statement.lstrip().lower().startswith(_EXPLAINABLE)
+    ):
+        plan = explain_statement(conn, statement, parameters)
+
+    record = {
+        "ts": datetime.utcnow().isoformat(timespec="seconds"),
+        "endpoint": request.endpoint if has_request_context() else BACKGROUND_ENDPOINT,
+        "ms": round(ms, 2),
+        "fingerprint": _digest(normalized),
+        "statement": normalized,
+        "plan": plan,
+    }
+
+    line = json.dumps(record, ensure_ascii=False)
+
+    with _write_lock:
+        with open(_state["path"], "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+
+# ───────────────────────────────────────
+# RAPORT
+# ───────────────────────────────────────
+
+def load_records(path):
+    if not os.path.exists(path):
+        return []
+
+    records = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def top_offenders(records, top=20, order_by="total"):
+    groups = defaultdict(lambda: {
+        "count": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        "endpoints": defaultdict(int),
+        "statement": None,
+        "plan": None,
+    })
+
+    for r in records:
+        g = groups[r["fingerprint"]]
+        g["count"] += 1
+        g["total_ms"] += r["ms"]
+        g["max_ms"] = max(g["max_ms"], r["ms"])
+        g["endpoints"][r.get("endpoint") or "?"] += 1
+        g["statement"] = r["statement"]
+        if r.get("plan"):
+            g["plan"] = r["plan"]
+
+    rows = []
+    for digest, g in groups.items():
+        rows.append({
+            "fingerprint": digest,
+            "count": g["count"],
+            "total_ms": round(g["total_ms"], 2),
+            "avg_ms": round(g["total_ms"] / g["count"], 2),
+            "max_ms": round(g["max_ms"], 2),
+            "endpoints": dict(sorted(g["endpoints"].items(), key=lambda kv: -kv[1])),
+            "statement": g["statement"],
+            "plan": g["plan"],
+        })
+
+    key = {
+        "total": lambda r: -r["total_ms"],
+        "max": lambda r: -r["max_ms"],
+        "count": lambda r: -r["count"],
+    }[order_by]
+
+    return sorted(rows, key=key)[:top]
+
+
+def format_report(rows, show_plan=True):
+    out = []
+
+    for i, r in enumerate(rows, 1):
+        out.append(
+            f"#{i} [{r['fingerprint']}] count={r['count']} "
+            f"total={r['total_ms']}ms avg={r['avg_ms']}ms max={r['max_ms']}ms"
+        )
+        out.append(
+            "   endpoints: "
+            + ", ".join(f"{e} ({n})" for e, n in r["endpoints"].items())
+        )
+        out.append(f"   {r['statement'][:400]}")
+
+        if show_plan and r["plan"]:
+            for step in r["plan"]:
+                out.append("     plan: " + json.dumps(step, ensure_ascii=False))
+
+        out.append("")
+
+    return "\n".join(out) if out else "Brak wolnych zapytań."
+
+
+# ───────────────────────────────────────
+# INIT
+# ───────────────────────────────────────
+
+def default_log_path(app):
+    return os.path.join(app.instance_path, "slow_queries.jsonl")
+
+
+def init_app(app):
+    threshold = app.config.get("SLOW_QUERY_MS")
+    path = app.config.get("SLOW_QUERY_LOG") or default_log_path(app)
+
+    @app.cli.command("slow-queries")
+    @click.option("--top", default=20, show_default=True)
+    @click.option("--order-by", type=click.Choice(["total", "max", "count"]), default="total")
+    @click.option("--no-plan", is_flag=True, help="bez planów EXPLAIN")
+    def slow_queries_command(top, order_by, no_plan):
+        """Najwolniejsze zapytania z logu SLOW_QUERY_LOG."""
+        rows = top_offenders(load_records(path), top=top, order_by=order_by)
+        print(format_report(rows, show_plan=not no_plan))
+
+    if threshold is None:
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    _state["threshold_ms"] = float(threshold)
+    _state["path"] = path
+    _state["explain"] = app.config.get("SLOW_QUERY_EXPLAIN", True)
+
+    add_query_observer(_observe)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Raport wolnych zapytań SQL")
+    parser.add_argument("path", nargs="?", default="instance/slow_queries.jsonl")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--order-by", choices=["total", "max", "count"], default="total")
+    parser.add_argument("--no-plan", action="store_true")
+    args = parser.parse_args()
+
+    print(format_report(
+        top_offenders(load_records(args.path), top=args.top, order_by=args.order_by),
+        show_plan=not args.no_plan
+    ))
@@ -1,15 +1,41 @@
-import requests
+import re
 from datetime import datetime
 
+from sqlalchemy import update
+
 from extensions import db
 from models import SMSMessage, Appointment
 from utils.settings import get_setting
+from utils.http_clients import get_client
+from utils.message_templates import (
+    current, dump_params, appointment_params, get_template
+)
 
 from flask import current_app
 
 
+# ───────────────────────────────────────
+# WYSYŁKA HURTOWA (SMSAPI)
+# ───────────────────────────────────────
+
+# odbiorców w jednym wywołaniu sms.do
+BULK_SIZE = 100
+
+# SMSAPI: param1..param4 → [%1%]..[%4%] w treści
+BULK_PARAMS = 4
+
+
+def _msisdn(phone) -> str:
+    """
+    Numer w postaci zwracanej przez SMSAPI (48XXXXXXXXX).
+    """
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if len(digits) == 9:
+        digits = "48" + digits
+    return digits
+
+
 class SMSService:
-    SMSAPI_URL = "https://api.smsapi.pl/sms.do"
 
     def __init__(self):
         # 🔌 GLOBALNY WŁĄCZNIK SMS
@@ -41,38 +67,23 @@ class SMSService:
     # CORE SEND
     # ───────────────────────────────────────
     def _send_sms(self, phone: str, content: str):
-        payload = {
-            "to": phone,
-            "message": content,
-            "from": self.sender,
-            "format": "json"
-        }
-
-        headers = {
-            "Authorization": f"Bearer {self.api_token}"
-        }
-
-        return requests.post(
-            self.SMSAPI_URL,
-            data=payload,
-            headers=headers,
-            timeout=10
+        return get_client("smsapi").send(
+            token=self.api_token,
+            sender=self.sender,
+            to=phone,
+            message=content
         )
 
     # ───────────────────────────────────────
-    # CONFIRMATION SMS
+    # LOG + WYSYŁKA
     # ───────────────────────────────────────
-    def send_confirmation(self, appointment: Appointment):
-        if not self._can_send():
-            return None
-
-        content = self._build_confirmation_content(appointment)
-
+    def _create_log(self, appointment: Appointment, kind: str, phone: str, params: dict):
         sms = SMSMessage(
             appointment_id=appointment.id,
-            phone=appointment.patient_phone,
-            type="confirmation",
-            content=content,
+            phone=phone,
+            type=kind,
+            template_id=current("sms", kind),
+            params_json=dump_params(params),
             status="pending"
         )
 
@@ -80,200 +91,327 @@ class SMSService:
         db.session.add(sms)
         db.session.commit()
 
+        return sms
+
+    def _deliver(self, sms: SMSMessage) -> bool:
         try:
-            response = self._send_sms(sms.phone, sms.content)
+            response = self._send_sms(sms.phone, sms.body)
             data = response.json() if response.content else {}
 
             if response.status_code == 200 and data.get("count", 0) > 0:
                 sms.status = "sent"
                 sms.sent_at = datetime.utcnow()
+                sms.error_message = None
                 sms.provider_message_id = str(
                     data.get("list", [{}])[0].get("id")
                 )
+                return True
 
-                appointment.sms_confirmation_sent_at = sms.sent_at
-            else:
-                sms.status = "failed"
-                sms.error_message = data.get("message", "Unknown error")
+            sms.status = "failed"
+            sms.error_message = data.get("message", "Unknown error")
 
         except Exception as e:
             sms.status = "failed"
             sms.error_message = str(e)
 
-        db.session.commit()
-        return sms
+        return False
 
-    # ───────────────────────────────────────
-    # REMINDER SMS
-    # ───────────────────────────────────────
-    def send_reminder(self, appointment: Appointment):
+    def _mark_appointment(self, appointment: Appointment, sms: SMSMessage):
+        if sms.type == "confirmation":
+            appointment.sms_confirmation_sent_at = sms.sent_at
+        elif sms.type == "reminder":
+            appointment.sms_reminder_sent_at = sms.sent_at
+
+    def _send_logged(self, appointment: Appointment, kind: str, phone: str, params: dict):
         if not self._can_send():
             return None
 
-        content = self._build_reminder_content(appointment)
-
-        sms = SMSMessage(
-            appointment_id=appointment.id,
-            phone=appointment.patient_phone,
-            type="reminder",
-            content=content,
-            status="pending"
-        )
-
-        db.session.add(sms)
-        db.session.commit()
+        sms = self._create_log(appointment, kind, phone, params)
 
-        try:
-            response = self._send_sms(sms.phone, sms.content)
-            data = response.json() if response.content else {}
-
-            if response.status_code == 200 and data.get("count", 0) > 0:
-                sms.status = "sent"
-                sms.sent_at = datetime.utcnow()
-                sms.provider_message_id = str(
-                    data.get("list", [{}])[0].get("id")
-                )
-
-                appointment.sms_reminder_sent_at = sms.sent_at
-            else:
-                sms.status = "failed"
-                sms.error_message = data.get("message", "Unknown error")
-
-        except Exception as e:
-            sms.status = "failed"
-            sms.error_message = str(e)
+        if self._deliver(sms):
+            self._mark_appointment(appointment, sms)
 
         db.session.commit()
         return sms
 
     # ───────────────────────────────────────
-    # ONLINE VISIT LINK SMS
+    # WYSYŁKA HURTOWA
     # ───────────────────────────────────────
-    def send_online_meet_link(self, appointment: Appointment):
+    def _bulk_message(self, template_id: str, params_list: list):
+        """
+        (treść z [%n%], param1..paramN) dla jednego wywołania SMSAPI
+        albo None, gdy szablonu nie da się tak sparametryzować.
+        """
+        keys = sorted(params_list[0])
+
+        if len(keys) > BULK_PARAMS:
+            return None
 
-        if not self._can_send():
+        if any(sorted(p) != keys for p in params_list):
             return None
 
-        content = self._build_online_meet_content(appointment)
+        if any("|" in str(p[k]) for p in params_list for k in keys):
+            return None
 
-        sms = SMSMessage(
-            appointment_id=appointment.id,
-            phone=appointment.patient_phone,
-            type="online_meet",
-            content=content,
-            status="pending"
-        )
+        render = get_template(template_id).render
+        message = render({k: f"[%{i}%]" for i, k in enumerate(keys, 1)})
 
-        db.session.add(sms)
-        db.session.commit()
+        # kontrola: podstawienie parametrów = zwykły render
+        sample = message
+        for i, k in enumerate(keys, 1):
+            sample = sample.replace(f"[%{i}%]", str(params_list[0][k]))
+        if sample != render(params_list[0]):
+            return None
 
-        try:
-            response = self._send_sms(sms.phone, sms.content)
-            data = response.json() if response.content else {}
+        params = {
+            f"param{i}": "|".join(str(p[k]) for p in params_list)
+            for i, k in enumerate(keys, 1)
+        }
 
-            if response.status_code == 200 and data.get("count", 0) > 0:
-                sms.status = "sent"
-                sms.sent_at = datetime.utcnow()
-                sms.provider_message_id = str(
-                    data.get("list", [{}])[0].get("id")
-                )
+        return message, params
+
+    def _bulk_batches(self, entries: list):
+        """
+        Partie po BULK_SIZE z unikalnymi numerami (odpowiedź SMSAPI
+        mapujemy po numerze).
+        """
+        pending = list(entries)
+
+        while pending:
+            batch, numbers, rest = [], set(), []
+
+            for entry in pending:
+                number = _msisdn(entry[2])
+                if len(batch) < BULK_SIZE and number not in numbers:
+                    batch.append(entry)
+                    numbers.add(number)
+                else:
+                    rest.append(entry)
+
+            yield batch
+            pending = rest
+
+    def _bulk_results(self, batch: list, response) -> dict:
+        """
+        sms_id → (provider_message_id, błąd) z odpowiedzi SMSAPI.
+        """
+        data = response.json() if response.content else {}
+
+        if response.status_code != 200 or data.get("error"):
+            error = data.get("message") or f"HTTP {response.status_code}"
+            return {sms_id: (None, error) for sms_id, *_ in batch}
+
+        sent = {}
+        for item in data.get("list", []):
+            for key in ("number", "submitted_number"):
+                if item.get(key):
+                    sent[_msisdn(item[key])] = str(item.get("id"))
+
+        invalid = {}
+        for item in data.get("invalid_numbers", []):
+            for key in ("number", "submitted_number"):
+                if item.get(key):
+                    invalid[_msisdn(item[key])] = item.get("message", "Invalid number")
+
+        results = {}
+        for sms_id, _, phone, _ in batch:
+            number = _msisdn(phone)
+
+            if number in sent:
+                results[sms_id] = (sent[number], None)
             else:
-                sms.status = "failed"
-                sms.error_message = data.get("message", "Unknown error")
+                results[sms_id] = (None, invalid.get(number, "Brak numeru w odpowiedzi SMSAPI"))
 
-        except Exception as e:
-            sms.status = "failed"
-            sms.error_message = str(e)
+        return results
 
-        db.session.commit()
-        return sms
-    
-    def send_payment_notification(self, appointment: Appointment):
+    def _send_bulk(self, kind: str, appointments: list, build_params):
+        """
+        Jeden szablon do wielu wizyt: logi zapisane jednym commitem,
+        wysyłka partiami po BULK_SIZE, statusy jednym UPDATE.
+        """
         if not self._can_send():
-            return None
-
-        phone = "+48608597050"
+            return []
+
+        appointments = [a for a in appointments if a.patient_phone]
+        if not appointments:
+            return []
+
+        template_id = current("sms", kind)
+        template = get_template(template_id)
+
+        logs = []
+        params = []
+        for appointment in appointments:
+            p = build_params(appointment)
+            logs.append(SMSMessage(
+                appointment_id=appointment.id,
+                phone=appointment.patient_phone,
+                type=kind,
+                template_id=template_id,
+                params_json=dump_params(p),
+                status="pending"
+            ))
+            params.append(p)
 
-        content = self._build_payment_notification_content(appointment)
+        # 🔴 zapis PRZED wysyłką
+        db.session.add_all(logs)
+        db.session.flush()
+
+        # (sms_id, appointment_id, phone, params) – bez odświeżania obiektów po commicie
+        entries = [
+            (sms.id, sms.appointment_id, sms.phone, p)
+            for sms, p in zip(logs, params)
+        ]
+        db.session.commit()
 
-        sms = SMSMessage(
-            appointment_id=appointment.id,
-            phone=phone,
-            type="payment_notification",
-            content=content,
-            status="pending"
-        )
+        sent_at = datetime.utcnow()
+        sms_rows = []
+        appointment_ids = []
+
+        for batch in self._bulk_batches(entries):
+            bulk = self._bulk_message(template_id, [p for *_, p in batch])
+
+            try:
+                if bulk is not None:
+                    message, extra = bulk
+                    response = get_client("smsapi").send(
+                        token=self.api_token,
+                        sender=self.sender,
+                        to=",".join(_msisdn(phone) for _, _, phone, _ in batch),
+                        message=message,
+                        **extra
+                    )
+                    results = self._bulk_results(batch, response)
+                else:
+                    # szablonu nie da się sparametryzować – pojedynczo
+                    results = {}
+                    for entry in batch:
+                        response = self._send_sms(entry[2], template.render(entry[3]))
+                        results.update(self._bulk_results([entry], response))
+
+            except Exception as e:
+                results = {sms_id: (None, str(e)) for sms_id, *_ in batch}
+
+            for sms_id, appointment_id, _, _ in batch:
+                message_id, error = results[sms_id]
+
+                sms_rows.append({
+                    "id": sms_id,
+                    "status": "failed" if error else "sent",
+                    "sent_at": None if error else sent_at,
+                    "provider_message_id": message_id,
+                    "error_message": error,
+                })
+
+                if error is None:
+                    appointment_ids.append(appointment_id)
+
+        # bulk UPDATE po kluczu głównym – bez ładowania obiektów
+        db.session.execute(update(SMSMessage), sms_rows)
+
+        column = {
+            "confirmation": "sms_confirmation_sent_at",
+            "reminder": "sms_reminder_sent_at",
+        }.get(kind)
+
+        if column and appointment_ids:
+            db.session.execute(
+                update(Appointment),
+                [{"id": a_id, column: sent_at} for a_id in appointment_ids]
+            )
 
-        db.session.add(sms)
         db.session.commit()
+        return logs
 
-        try:
-            response = self._send_sms(sms.phone, sms.content)
-            data = response.json() if response.content else {}
+    def send_reminders(self, appointments: list):
+        """
+        Przypomnienia SMS dla wielu wizyt (job) – hurtowo przez SMSAPI.
+        """
+        return self._send_bulk("reminder", appointments, self._build_reminder_params)
 
-            if response.status_code == 200 and data.get("count", 0) > 0:
-                sms.status = "sent"
-                sms.sent_at = datetime.utcnow()
-                sms.provider_message_id = str(
-                    data.get("list", [{}])[0].get("id")
-                )
-            else:
-                sms.status = "failed"
-                sms.error_message = data.get("message", "Unknown error")
-
-        except Exception as e:
-            sms.status = "failed"
-            sms.error_message = str(e)
+    # ───────────────────────────────────────
+    # CONFIRMATION SMS
+    # ───────────────────────────────────────
+    def send_confirmation(self, appointment: Appointment):
+        return self._send_logged(
+            appointment,
+            "confirmation",
+            appointment.patient_phone,
+            self._build_confirmation_params(appointment)
+        )
 
-        db.session.commit()
-        return sms
+    # ───────────────────────────────────────
+    # REMINDER SMS
+    # ───────────────────────────────────────
+    def send_reminder(self, appointment: Appointment):
+        return self._send_logged(
+            appointment,
+            "reminder",
+            appointment.patient_phone,
+            self._build_reminder_params(appointment)
+        )
 
     # ───────────────────────────────────────
-    # CONTENT BUILDERS
+    # ONLINE VISIT LINK SMS
     # ───────────────────────────────────────
-    def _build_confirmation_content(self, appointment: Appointment) -> str:
-        date_str = appointment.start.strftime("%d.%m.%Y")
-        time_str = appointment.start.strftime("%H:%M")
+    def send_online_meet_link(self, appointment: Appointment):
+        return self._send_logged(
+            appointment,
+            "online_meet",
+            appointment.patient_phone,
+            self._build_online_meet_params(appointment)
+        )
 
-        cancel_url = f"{self.base_url}/c/{appointment.cancel_token}"
+    def send_payment_notification(self, appointment: Appointment):
+        phone = "+48608597050"
 
-        return (
-            f"{date_str} godz. {time_str}\n"
-            f"Aby anulowac wizyte wejdz na: {cancel_url}\n"
-            f"Auto-wiadomosc - prosimy nie odpowiadac"
+        return self._send_logged(
+            appointment,
+            "payment_notification",
+            phone,
+            self._build_payment_notification_params(appointment)
         )
 
-    def _build_reminder_content(self, appointment: Appointment) -> str:
-        date_str = appointment.start.strftime("%d.%m.%Y")
-        time_str = appointment.start.strftime("%H:%M")
+    # ───────────────────────────────────────
+    # RETRY – ta sama wiadomość (szablon + parametry z logu)
+    # ───────────────────────────────────────
+    def retry(self, sms: SMSMessage):
+        if not self._can_send():
+            return None
+
+        if sms.body is None:
+            sms.status = "failed"
+            sms.error_message = "Treść usunięta (retencja)"
+            db.session.commit()
+            return sms
 
-        return (
-            f"Przypomnienie o wizycie:\n"
-            f"{date_str} godz. {time_str}\n"
-            f"Do zobaczenia."
-        )
+        if self._deliver(sms):
+            self._mark_appointment(sms.appointment, sms)
 
-    def _build_online_meet_content(self, appointment: Appointment) -> str:
+        db.session.commit()
+        return sms
+
+    # ───────────────────────────────────────
+    # PARAMETRY SZABLONÓW
+    # ───────────────────────────────────────
+    def _build_confirmation_params(self, appointment: Appointment) -> dict:
+        params = appointment_params(appointment, base_url=self.base_url)
+        del params["first_name"]
+        return params
 
-        date_str = appointment.start.strftime("%d.%m.%Y")
-        time_str = appointment.start.strftime("%H:%M")
+    def _build_reminder_params(self, appointment: Appointment) -> dict:
+        params = appointment_params(appointment)
+        del params["first_name"]
+        return params
 
-        meet_link = "https://meet.google.com/eev-cxtv-ycq"
+    def _build_online_meet_params(self, appointment: Appointment) -> dict:
+        return self._build_reminder_params(appointment)
 
-        return (
-            f"Wizyta online {date_str} {time_str}. "
-            f"Link do spotkania: {meet_link}. "
-            f"Prosze dolaczyc kilka minut przed wizyta."
-        )
-    def _build_payment_notification_content(self, appointment: Appointment) -> str:
+    def _build_payment_notification_params(self, appointment: Appointment) -> dict:
         first_name = appointment.patient_first_name or ""
         last_name = appointment.patient_last_name or ""
-        phone = appointment.patient_phone or ""
 
-        full_name = f"{first_name} {last_name}".strip()
-
-        return (
-            f"Pacjent {full_name} "
-            f"({phone}) "
-            f"zarezerwowal i oplacil wizyte w P24."
-        )
\ No newline at end of file
+        return {
+            "full_name": f"{first_name} {last_name}".strip(),
+            "phone": appointment.patient_phone or "",
+        }
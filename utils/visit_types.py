@@ -0,0 +1,114 @@
+"""
+Rejestr typów wizyt w pamięci procesu.
+
+Kilka wierszy, zmieniane rzadko, a czytane przy każdym żądaniu
+rezerwacji, płatności i synchronizacji Google. Wszystkie typy są
+ładowane jednym zapytaniem do niezmiennej migawki (po kodzie i po id);
+każda zmiana VisitType podbija wersję "visit_types"
+(utils/cache_versions.py) i każdy worker przeładowuje migawkę.
+
+Zwracane obiekty to krotki (VisitTypeInfo) – tylko do odczytu.
+Edycja typu wizyty – przez model VisitType.
+"""
+from datetime import datetime
+from decimal import Decimal
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+
+from extensions import db
+from models import VisitType
+from utils import cache_versions
+
+
+CACHE_NAME = "visit_types"
+
+
+class VisitTypeInfo(NamedTuple):
+    id: int
+    name: str
+    code: str
+    type: str
+    description: Optional[str]
+    price: Optional[Decimal]
+    duration_minutes: int
+    display_order: int
+    display_order_doctor: int
+    color: str
+    active: bool
+    only_online_payment: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+class _Snapshot(NamedTuple):
+    by_code: MappingProxyType
+    by_id: MappingProxyType
+    items: tuple
+
+
+# ───────────────────────────────────────
+# ŁADOWANIE
+# ───────────────────────────────────────
+
+def _load():
+    columns = [VisitType.__table__.c[name] for name in VisitTypeInfo._fields]
+
+    items = tuple(
+        VisitTypeInfo(*row)
+        for row in db.session.execute(select(*columns)).all()
+    )
+
+    return _Snapshot(
+        by_code=MappingProxyType({vt.code: vt for vt in items}),
+        by_id=MappingProxyType({vt.id: vt for vt in items}),
+        items=items,
+    )
+
+
+_cache = cache_versions.VersionedCache(CACHE_NAME, _load)
+
+
+def _current():
+    return _cache.get()
+
+
+def version():
+    return _cache.version
+
+
+# ───────────────────────────────────────
+# ODCZYT
+# ───────────────────────────────────────
+
+def get(code, *, active=None):
+    """
+    Typ wizyty po kodzie; active=True – tylko aktywny (inaczej None).
+    """
+    vt = _current().by_code.get(code)
+
+    if vt is None or (active is not None and vt.active != active):
+        return None
+
+    return vt
+
+
+def get_by_id(vt_id):
+    return _current().by_id.get(vt_id)
+
+
+def listing(*, active=True, doctor_order=False):
+    """
+    Typy wizyt w kolejności wyświetlania – pacjenta (display_order)
+    albo lekarza (display_order_doctor).
+    """
+    items = _current().items
+
+    if active is not None:
+        items = [vt for vt in items if vt.active == active]
+
+    if doctor_order:
+        return sorted(items, key=lambda vt: (vt.display_order_doctor, vt.id))
+
+    return sorted(items, key=lambda vt: (vt.display_order, vt.id))